@@ -1,29 +1,48 @@
 """Main module."""
 
+import copy
+import math
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Mapping, Sequence
 
 import numpy as np
-import pandas as pd
 import yaml
 
+from .datatypes.sparse import SparseTimeseries
 from .datatypes.units import (
     convert_units,
+    INTERNAL_UNITS_PRECIP,
+    INTERNAL_UNITS_TEMPERATURE,
     INTERNAL_UNITS_TIME,
 )
-from .postprocess.dataexport import export_to_csv
-from .postprocess.plotter import plot_simulated_results
+from .postprocess.dataexport import (
+    export_to_csv,
+    export_results,
+    COMPONENT_INTERMEDIATE_VARNAMES,
+)
 from .simulator.dwf import DWFSimulator
-from .simulator.amm_baseflow import AMMBaseflowSimulator
+from .simulator.amm_baseflow import AMMBaseflowConfig, AMMBaseflowSimulator
 from .simulator.amm_rdii import (
+    AMMRDIIConfig,
     AMMRDIISimulator,
 )
+from .simulator.calculations import get_moving_avg_steps
+from .simulator.amm_ensemble import ENSEMBLE_COMPONENT_CLASSES
+from .simulator.amm_scenarios import (
+    SCENARIO_COMPONENT_CLASSES,
+    ScenarioResults,
+    get_summary_metrics,
+)
+from .simulator.feature_cache import FeatureCache
+from .simulator.parameter_layout import ParameterLayout
 from .simulator.config_override_functions import (
     override_components_to_include,
     override_component_params,
 )
+from .stats import RunStats
 from .timeseries.timeseries import (
-    setup_timeseries,
+    load_input_data,
     InputDataConfig,
 )
 
@@ -34,6 +53,32 @@ COMPONENT_CLASSES = {
     "rdii": AMMRDIISimulator,
 }
 
+# Storage policies for the arrays an AntecedentMoistureModel keeps; flow_only and float32 can be
+# combined as storage="flow_only+float32":
+#   full: float64 inputs, features, capture fractions and flows (default)
+#   flow_only: intermediates (features and capture fractions) are freed after each run, keeping
+#       only the input data and the component and total flows. Every run (and
+#       compile_parameters) then rebuilds all components and recomputes all of their features,
+#       so each run pays the full setup cost, and the peak memory during a run is still that
+#       of the intermediates.
+#   float32: the input data is loaded as float32, features are computed in float64 but stored
+#       in float32 (see FeatureCache), and the capture fractions and flows are float32 arrays
+#       from the start, so no float64 copy of the model is ever built.
+#       On spreadsheet_tab20 (peak flow 13.1 cfs) float32 flows are within 3e-6 cfs of full
+#       storage, while both are within 1.7e-3 cfs of the spreadsheet's flow (checked in
+#       tests/test_antecedent_moisture_model.py with bounds of 1e-5 and 2e-3 cfs).
+# After a run of spreadsheet_tab20-21 (baseflow and rdii), get_memory_usage is 2.3x (flow_only),
+# 2x (float32) and 4.7x (flow_only+float32) smaller than with full storage.
+STORAGE_POLICIES = ["full", "flow_only", "float32"]
+STORED_INTERMEDIATE_VARNAMES = COMPONENT_INTERMEDIATE_VARNAMES + [
+    "total_capture_fraction"
+]
+
+# run_window(warm_up_timesteps="auto") warms up over this many times the sum of a component's
+# half-lives (hydrograph + antecedent moisture), so the zero state at the start of the warm-up
+# has decayed to well below 1e-3 of its value by the start of the window
+WARM_UP_HALF_LIVES = 10
+
 
 class AntecedentMoistureModel:
     def __init__(
@@ -44,15 +89,42 @@ class AntecedentMoistureModel:
         components_to_include_override=None,
         params_to_override_labels=None,
         params_to_override_values=None,
+        storage: str = "full",
+        lazy_setup: bool = False,
+        sparse_precip: bool = False,
+        max_workers: int = 1,
+        collect_stats: bool = False,
+        trace_memory: bool = False,
     ) -> None:
+        storage_policies = set(storage.split("+"))
+        assert storage_policies <= set(STORAGE_POLICIES) and (
+            storage == "full" or "full" not in storage_policies
+        ), f"storage must be one of {STORAGE_POLICIES}, or flow_only+float32"
 
         self.input_path = input_path
+        self.storage = storage
+        self.storage_policies = storage_policies
+        # of the input data, features, capture fractions and flows
+        self.dtype = (
+            np.float32 if "float32" in storage_policies else np.float64
+        )
+        # precip is kept as a SparseTimeseries (see setup_timeseries)
+        self.sparse_precip = sparse_precip
+        # components are built and run in a pool of max_workers threads (see _map_components);
+        # None uses the ThreadPoolExecutor default
+        self.max_workers = max_workers
+        # per-stage and per-component timings (and tracemalloc peaks), see RunStats
+        self.stats = RunStats(collect_stats, trace_memory)
+        # timestep 0 of this model is timestep window_offset of the input data file (see run_window)
+        self.window_offset = 0
         self.input_data_config_file = input_data_config_file
 
         simulation_config_path = Path(input_path, simulation_config_file)
-        simulation_config_dict = yaml.safe_load(
-            open(simulation_config_path, "r")
-        )
+        with self.stats.stage("load_config"):
+            simulation_config_dict = yaml.safe_load(
+                open(simulation_config_path, "r")
+            )
+        self.simulation_config_dict = simulation_config_dict
 
         self.timestep = convert_units(
             simulation_config_dict["timestep_units"],
@@ -63,47 +135,212 @@ class AntecedentMoistureModel:
 
         self._load_timeseries()
 
-        self.component_labels = override_components_to_include(
-            components_to_include_override, simulation_config_dict
-        )
+        self.feature_cache = FeatureCache(stats=self.stats, dtype=self.dtype)
+        # see compile_parameters
+        self.parameter_layout = None
 
-        self.amm_components = []
-        self.num_amm_components = 0
-        for component in self.component_labels:
-            component_param_config_dict = simulation_config_dict["components"][
-                component
-            ]
-            component_param_config_dict = override_component_params(
-                component,
-                component_param_config_dict,
+        if lazy_setup:
+            # components (and their features) are built on the first run, or only over the
+            # windows passed to run_window
+            self._setup_components_args = (
+                components_to_include_override,
                 params_to_override_labels,
                 params_to_override_values,
             )
-            ComponentClass = COMPONENT_CLASSES[
-                component_param_config_dict["component_type"]
-            ]
-            amm = ComponentClass(
+            self.amm_components = None
+        else:
+            self.setup_components(
+                components_to_include_override,
+                params_to_override_labels,
+                params_to_override_values,
+            )
+
+    def setup_components(
+        self,
+        components_to_include_override=None,
+        params_to_override_labels=None,
+        params_to_override_values=None,
+    ) -> None:
+        """
+        (Re)build the components from the simulation config and the already loaded input data.
+        Moving averages and seasonal factors come from self.feature_cache, so rebuilding with
+        parameters that don't change a feature's window or sigmoid reuses the cached arrays.
+
+        Args:
+            components_to_include_override (List[str]): list of components to include
+            params_to_override_labels (List[str]): list of parameters to override, as <component_label>_<param>
+            params_to_override_values (List[float]): new values for the parameters
+        """
+        self._setup_components_args = (
+            components_to_include_override,
+            params_to_override_labels,
+            params_to_override_values,
+        )
+        self._intermediates_freed = False
+        # compiled against the previous components
+        self.parameter_layout = None
+        self.component_labels = override_components_to_include(
+            components_to_include_override, self.simulation_config_dict
+        )
+
+        with self.stats.stage("setup_components"):
+            self.amm_components = self._map_components(
+                self._build_component, self.component_labels
+            )
+        self.num_amm_components = len(self.amm_components)
+
+    def _build_component(self, component_label: str):
+        _, params_to_override_labels, params_to_override_values = (
+            self._setup_components_args
+        )
+        return self.build_component(
+            component_label,
+            params_to_override_labels,
+            params_to_override_values,
+        )
+
+    def build_component(
+        self,
+        component_label: str,
+        params_to_override_labels: List[str] = None,
+        params_to_override_values: List[float] = None,
+    ):
+        """
+        Build one component from the simulation config, with the given parameter overrides,
+        over this model's input data and feature cache. The model's own components are left
+        alone, so what-if components can be built and run concurrently (see server).
+        """
+        component_param_config_dict = self._get_component_config_dict(
+            component_label,
+            params_to_override_labels,
+            params_to_override_values,
+        )
+        component_type = component_param_config_dict["component_type"]
+        ComponentClass = COMPONENT_CLASSES[component_type]
+        # the phase of the DWF sine follows the timestep of the record
+        kwargs = (
+            {"timestep_offset": self.window_offset}
+            if component_type == "dwf"
+            else {}
+        )
+        # config validation, unit conversions and features (the features are also timed on
+        # their own, see FeatureCache)
+        with self.stats.stage("construct", component_label):
+            return ComponentClass(
                 component_param_config_dict,
                 self.input_data["precip"],
                 self.input_data["temperature"],
                 self.timestep,
+                feature_cache=self.feature_cache,
+                **kwargs,
             )
-            self.amm_components.append(amm)
-            self.num_amm_components += 1
 
-    def _load_timeseries(self) -> None:
-        input_data_config_dict = yaml.safe_load(
-            open(Path(self.input_path, self.input_data_config_file), "r")
+    def compile_parameters(
+        self, parameter_labels: List[str]
+    ) -> ParameterLayout:
+        """
+        Compile parameter_labels (as params_to_override_labels) against the model's components
+        for set_parameters, e.g. before an optimizer loop.
+
+        Returns:
+            ParameterLayout: see to_internal (config units to internal units, with bounds
+            checks) and get_vector (the current internal-unit values)
+        """
+        assert (
+            "flow_only" not in self.storage_policies
+        ), "storage='flow_only' rebuilds the components on every run"
+        if self.amm_components is None:
+            self.setup_components(*self._setup_components_args)
+        self.parameter_layout = ParameterLayout(
+            dict(zip(self.component_labels, self.amm_components)),
+            parameter_labels,
         )
-        self.input_data_config = InputDataConfig(**input_data_config_dict)
+        return self.parameter_layout
+
+    def set_parameters(self, parameter_vector: Sequence[float]) -> None:
+        """
+        Set the compiled parameters (see compile_parameters) to parameter_vector, in internal
+        units, for the next run. Unlike setup_components with overrides, the configs are not
+        validated and the components are not rebuilt: only the derived parameters and the
+        features that depend on the changed parameters are recomputed.
+        """
+        assert (
+            self.parameter_layout is not None
+        ), "compile_parameters has not been called since the last setup_components"
+        self.parameter_layout.set_parameters(parameter_vector)
 
-        self.input_data = setup_timeseries(
-            pd.read_csv(
-                Path(self.input_path, self.input_data_config.input_data_file),
-                skiprows=self.input_data_config.skip_rows,
+    def _map_components(self, function, items: Sequence) -> List:
+        """
+        [function(item) for item in items], in a pool of self.max_workers threads if > 1.
+        Components are independent given the inputs, and their work (moving averages, lfilter,
+        numpy ufuncs) mostly releases the GIL, so threads run them on several cores.
+        """
+        if self.max_workers == 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, items))
+
+    def _get_component_config_dict(
+        self,
+        component_label: str,
+        params_to_override_labels: List[str] = None,
+        params_to_override_values: List[float] = None,
+    ) -> Dict:
+        """component config from the simulation config, with the parameter overrides applied"""
+        return override_component_params(
+            component_label,
+            copy.deepcopy(
+                self.simulation_config_dict["components"][component_label]
             ),
+            params_to_override_labels,
+            params_to_override_values,
+        )
+
+    def _free_intermediates(self) -> None:
+        for component in self.amm_components:
+            for var in STORED_INTERMEDIATE_VARNAMES:
+                if hasattr(component, var):
+                    setattr(component, var, None)
+        self.feature_cache.clear()
+        self._intermediates_freed = True
+
+    def _check_intermediates(self) -> None:
+        assert self.amm_components is not None, "model has not been run"
+        assert (
+            not self._intermediates_freed
+        ), "intermediates are not kept with storage='flow_only'"
+
+    def get_memory_usage(self) -> int:
+        """
+        Bytes held in the input data, component and flow arrays (shared arrays counted once)
+        """
+        arrays = list(self.input_data.values()) + [getattr(self, "flow", None)]
+        for component in self.amm_components or []:
+            arrays += [
+                getattr(component, var, None)
+                for var in STORED_INTERMEDIATE_VARNAMES + ["flow"]
+            ]
+        unique_arrays = {
+            id(a): a
+            for a in arrays
+            if isinstance(a, (np.ndarray, SparseTimeseries))
+        }
+        return sum(a.nbytes for a in unique_arrays.values())
+
+    def _load_timeseries(self) -> None:
+        with self.stats.stage("load_config"):
+            input_data_config_dict = yaml.safe_load(
+                open(Path(self.input_path, self.input_data_config_file), "r")
+            )
+            self.input_data_config = InputDataConfig(**input_data_config_dict)
+
+        self.input_data = load_input_data(
+            Path(self.input_path, self.input_data_config.input_data_file),
             self.input_data_config,
-            self.timestep,
+            convert_units(INTERNAL_UNITS_TIME, "HOURS", self.timestep),
+            dtype=self.dtype,
+            sparse_precip=self.sparse_precip,
+            stats=self.stats,
         )
         self.num_timesteps_input_data = len(self.input_data["timestamp"])
 
@@ -129,44 +366,452 @@ class AntecedentMoistureModel:
                     flow (float): value of flow on timestep = (starting_timestep - 1)
             num_timesteps_to_run (int): number of timesteps (integer index) to simulate forward from starting_timestep
         """
+        if self.amm_components is None or self._intermediates_freed:
+            self.setup_components(*self._setup_components_args)
 
-        self.flow = np.zeros(self.num_timesteps_input_data)
-        for component_label, component in zip(
-            self.component_labels, self.amm_components
-        ):
+        self.flow = np.zeros(
+            self.num_timesteps_input_data,
+            dtype=self.dtype,
+        )
+
+        def run_component(i):
             if initial_conditions is not None:
                 component_initial_conditions = initial_conditions.get(
-                    component_label, None
+                    self.component_labels[i], None
                 )
             else:
                 component_initial_conditions = None
-            component.run(
-                starting_timestep,
-                component_initial_conditions,
-                num_timesteps_to_run,
+            with self.stats.stage("run", self.component_labels[i]):
+                self.amm_components[i].run(
+                    starting_timestep,
+                    component_initial_conditions,
+                    num_timesteps_to_run,
+                )
+
+        with self.stats.stage("run"):
+            self._map_components(run_component, range(self.num_amm_components))
+            # summed in component order once all have run, so the total does not depend on
+            # max_workers
+            for component in self.amm_components:
+                self.flow += component.flow
+
+        if "flow_only" in self.storage_policies:
+            self._free_intermediates()
+
+    def run_window(
+        self,
+        starting_timestep: int,
+        num_timesteps_to_run: int,
+        initial_conditions: Dict[str, float] = None,
+        warm_up_timesteps="auto",
+    ):
+        """
+        Simulate a window of the record, building the components (moving averages, seasonal
+        factors, ...) only over the window, its warm-up and the longest moving-average window
+        before it, so the cost is O(window) rather than O(record). Best combined with
+        lazy_setup=True, which skips building the components over the whole record.
+
+        The simulation starts warm_up_timesteps before starting_timestep, with initial_conditions
+        (see run) on the timestep before the warm-up, or zero states if None. Without initial
+        conditions, warm_up_timesteps="auto" derives the warm-up from the half-lives (see
+        WARM_UP_HALF_LIVES); with initial conditions it defaults to no warm-up.
+
+        Args:
+            starting_timestep (int): first timestep of the window (>= 1)
+            num_timesteps_to_run (int): number of timesteps in the window
+            initial_conditions: Dict, see run
+            warm_up_timesteps: int, or "auto"
+
+        Returns:
+            AntecedentMoistureModel: model over the sliced input data, with the same components
+            and storage. Its timestep t is timestep t + window_offset of this model, so the
+            window is flow[starting_timestep - window_offset:][:num_timesteps_to_run].
+        """
+        end_timestep = starting_timestep + num_timesteps_to_run
+        assert starting_timestep > 0
+        assert end_timestep <= self.num_timesteps_input_data
+
+        if warm_up_timesteps == "auto":
+            if initial_conditions is None:
+                _, half_life_times = self._get_window_requirements()
+                warm_up_timesteps = math.ceil(
+                    WARM_UP_HALF_LIVES * half_life_times / self.timestep
+                )
+            else:
+                warm_up_timesteps = 0
+        simulation_start = max(starting_timestep - warm_up_timesteps, 1)
+
+        window_model = self.get_window_model(
+            simulation_start, end_timestep, *self._setup_components_args
+        )
+        window_model.run(
+            simulation_start - window_model.window_offset,
+            initial_conditions,
+            end_timestep - simulation_start,
+        )
+        return window_model
+
+    def get_window_model(
+        self,
+        simulation_start: int,
+        end_timestep: int,
+        components_to_include_override=None,
+        params_to_override_labels=None,
+        params_to_override_values=None,
+    ):
+        """
+        A lazily set up model over the part of the input data that a simulation of timesteps
+        simulation_start..end_timestep - 1 needs with the given overrides: from the longest
+        moving-average window before simulation_start (so the features on the timestep before
+        it are complete) to end_timestep. Its components are built on its first run (see
+        run_window), or one by one with build_component (see server), with a feature cache of
+        its own. Its timestep t is timestep t + window_offset of this model.
+        """
+        window_model = copy.copy(self)
+        window_model._setup_components_args = (
+            components_to_include_override,
+            params_to_override_labels,
+            params_to_override_values,
+        )
+        window_model.amm_components = None
+        window_model.parameter_layout = None
+
+        moving_avg_steps, _ = window_model._get_window_requirements()
+        window_start = max(simulation_start - 1 - moving_avg_steps, 0)
+        # moving averages need more timesteps than their window (see get_moving_avg_backward)
+        window_end = min(
+            max(end_timestep, window_start + moving_avg_steps + 1),
+            self.num_timesteps_input_data,
+        )
+        window_model.window_offset = self.window_offset + window_start
+        window_model.input_data = {
+            k: v[window_start:window_end] for k, v in self.input_data.items()
+        }
+        window_model.num_timesteps_input_data = window_end - window_start
+        window_model.feature_cache = FeatureCache(
+            stats=self.stats, dtype=self.dtype
+        )
+        return window_model
+
+    def _get_window_requirements(self):
+        """
+        Longest moving-average window (timesteps) and longest sum of half-lives (SECONDS) over
+        the baseflow and rdii components, from their configs.
+        """
+        moving_avg_steps = 0
+        half_life_times = 0.0
+        for component_label in override_components_to_include(
+            self._setup_components_args[0], self.simulation_config_dict
+        ):
+            component_config_dict = self._get_component_config_dict(
+                component_label, *self._setup_components_args[1:]
             )
-            self.flow += component.flow
+            component_type = component_config_dict["component_type"]
+            if component_type not in ["baseflow", "rdii"]:
+                continue
+            ConfigClass = (
+                AMMRDIIConfig
+                if component_type == "rdii"
+                else AMMBaseflowConfig
+            )
+            component_config = ConfigClass(
+                **component_config_dict["parameterization"]
+            )
+            times = [
+                component_config.precip_averaging_time,
+                component_config.temperature_averaging_time,
+                component_config.hydrograph_half_life_time,
+            ]
+            if component_type == "rdii":
+                times.append(
+                    component_config.antecedent_moisture_half_life_time
+                )
+            times = [
+                convert_units(
+                    component_config.time_parameter_units,
+                    INTERNAL_UNITS_TIME,
+                    t,
+                )
+                for t in times
+            ]
+            moving_avg_steps = max(
+                moving_avg_steps,
+                get_moving_avg_steps(times[0], self.timestep),
+                get_moving_avg_steps(times[1], self.timestep),
+            )
+            half_life_times = max(half_life_times, sum(times[2:]))
+        return moving_avg_steps, half_life_times
+
+    def run_ensemble(
+        self,
+        component_label: str,
+        parameter_table: Mapping[str, Sequence[float]],
+        starting_timestep: int = 1,
+        initial_conditions: Dict[str, float] = None,
+        num_timesteps_to_run: int = None,
+    ):
+        """
+        Simulate one baseflow or rdii component for N_params parameter sets in a single
+        vectorized pass, reusing the input data already loaded by this model.
+
+        Args:
+            component_label (str): label of the component in the simulation config file
+            parameter_table: parameter name -> N_params values (dict or pandas DataFrame).
+                Parameters not in the table keep their value from the simulation config.
+            starting_timestep (int): index/timestep to start simulation
+            initial_conditions: Dict
+                total_capture_fraction (float or np.ndarray of length N_params): value on timestep = (starting_timestep - 1)
+                flow (float or np.ndarray of length N_params): value on timestep = (starting_timestep - 1)
+            num_timesteps_to_run (int): number of timesteps (integer index) to simulate forward from starting_timestep
+
+        Returns:
+            AMMBaseflowEnsembleSimulator or AMMRDIIEnsembleSimulator, with (N_params x T)
+            flow and total_capture_fraction arrays
+        """
+        component_config_dict = self.simulation_config_dict["components"][
+            component_label
+        ]
+        EnsembleClass = ENSEMBLE_COMPONENT_CLASSES[
+            component_config_dict["component_type"]
+        ]
+        ensemble = EnsembleClass(
+            component_config_dict,
+            parameter_table,
+            self.input_data["precip"],
+            self.input_data["temperature"],
+            self.timestep,
+            feature_cache=self.feature_cache,
+        )
+        ensemble.run(
+            starting_timestep, initial_conditions, num_timesteps_to_run
+        )
+        return ensemble
+
+    def run_scenarios(
+        self,
+        precip_scenarios,
+        temperature=None,
+        temperature_offset: int = 0,
+        precip_units: str = "INCHES",
+        temperature_units: str = "FAHRENHEIT",
+        initial_conditions: Dict[str, Dict] = None,
+        components_to_include_override: List[str] = None,
+        scenario_labels: Sequence = None,
+        batch_size: int = 256,
+        return_flow: bool = False,
+    ) -> ScenarioResults:
+        """
+        Simulate the baseflow and rdii components for a stack of precipitation scenarios (e.g.
+        design storms of several return periods, durations and antecedent conditions), with
+        this model's (calibrated) parameters, as batched (N_scenarios x T) simulations.
+
+        Only peak flow, volume and time to peak are kept for each scenario unless return_flow
+        is set, so memory grows with batch_size x T rather than N_scenarios x T. DWF components
+        are not simulated (their flow does not depend on precip).
+
+        Args:
+            precip_scenarios: (N_scenarios x T) precip on the model's timestep, in precip_units.
+                Precip before timestep 0 is taken as zero, and timestep 0 holds the initial
+                conditions and is not simulated. Time to peak is counted from each
+                scenario's first wet timestep.
+            temperature: None for the model's temperature, float (constant), 1D (shared) or
+                2D (one row per scenario), in temperature_units. The features of a shared
+                temperature (moving average, seasonal hydrologic condition factor) are
+                computed once; with 2D temperature, once per distinct row.
+            temperature_offset (int): timestep t of the scenarios is timestep
+                temperature_offset + t of temperature, e.g. of the model's record
+                (temperature=None). Moving averages take temperature before its first
+                timestep as zero, so it should start at least a moving-average window before
+                the scenarios (a float temperature is constant over that window too).
+            initial_conditions: Dict, see run; values can be floats or arrays of N_scenarios
+            components_to_include_override (List[str]): baseflow/rdii components to simulate
+                (defaults to those of the model)
+            scenario_labels: index of the summary (defaults to 0..N_scenarios-1)
+            batch_size (int): scenarios simulated at once
+            return_flow (bool): also return the (N_scenarios x T) flows
+
+        Returns:
+            ScenarioResults
+        """
+        precip_scenarios = convert_units(
+            precip_units,
+            INTERNAL_UNITS_PRECIP,
+            np.atleast_2d(np.asarray(precip_scenarios, dtype=float)),
+        )
+        num_scenarios, num_timesteps = precip_scenarios.shape
+        if temperature is None:
+            temperature = self.input_data["temperature"]
+            feature_cache = self.feature_cache
+        else:
+            temperature = convert_units(
+                temperature_units,
+                INTERNAL_UNITS_TEMPERATURE,
+                np.asarray(temperature, dtype=float),
+            )
+            if temperature.ndim == 0:
+                # with a full moving-average window of history, so the averages are constant too
+                moving_avg_steps, _ = self._get_window_requirements()
+                temperature = np.full(
+                    moving_avg_steps + num_timesteps, float(temperature)
+                )
+                temperature_offset = moving_avg_steps
+            # the model's cache holds the features of the model's temperature
+            feature_cache = FeatureCache(stats=self.stats)
+
+        if components_to_include_override is None:
+            component_labels = [
+                component_label
+                for component_label in override_components_to_include(
+                    self._setup_components_args[0], self.simulation_config_dict
+                )
+                if self._get_component_config_dict(component_label)[
+                    "component_type"
+                ]
+                in SCENARIO_COMPONENT_CLASSES
+            ]
+        else:
+            component_labels = override_components_to_include(
+                components_to_include_override, self.simulation_config_dict
+            )
+        component_config_dicts = [
+            self._get_component_config_dict(
+                component_label, *self._setup_components_args[1:]
+            )
+            for component_label in component_labels
+        ]
+        # first wet timestep of each scenario (0 if dry)
+        storm_start_timesteps = np.argmax(precip_scenarios > 0, axis=1)
+
+        metrics = []
+        flows = []
+        with self.stats.stage("run_scenarios"):
+            for batch_start in range(0, num_scenarios, batch_size):
+                rows = slice(batch_start, batch_start + batch_size)
+                batch_flows = {"total": 0.0}
+                for component_label, component_config_dict in zip(
+                    component_labels, component_config_dicts
+                ):
+                    ScenarioClass = SCENARIO_COMPONENT_CLASSES[
+                        component_config_dict["component_type"]
+                    ]
+                    component = ScenarioClass(
+                        component_config_dict,
+                        precip_scenarios[rows],
+                        (
+                            temperature
+                            if temperature.ndim == 1
+                            else temperature[rows]
+                        ),
+                        self.timestep,
+                        feature_cache=feature_cache,
+                        temperature_offset=temperature_offset,
+                    )
+                    component.run(
+                        1,
+                        _get_scenario_rows(
+                            (initial_conditions or {}).get(component_label),
+                            rows,
+                        ),
+                    )
+                    batch_flows[component_label] = component.flow
+                    # summed in component order, like run
+                    batch_flows["total"] = (
+                        batch_flows["total"] + component.flow
+                    )
+
+                batch_metrics = get_summary_metrics(
+                    batch_flows["total"],
+                    self.timestep,
+                    storm_start_timesteps[rows],
+                )
+                for component_label in component_labels:
+                    batch_metrics.update(
+                        get_summary_metrics(
+                            batch_flows[component_label],
+                            self.timestep,
+                            storm_start_timesteps[rows],
+                            prefix=f"{component_label}_",
+                        )
+                    )
+                metrics.append(batch_metrics)
+                if return_flow:
+                    flows.append(batch_flows)
+
+        return ScenarioResults(
+            {k: np.concatenate([m[k] for m in metrics]) for k in metrics[0]},
+            (
+                range(num_scenarios)
+                if scenario_labels is None
+                else scenario_labels
+            ),
+            component_labels,
+            (
+                {k: np.concatenate([f[k] for f in flows]) for k in flows[0]}
+                if return_flow
+                else None
+            ),
+        )
 
     def plot_results(
-        self, figure_filename: str = "results.png", zoom_indices=None
+        self,
+        figure_filename: str = "results.png",
+        zoom_indices=None,
+        plot_every: int = 1,
     ) -> None:
-        plot_simulated_results(
-            self.component_labels,
-            self.input_data,
-            self.amm_components,
-            self.flow,
-            figure_filename,
-            zoom_indices=zoom_indices,
-        )
+        """
+        Plot precip, total capture fractions and flows. plot_every > 1 plots every plot_every-th
+        timestep only, which keeps plots of long high-resolution records fast.
+        """
+        # matplotlib is only imported when plotting
+        from .postprocess.plotter import plot_simulated_results
+
+        self._check_intermediates()
+        with self.stats.stage("plot"):
+            plot_simulated_results(
+                self.component_labels,
+                self.input_data,
+                self.amm_components,
+                self.flow,
+                figure_filename,
+                zoom_indices=zoom_indices,
+                plot_every=plot_every,
+            )
 
     def export_to_csv(self, export_filename: str = "results.csv") -> None:
-        export_to_csv(
-            self.component_labels,
-            self.input_data,
-            self.amm_components,
-            self.flow,
-            export_filename,
-        )
+        self._check_intermediates()
+        with self.stats.stage("export"):
+            export_to_csv(
+                self.component_labels,
+                self.input_data,
+                self.amm_components,
+                self.flow,
+                export_filename,
+            )
+
+    def export_results(
+        self,
+        export_filename: str = "results.csv",
+        file_format: str = None,
+        columns: str = "default",
+        float32: bool = False,
+    ) -> None:
+        """
+        Export results as csv, parquet, feather or npz (see postprocess.dataexport.export_results).
+        With storage="flow_only", only columns="flow" can be exported.
+        """
+        if columns != "flow":
+            self._check_intermediates()
+        with self.stats.stage("export"):
+            export_results(
+                self.component_labels,
+                self.input_data,
+                self.amm_components,
+                self.flow,
+                export_filename,
+                file_format=file_format,
+                columns=columns,
+                float32=float32,
+            )
 
 
 def run_multicomponent_antecedent_moisture_model(
@@ -177,15 +822,53 @@ def run_multicomponent_antecedent_moisture_model(
     figure_filename: str = None,
     zoom_indices: List[int] = None,
     export_filename: str = None,
+    storage: str = "full",
+    max_workers: int = 1,
+    collect_stats: bool = False,
+    export_format: str = None,
+    export_columns: str = None,
+    export_float32: bool = False,
+    plot_every: int = 1,
 ) -> AntecedentMoistureModel:
-
-    mcamm = AntecedentMoistureModel(input_path)
+    """
+    Run a site directory (laid out like data/noisy_example) and optionally plot and export the
+    results into it. export_format, export_columns and export_float32 are passed on to
+    export_results; the columns default to "flow" with flow_only storage, "default" otherwise.
+    The export format follows the file suffix (.csv, .parquet, .feather or .npz) unless given.
+    """
+    mcamm = AntecedentMoistureModel(
+        input_path,
+        storage=storage,
+        max_workers=max_workers,
+        collect_stats=collect_stats,
+    )
 
     mcamm.run(starting_timestep, initial_conditions, num_timesteps_to_run)
 
     if figure_filename is not None:
-        mcamm.plot_results(Path(input_path, figure_filename), zoom_indices)
+        mcamm.plot_results(
+            Path(input_path, figure_filename), zoom_indices, plot_every
+        )
     if export_filename is not None:
-        mcamm.export_to_csv(Path(input_path, export_filename))
+        if export_columns is None:
+            export_columns = (
+                "flow" if "flow_only" in mcamm.storage_policies else "default"
+            )
+        mcamm.export_results(
+            Path(input_path, export_filename),
+            file_format=export_format,
+            columns=export_columns,
+            float32=export_float32,
+        )
 
     return mcamm
+
+
+def _get_scenario_rows(initial_conditions: Dict, rows: slice) -> Dict:
+    """initial conditions of a batch of scenarios (values are floats or per-scenario arrays)"""
+    if initial_conditions is None:
+        return None
+    return {
+        k: np.asarray(v)[rows] if np.ndim(v) > 0 else v
+        for k, v in initial_conditions.items()
+    }
@@ -0,0 +1,236 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .objectives import LOSS_FUNCTIONS
+from ..simulator.parameter_layout import ParameterLayout
+
+
+class CalibrationResult:
+    """
+    Outcome of AMMCalibrator.optimize() or AMMCalibrator.sample()
+
+    Attributes:
+        parameter_labels (List[str]): labels of the calibrated parameters
+        best_parameter_vector (np.ndarray): parameter vector with the lowest loss
+        best_loss (float): lowest loss found
+        parameter_vectors (np.ndarray): every evaluated parameter vector (num_trials x num_params)
+        losses (np.ndarray): loss of every evaluated parameter vector
+    """
+
+    def __init__(
+        self,
+        parameter_labels: List[str],
+        parameter_vectors: List[np.ndarray],
+        losses: List[float],
+    ) -> None:
+        self.parameter_labels = parameter_labels
+        self.parameter_vectors = np.array(parameter_vectors)
+        self.losses = np.array(losses)
+        best_trial = int(np.nanargmin(self.losses))
+        self.best_parameter_vector = self.parameter_vectors[best_trial]
+        self.best_loss = self.losses[best_trial]
+
+    @property
+    def best_parameters(self) -> Dict[str, float]:
+        return {
+            k: float(v)
+            for k, v in zip(self.parameter_labels, self.best_parameter_vector)
+        }
+
+
+class AMMCalibrator:
+    """
+    Calibrate component parameters of an AntecedentMoistureModel against its observed flow.
+
+    The model's input data, simulation config and feature cache are reused for every trial.
+    The components that own a calibrated parameter are built once, and a trial sets its
+    parameter vector on them (see ParameterLayout: no config validation, and only the
+    features that depend on the changed parameters are recomputed) and runs them. Components
+    without calibrated parameters are simulated once, and their flow is added to every trial.
+
+    Args:
+        model: AntecedentMoistureModel, loaded with has_flow_data=True
+        parameter_labels (List[str]): parameters to calibrate, as <component_label>_<param>
+            (the same labels as params_to_override_labels)
+        bounds (List[Tuple[float, float]]): (lower, upper) bound of each parameter, in config units
+        objective (str): key of LOSS_FUNCTIONS ("nse" minimizes 1 - NSE, "rmse" minimizes RMSE)
+        starting_timestep (int): index/timestep to start simulation, see AntecedentMoistureModel.run
+        initial_conditions: Dict, see AntecedentMoistureModel.run
+        num_timesteps_to_run (int): see AntecedentMoistureModel.run. The objective is evaluated
+            on the simulated window only.
+    """
+
+    def __init__(
+        self,
+        model,
+        parameter_labels: List[str],
+        bounds: List[Tuple[float, float]],
+        objective: str = "nse",
+        starting_timestep: int = 1,
+        initial_conditions: Dict = None,
+        num_timesteps_to_run: int = None,
+    ) -> None:
+        assert "flow" in model.input_data, "calibration needs observed flow"
+        assert len(parameter_labels) == len(bounds)
+
+        self.model = model
+        self.parameter_labels = list(parameter_labels)
+        self.bounds = np.array(bounds, dtype=float)
+        assert np.all(self.bounds[:, 0] <= self.bounds[:, 1])
+        self.loss_function = LOSS_FUNCTIONS[objective]
+        self.starting_timestep = starting_timestep
+        self.initial_conditions = initial_conditions
+        if num_timesteps_to_run is None:
+            num_timesteps_to_run = (
+                model.num_timesteps_input_data - starting_timestep
+            )
+        self.num_timesteps_to_run = num_timesteps_to_run
+        self.end_timestep = starting_timestep + num_timesteps_to_run
+
+        self.observed_flow = model.input_data["flow"][
+            starting_timestep : self.end_timestep
+        ]
+
+        model.run(starting_timestep, initial_conditions, num_timesteps_to_run)
+        self._calibrated_component_labels = []
+        for k in self.parameter_labels:
+            component_label = self._get_component_label(k)
+            if component_label not in self._calibrated_component_labels:
+                self._calibrated_component_labels.append(component_label)
+        self._fixed_flow = np.zeros(num_timesteps_to_run)
+        for component_label, component in zip(
+            model.component_labels, model.amm_components
+        ):
+            if component_label not in self._calibrated_component_labels:
+                self._fixed_flow += component.flow[
+                    starting_timestep : self.end_timestep
+                ]
+
+        # trials set their parameter vector on these components (see ParameterLayout) rather
+        # than building new ones
+        self._components = {
+            component_label: model.build_component(component_label)
+            for component_label in self._calibrated_component_labels
+        }
+        self.parameter_layout = ParameterLayout(
+            self._components, self.parameter_labels
+        )
+
+        self.parameter_vectors = []
+        self.losses = []
+
+    def _get_component_label(self, parameter_label: str) -> str:
+        # longest label first, so that rdii_fast_catchment_area goes to rdii_fast, not rdii
+        for component_label in sorted(
+            self.model.component_labels, key=len, reverse=True
+        ):
+            if parameter_label.startswith(f"{component_label}_"):
+                return component_label
+        raise KeyError(f"no component for parameter {parameter_label}")
+
+    def simulate(self, parameter_vector: Sequence[float]) -> np.ndarray:
+        """
+        Total flow over the calibration window for one parameter vector (in config units).
+        Trials reuse the same components, so they are not run concurrently.
+        """
+        self.parameter_layout.set_parameters(
+            self.parameter_layout.to_internal(parameter_vector)
+        )
+        flow = self._fixed_flow.copy()
+        for component_label, component in self._components.items():
+            if self.initial_conditions is not None:
+                component_initial_conditions = self.initial_conditions.get(
+                    component_label, None
+                )
+            else:
+                component_initial_conditions = None
+            component.run(
+                self.starting_timestep,
+                component_initial_conditions,
+                self.num_timesteps_to_run,
+            )
+            flow += component.flow[self.starting_timestep : self.end_timestep]
+        return flow
+
+    def evaluate(self, parameter_vector: Sequence[float]) -> float:
+        """
+        Loss for one parameter vector. Every evaluation is recorded for the CalibrationResult.
+        """
+        loss = float(
+            self.loss_function(
+                self.simulate(parameter_vector), self.observed_flow
+            )
+        )
+        self.parameter_vectors.append(np.array(parameter_vector, dtype=float))
+        self.losses.append(loss)
+        return loss
+
+    def optimize(
+        self,
+        parameter_vector_0: Sequence[float] = None,
+        method: str = "Nelder-Mead",
+        **minimize_kwargs,
+    ) -> CalibrationResult:
+        """
+        Minimize the loss with scipy.optimize.minimize, within self.bounds.
+
+        Args:
+            parameter_vector_0: starting point (defaults to the middle of the bounds)
+            method (str): any bounded scipy.optimize.minimize method (Nelder-Mead, Powell, L-BFGS-B, ...)
+            minimize_kwargs: passed on to scipy.optimize.minimize (e.g. options)
+        """
+        from scipy.optimize import minimize
+
+        if parameter_vector_0 is None:
+            parameter_vector_0 = self.bounds.mean(axis=1)
+        self.parameter_vectors = []
+        self.losses = []
+        minimize(
+            self.evaluate,
+            np.asarray(parameter_vector_0, dtype=float),
+            method=method,
+            bounds=self.bounds,
+            **minimize_kwargs,
+        )
+        return CalibrationResult(
+            self.parameter_labels, self.parameter_vectors, self.losses
+        )
+
+    def sample(
+        self, num_samples: int, method: str = "lhs", seed: int = None
+    ) -> CalibrationResult:
+        """
+        Evaluate the loss on num_samples parameter vectors drawn within self.bounds.
+
+        Args:
+            num_samples (int): number of parameter vectors
+            method (str): "lhs" (Latin hypercube) or "random" (uniform)
+            seed (int): random seed
+        """
+        num_params = len(self.parameter_labels)
+        if method == "lhs":
+            from scipy.stats import qmc
+
+            unit_samples = qmc.LatinHypercube(d=num_params, seed=seed).random(
+                num_samples
+            )
+        elif method == "random":
+            unit_samples = np.random.default_rng(seed).random(
+                (num_samples, num_params)
+            )
+        else:
+            raise ValueError(
+                f"method must be 'lhs' or 'random', not {method!r}"
+            )
+        samples = self.bounds[:, 0] + unit_samples * (
+            self.bounds[:, 1] - self.bounds[:, 0]
+        )
+
+        self.parameter_vectors = []
+        self.losses = []
+        for parameter_vector in samples:
+            self.evaluate(parameter_vector)
+        return CalibrationResult(
+            self.parameter_labels, self.parameter_vectors, self.losses
+        )
@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def get_nash_sutcliffe_efficiency(
+    simulated: np.ndarray, observed: np.ndarray
+) -> float:
+    """
+    Nash-Sutcliffe efficiency: 1 for a perfect fit, 0 for a fit no better than the observed mean.
+    """
+    return 1.0 - np.sum((simulated - observed) ** 2) / np.sum(
+        (observed - observed.mean()) ** 2
+    )
+
+
+def get_root_mean_square_error(
+    simulated: np.ndarray, observed: np.ndarray
+) -> float:
+    return np.sqrt(np.mean((simulated - observed) ** 2))
+
+
+# objective name -> function returning a loss to be minimized
+LOSS_FUNCTIONS = {
+    "nse": lambda simulated, observed: 1.0
+    - get_nash_sutcliffe_efficiency(simulated, observed),
+    "rmse": get_root_mean_square_error,
+}
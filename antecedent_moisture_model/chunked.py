@@ -0,0 +1,104 @@
+"""Chunked (out-of-core) simulation of long, high-resolution input records."""
+
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+import yaml
+
+from .datatypes.units import convert_units, INTERNAL_UNITS_TIME
+from .postprocess.dataexport import get_results_dataframe
+from .simulator.streaming import StreamingSimulation
+from .timeseries.timeseries import (
+    setup_timeseries,
+    get_read_csv_kwargs,
+    InputDataConfig,
+)
+
+
+def run_chunked_antecedent_moisture_model(
+    input_path: Path,
+    export_filename: str = "results.csv",
+    chunk_timesteps: int = 100000,
+    initial_conditions: Dict = None,
+    input_data_config_file: str = "input_data_config.yaml",
+    simulation_config_file: str = "simulation_config.yaml",
+    components_to_include_override: List[str] = None,
+) -> StreamingSimulation:
+    """
+    Simulate an input data file block by block, for records too long to hold in memory.
+
+    Each block of chunk_timesteps rows is read, prepared with setup_timeseries, pushed through a
+    StreamingSimulation (which carries the filter states and moving-average tails across block
+    boundaries) and appended to the export file, so peak memory depends on chunk_timesteps
+    rather than on record length. The last row of the previous block is prepended when
+    verifying each block's timestamps, so gaps at block boundaries are detected too.
+    Results match run_multicomponent_antecedent_moisture_model (starting_timestep=1) to
+    round-off in the moving averages, with the same columns as its export_to_csv.
+    The model timestep must equal the data timestep (blocks are not aggregated).
+
+    Args:
+        input_path: directory with the input data and config files
+        export_filename (str): results file (relative to input_path, or absolute)
+        chunk_timesteps (int): rows per block (> 1)
+        initial_conditions: Dict, see AntecedentMoistureModel.run (values on timestep 0)
+        input_data_config_file (str): input data config file in input_path
+        simulation_config_file (str): simulation config file in input_path
+        components_to_include_override (List[str]): list of components to include
+
+    Returns:
+        StreamingSimulation: state after the last block
+    """
+    assert chunk_timesteps > 1
+
+    simulation_config_dict = yaml.safe_load(
+        open(Path(input_path, simulation_config_file), "r")
+    )
+    input_data_config = InputDataConfig(
+        **yaml.safe_load(open(Path(input_path, input_data_config_file), "r"))
+    )
+    streaming_simulation = StreamingSimulation(
+        simulation_config_dict,
+        initial_conditions,
+        components_to_include_override,
+    )
+
+    export_path = Path(input_path, export_filename)
+    input_data_path = Path(input_path, input_data_config.input_data_file)
+    previous_row = None
+    # the pyarrow engine does not read in chunks
+    for chunk in pd.read_csv(
+        input_data_path,
+        chunksize=chunk_timesteps,
+        **get_read_csv_kwargs(input_data_path, input_data_config, "c"),
+    ):
+        is_first_chunk = previous_row is None
+        if not is_first_chunk:
+            chunk = pd.concat([previous_row, chunk])
+        previous_row = chunk.iloc[[-1]]
+
+        input_data = setup_timeseries(
+            chunk,
+            input_data_config,
+            convert_units(
+                INTERNAL_UNITS_TIME, "HOURS", streaming_simulation.timestep
+            ),
+            aggregate=False,
+        )
+        if not is_first_chunk:
+            input_data = {k: v[1:] for k, v in input_data.items()}
+
+        streaming_simulation.update(
+            input_data["precip"], input_data["temperature"]
+        )
+        get_results_dataframe(
+            streaming_simulation.component_labels,
+            input_data,
+            streaming_simulation.amm_components,
+            streaming_simulation.flow,
+        ).to_csv(
+            export_path,
+            mode="w" if is_first_chunk else "a",
+            header=is_first_chunk,
+        )
+    return streaming_simulation
@@ -0,0 +1,304 @@
+"""
+amm command line interface.
+
+    amm run SITE [options]             run one site directory
+    amm batch SITE... [--jobs N] ...   run many site directories (or globs) in parallel
+    amm serve SITE... [--port N]       serve what-if runs on warm models over HTTP (see server)
+
+run and batch write results and figures into the site directories and print a summary table; batch
+reports each site on stderr as soon as it finishes. The exit status is 1 if any site failed.
+The model modules are imported only after the arguments are parsed, so --help and argument
+errors return immediately.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+EXPORT_FORMAT_CHOICES = ["csv", "parquet", "feather", "npz", "columnar"]
+# see postprocess.dataexport.EXPORT_COLUMNS_OPTIONS and STORAGE_POLICIES
+EXPORT_COLUMNS_CHOICES = ["flow", "default", "all"]
+STORAGE_CHOICES = ["full", "float32", "flow_only", "flow_only+float32"]
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="amm", description="Run antecedent moisture models"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run one site directory")
+    run_parser.add_argument("site", help="site directory")
+    run_parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="threads building and running the components",
+    )
+    _add_run_arguments(run_parser)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="run many site directories in parallel"
+    )
+    batch_parser.add_argument(
+        "sites", nargs="+", help="site directories or globs"
+    )
+    batch_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="worker processes (default: number of CPUs)",
+    )
+    batch_parser.add_argument(
+        "--summary", default=None, help="summary csv path"
+    )
+    _add_run_arguments(batch_parser)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve what-if runs on warm models over local HTTP"
+    )
+    serve_parser.add_argument(
+        "sites", nargs="+", help="site directories or globs"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument(
+        "--preload",
+        action="store_true",
+        help="load every site before serving (default: on its first request)",
+    )
+    serve_parser.add_argument(
+        "--sparse-precip",
+        action="store_true",
+        help="keep precip as a SparseTimeseries",
+    )
+    return parser
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    simulation = parser.add_argument_group("simulation")
+    simulation.add_argument(
+        "--start",
+        type=int,
+        default=1,
+        help="first simulated timestep (default: 1)",
+    )
+    simulation.add_argument(
+        "--num-timesteps",
+        type=int,
+        default=None,
+        help="number of timesteps to simulate (default: to the end of the record)",
+    )
+    simulation.add_argument(
+        "--initial-conditions",
+        default=None,
+        help="JSON/YAML file or inline JSON, {component: {total_capture_fraction, flow}}",
+    )
+    simulation.add_argument(
+        "--storage", choices=STORAGE_CHOICES, default="full"
+    )
+
+    export = parser.add_argument_group("export")
+    export.add_argument(
+        "--export-filename",
+        default=None,
+        help="results file in the site directory (default: no export)",
+    )
+    export.add_argument(
+        "--format",
+        choices=EXPORT_FORMAT_CHOICES,
+        default=None,
+        help="export format (default: from the file suffix)",
+    )
+    export.add_argument(
+        "--columns",
+        choices=EXPORT_COLUMNS_CHOICES,
+        default=None,
+        help="exported columns (default: flow with flow_only storage, default otherwise)",
+    )
+    export.add_argument(
+        "--float32", action="store_true", help="export float32 columns"
+    )
+
+    plot = parser.add_argument_group("plot")
+    plot.add_argument(
+        "--figure-filename",
+        default=None,
+        help="figure file in the site directory (default: no plot)",
+    )
+    plot.add_argument("--no-plot", action="store_true", help="skip plotting")
+    plot.add_argument(
+        "--plot-every",
+        type=int,
+        default=1,
+        help="plot every N-th timestep only",
+    )
+    plot.add_argument(
+        "--zoom",
+        type=int,
+        nargs=2,
+        default=None,
+        metavar=("START", "END"),
+        help="timesteps of the plotted range",
+    )
+
+    stats = parser.add_argument_group("stats")
+    stats.add_argument(
+        "--stats",
+        action="store_true",
+        help="print per-stage timings (summed over the sites)",
+    )
+    stats.add_argument(
+        "--stats-json",
+        default=None,
+        help="json path for the per-site stage timings (see RunStats)",
+    )
+
+
+def get_run_kwargs(parsed_args: argparse.Namespace) -> Dict:
+    """keyword arguments of run_multicomponent_antecedent_moisture_model"""
+    return dict(
+        starting_timestep=parsed_args.start,
+        initial_conditions=load_initial_conditions(
+            parsed_args.initial_conditions
+        ),
+        num_timesteps_to_run=parsed_args.num_timesteps,
+        figure_filename=(
+            None if parsed_args.no_plot else parsed_args.figure_filename
+        ),
+        zoom_indices=parsed_args.zoom,
+        plot_every=parsed_args.plot_every,
+        export_filename=parsed_args.export_filename,
+        export_format=parsed_args.format,
+        export_columns=parsed_args.columns,
+        export_float32=parsed_args.float32,
+        storage=parsed_args.storage,
+        collect_stats=parsed_args.stats or parsed_args.stats_json is not None,
+    )
+
+
+def load_initial_conditions(initial_conditions: str = None) -> Dict:
+    """initial conditions from a JSON/YAML file, or parsed from the string itself"""
+    if initial_conditions is None:
+        return None
+    import yaml
+
+    if Path(initial_conditions).is_file():
+        initial_conditions = Path(initial_conditions).read_text()
+    return yaml.safe_load(initial_conditions)
+
+
+def format_stats(stats_dicts: List[Dict]) -> str:
+    """
+    Table of the stage seconds and calls (see RunStats.to_dict) summed over stats_dicts,
+    run-level stages first, then each component's.
+    """
+    totals = {}
+    for stats_dict in stats_dicts:
+        stages = [(None, k, v) for k, v in stats_dict["stages"].items()]
+        for component, component_stages in stats_dict["components"].items():
+            stages += [(component, k, v) for k, v in component_stages.items()]
+        for component, name, stage_stats in stages:
+            total = totals.setdefault((component, name), [0.0, 0])
+            total[0] += stage_stats["seconds"]
+            total[1] += stage_stats["calls"]
+    width = max([len(name) for _, name in totals] + [5])
+    lines = [
+        f"{'component':<16} {'stage':<{width}} {'seconds':>10} {'calls':>6}"
+    ]
+    for (component, name), (seconds, calls) in sorted(
+        totals.items(), key=lambda item: (item[0][0] is not None, item[0])
+    ):
+        lines.append(
+            f"{component or '':<16} {name:<{width}} {seconds:>10.3f} {calls:>6}"
+        )
+    return "\n".join(lines)
+
+
+def print_progress(summary: Dict, num_sites: int, num_done: List[int]) -> None:
+    num_done[0] += 1
+    line = (
+        f"[{num_done[0]}/{num_sites}] {summary['site']}: {summary['status']}"
+    )
+    if summary.get("runtime_seconds") is not None:
+        line += f" ({summary['runtime_seconds']:.2f} s)"
+    if summary["status"] != "ok":
+        line += f" {summary['error']}"
+    print(line, file=sys.stderr, flush=True)
+
+
+def serve(parsed_args: argparse.Namespace) -> int:
+    from .server import SimulationService, make_server
+
+    service = SimulationService(
+        parsed_args.sites,
+        preload=parsed_args.preload,
+        sparse_precip=parsed_args.sparse_precip,
+    )
+    server = make_server(service, parsed_args.host, parsed_args.port)
+    host, port = server.server_address[:2]
+    print(
+        f"serving {len(service.site_paths)} sites on http://{host}:{port}",
+        file=sys.stderr,
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(args: List[str] = None) -> int:
+    parsed_args = get_parser().parse_args(args)
+    if parsed_args.command == "serve":
+        return serve(parsed_args)
+    run_kwargs = get_run_kwargs(parsed_args)
+
+    import pandas as pd
+
+    from .fleet import get_site_paths, run_fleet, run_site
+
+    if parsed_args.command == "run":
+        summary_df = pd.DataFrame(
+            [
+                run_site(
+                    Path(parsed_args.site),
+                    max_workers=parsed_args.threads,
+                    **run_kwargs,
+                )
+            ]
+        )
+    else:
+        num_sites = len(get_site_paths(parsed_args.sites))
+        num_done = [0]
+        summary_df = run_fleet(
+            parsed_args.sites,
+            max_workers=parsed_args.jobs,
+            progress=lambda s: print_progress(s, num_sites, num_done),
+            **run_kwargs,
+        )
+
+    if parsed_args.stats_json is not None:
+        with open(parsed_args.stats_json, "w") as f:
+            json.dump(dict(zip(summary_df["site"], summary_df["stats"])), f)
+    stats_dicts = [s for s in summary_df["stats"] if s is not None]
+    summary_df = summary_df.drop(columns="stats")
+    if parsed_args.command == "batch" and parsed_args.summary is not None:
+        summary_df.to_csv(parsed_args.summary, index=False)
+    print(summary_df.to_string(index=False))
+    if parsed_args.stats:
+        print()
+        print(format_stats(stats_dicts))
+    if parsed_args.command == "run" and summary_df["status"].iloc[0] != "ok":
+        print(summary_df["error"].iloc[0], file=sys.stderr)
+    return int((summary_df["status"] != "ok").any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+from typing import Tuple
+
+import numpy as np
+
+
+class SparseTimeseries:
+    """
+    Compressed timeseries of one or more series (e.g. rain gauges) that are zero most of the
+    time, such as high-resolution precip.
+
+    Only the nonzero values are kept, in a CSR layout: series i has its values
+    values[indptr[i]:indptr[i + 1]] on the (sorted) timesteps indices[indptr[i]:indptr[i + 1]].
+    A 1D series (ndim == 1) is stored as a single row.
+
+    get_moving_avg_backward (and get_window_sums) accept a SparseTimeseries directly; other
+    consumers can get the dense array with to_dense() or np.asarray().
+
+    Args:
+        indptr (np.ndarray): num_series + 1 offsets into indices and values
+        indices (np.ndarray): timesteps of the nonzero values, sorted within each series
+        values (np.ndarray): nonzero values
+        num_timesteps (int): length of each series
+        ndim (int): 1 for a single series, 2 for (num_series x num_timesteps)
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        values: np.ndarray,
+        num_timesteps: int,
+        ndim: int = 2,
+    ) -> None:
+        assert ndim in [1, 2]
+        assert ndim == 2 or len(indptr) == 2
+        assert len(indices) == len(values) == indptr[-1]
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        self.values = np.asarray(values)
+        self.num_timesteps = int(num_timesteps)
+        self.ndim = ndim
+
+    @classmethod
+    def from_dense(cls, a: np.ndarray) -> "SparseTimeseries":
+        """SparseTimeseries of a 1D series or a (num_series x num_timesteps) array"""
+        a = np.asarray(a)
+        assert a.ndim in [1, 2]
+        a_2d = a.reshape(-1, a.shape[-1])
+        series, indices = np.nonzero(a_2d)
+        indptr = np.zeros(a_2d.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(series, minlength=a_2d.shape[0]), out=indptr[1:])
+        return cls(
+            indptr,
+            indices.astype(get_index_dtype(a.shape[-1])),
+            a_2d[series, indices],
+            a.shape[-1],
+            a.ndim,
+        )
+
+    @property
+    def num_series(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        if self.ndim == 1:
+            return (self.num_timesteps,)
+        return (self.num_series, self.num_timesteps)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.values.nbytes
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def get_series(self, series: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(timesteps, values) of the nonzero values of one series"""
+        start, end = self.indptr[series], self.indptr[series + 1]
+        return self.indices[start:end], self.values[start:end]
+
+    def to_dense(self, dtype: type = None) -> np.ndarray:
+        a = np.zeros(
+            (self.num_series, self.num_timesteps),
+            dtype=self.dtype if dtype is None else dtype,
+        )
+        series = np.repeat(np.arange(self.num_series), np.diff(self.indptr))
+        a[series, self.indices] = self.values
+        return a.reshape(self.shape)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.to_dense(dtype)
+
+    def slice_timesteps(self, start: int, end: int) -> "SparseTimeseries":
+        """timesteps start..end-1 of every series (like a[..., start:end])"""
+        start, end, _ = slice(start, end).indices(self.num_timesteps)
+        end = max(start, end)
+        indptr = np.zeros_like(self.indptr)
+        indices = []
+        values = []
+        for series in range(self.num_series):
+            series_indices, series_values = self.get_series(series)
+            window = np.searchsorted(series_indices, [start, end])
+            indices.append(series_indices[window[0] : window[1]] - start)
+            values.append(series_values[window[0] : window[1]])
+            indptr[series + 1] = indptr[series] + window[1] - window[0]
+        return SparseTimeseries(
+            indptr,
+            np.concatenate(indices).astype(self.indices.dtype),
+            np.concatenate(values).astype(self.dtype),
+            end - start,
+            self.ndim,
+        )
+
+    def __getitem__(self, key: slice) -> "SparseTimeseries":
+        """slices along the time axis of a 1D series, e.g. precip[window_start:window_end]"""
+        if (
+            self.ndim != 1
+            or not isinstance(key, slice)
+            or key.step not in [None, 1]
+        ):
+            raise IndexError(
+                "only time slices of 1D series are supported, see slice_timesteps"
+            )
+        return self.slice_timesteps(key.start, key.stop)
+
+
+def get_index_dtype(num_timesteps: int) -> type:
+    """smallest integer dtype for the timesteps of a series of num_timesteps"""
+    return np.int32 if num_timesteps <= np.iinfo(np.int32).max else np.int64
@@ -1,3 +1,5 @@
+import numpy as np
+
 INTERNAL_UNITS_TIME = "SECONDS"
 INTERNAL_UNITS_PRECIP = "FEET"
 INTERNAL_UNITS_TEMPERATURE = "FAHRENHEIT"
@@ -57,9 +59,18 @@ units_options_dict = {
 }
 
 
-def convert_units(starting_units, ending_units, starting_value):
+def convert_units(starting_units, ending_units, starting_value, out=None):
+    """
+    Convert starting_value (scalar or np.ndarray) from starting_units to ending_units.
+
+    If out (np.ndarray) is given, the result is written into out and out is returned, so that
+    out=starting_value converts an array in place without temporary arrays.
+    """
 
     if starting_units == ending_units:
+        if out is not None and out is not starting_value:
+            out[...] = starting_value
+            return out
         return starting_value
 
     for units_type, units_type_dict in units_options_dict.items():
@@ -68,8 +79,14 @@ def convert_units(starting_units, ending_units, starting_value):
     assert ending_units in units_type_dict
 
     if starting_units == "FAHRENHEIT" and ending_units == "CELSIUS":
+        if out is not None:
+            np.subtract(starting_value, 32, out=out)
+            return np.divide(out, 1.8, out=out)
         return (starting_value - 32) / 1.8
     elif starting_units == "CELSIUS" and ending_units == "FAHRENHEIT":
+        if out is not None:
+            np.multiply(1.8, starting_value, out=out)
+            return np.add(out, 32, out=out)
         return 1.8 * starting_value + 32
 
     elif (
@@ -92,4 +109,6 @@ def convert_units(starting_units, ending_units, starting_value):
     else:
         raise NotImplementedError
 
+    if out is not None:
+        return np.multiply(starting_value, multiplier, out=out)
     return starting_value * multiplier
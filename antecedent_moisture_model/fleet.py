@@ -0,0 +1,148 @@
+"""Run many sites (one input directory per flow meter) in parallel."""
+
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Union
+
+import pandas as pd
+
+from .antecedent_moisture_model import (
+    run_multicomponent_antecedent_moisture_model,
+)
+
+
+def get_site_paths(sites: Sequence[Union[str, Path]]) -> List[Path]:
+    """
+    Expand site directories and glob patterns (e.g. "data/*") into a list of
+    site paths. Glob patterns only expand to directories; sites given explicitly
+    are kept even if they don't exist, so that a run reports them as errors.
+    """
+    site_paths = []
+    for site in sites:
+        if glob.has_magic(str(site)):
+            site_paths += [
+                Path(m)
+                for m in sorted(glob.glob(str(site)))
+                if Path(m).is_dir()
+            ]
+        else:
+            site_paths.append(Path(site))
+    return site_paths
+
+
+def run_site(site_path: Path, **run_kwargs) -> Dict:
+    """
+    Run one site with run_multicomponent_antecedent_moisture_model and summarize it.
+    Exceptions are caught and reported in the summary instead of raised, so one bad site
+    does not stop a fleet run.
+
+    Returns:
+        Dict with site, status ("ok" or "error"), runtime_seconds, num_timesteps,
+        total_volume (total simulated flow volume, CUBICFEET), error and stats
+        (RunStats.to_dict() with collect_stats=True in run_kwargs, else None)
+    """
+    summary = {
+        "site": str(site_path),
+        "status": "ok",
+        "runtime_seconds": None,
+        "num_timesteps": None,
+        "total_volume": None,
+        "error": None,
+        "stats": None,
+    }
+    start_time = time.perf_counter()
+    try:
+        mcamm = run_multicomponent_antecedent_moisture_model(
+            site_path, **run_kwargs
+        )
+        summary["num_timesteps"] = mcamm.num_timesteps_input_data
+        summary["total_volume"] = float(mcamm.flow.sum() * mcamm.timestep)
+        if mcamm.stats.enabled:
+            summary["stats"] = mcamm.stats.to_dict()
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["runtime_seconds"] = time.perf_counter() - start_time
+    return summary
+
+
+def run_fleet(
+    sites: Sequence[Union[str, Path]],
+    max_workers: int = None,
+    progress: Callable[[Dict], None] = None,
+    **run_kwargs,
+) -> pd.DataFrame:
+    """
+    Run every site in a process pool and gather a summary table.
+
+    Args:
+        sites: site directories and/or glob patterns, each laid out like data/noisy_example
+        max_workers (int): number of worker processes (defaults to os.cpu_count()).
+            With max_workers=1 sites are run in this process.
+        progress: called with each site's summary as soon as the site finishes
+            (in completion order), e.g. to report progress of long fleet runs
+        run_kwargs: passed on to run_multicomponent_antecedent_moisture_model for every site
+            (e.g. export_filename, figure_filename, starting_timestep)
+
+    Returns:
+        pd.DataFrame: one row per site (see run_site), in the order of the sites
+    """
+    site_paths = get_site_paths(sites)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    if max_workers == 1 or len(site_paths) <= 1:
+        summaries = []
+        for p in site_paths:
+            summaries.append(run_site(p, **run_kwargs))
+            if progress is not None:
+                progress(summaries[-1])
+    else:
+        summaries = [None] * len(site_paths)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(run_site, p, **run_kwargs): i
+                for i, p in enumerate(site_paths)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    summaries[i] = future.result()
+                except Exception as e:
+                    # e.g. a worker killed by the OS (BrokenProcessPool)
+                    summaries[i] = {
+                        "site": str(site_paths[i]),
+                        "status": "error",
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+                if progress is not None:
+                    progress(summaries[i])
+
+    summary_df = pd.DataFrame(
+        summaries,
+        columns=[
+            "site",
+            "status",
+            "runtime_seconds",
+            "num_timesteps",
+            "total_volume",
+            "error",
+            "stats",
+        ],
+    )
+    return summary_df
+
+
+def main(args: List[str] = None) -> int:
+    """same as amm batch (see cli)"""
+    from .cli import main as cli_main
+
+    return cli_main(["batch"] + list(sys.argv[1:] if args is None else args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
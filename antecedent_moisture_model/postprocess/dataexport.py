@@ -11,6 +11,17 @@ from ..datatypes.units import (
 )
 from ..simulator.dwf import DWFSimulator
 
+EXPORT_FORMATS = ["csv", "parquet", "feather", "npz"]
+# flow: component & total flows; default: inputs, total capture fractions and flows
+# (the export_to_csv columns); all: default plus the intermediate variables of each component
+EXPORT_COLUMNS_OPTIONS = ["flow", "default", "all"]
+COMPONENT_INTERMEDIATE_VARNAMES = [
+    "moving_avg_precip",
+    "moving_avg_temperature",
+    "seasonal_hydro_condition_factor",
+    "addl_capture_fraction",
+]
+
 
 def export_to_csv(
     component_labels: List[str],
@@ -19,17 +30,139 @@ def export_to_csv(
     flow: np.ndarray,
     filename_path: Path,
 ) -> None:
+    results_df = get_results_dataframe(
+        component_labels, input_data, amm_components, flow
+    )
+    results_df.to_csv(filename_path)
+
+
+def export_results(
+    component_labels: List[str],
+    input_data: Dict[str, np.ndarray],
+    amm_components: List,
+    flow: np.ndarray,
+    filename_path: Path,
+    file_format: str = None,
+    columns: str = "default",
+    float32: bool = False,
+) -> None:
+    """
+    Export results in a text (csv) or binary columnar format.
+
+    Args:
+        component_labels, input_data, amm_components, flow: as in export_to_csv
+        filename_path: output file
+        file_format (str): "csv", "parquet", "feather" (both need pyarrow), "npz" (numpy only),
+            or "columnar" (parquet if pyarrow is installed, npz otherwise).
+            Defaults to the suffix of filename_path.
+        columns (str): one of EXPORT_COLUMNS_OPTIONS
+        float32 (bool): down-cast float columns to float32 (about 7 significant digits)
+
+    npz files hold one array per column plus "timestamp" (datetime64[ns]);
+    read_results reads any of the formats back into a DataFrame.
+    """
+    file_format = get_export_format(filename_path, file_format)
+    results_df = get_results_dataframe(
+        component_labels, input_data, amm_components, flow, columns
+    )
+    if float32:
+        results_df = results_df.astype(np.float32)
+
+    if file_format == "csv":
+        results_df.to_csv(filename_path)
+    elif file_format == "parquet":
+        _check_pyarrow(file_format)
+        results_df.to_parquet(filename_path)
+    elif file_format == "feather":
+        _check_pyarrow(file_format)
+        # feather does not store the index
+        results_df.reset_index().to_feather(filename_path)
+    elif file_format == "npz":
+        np.savez(
+            filename_path,
+            timestamp=np.asarray(results_df.index, dtype="datetime64[ns]"),
+            **{k: v.to_numpy() for k, v in results_df.items()},
+        )
+
+
+def read_results(filename_path: Path, file_format: str = None) -> pd.DataFrame:
+    """
+    Read a file written by export_results (or export_to_csv) into a DataFrame indexed by timestamp.
+    """
+    file_format = get_export_format(filename_path, file_format)
+    if file_format == "csv":
+        return pd.read_csv(filename_path, index_col=0, parse_dates=True)
+    elif file_format == "parquet":
+        return pd.read_parquet(filename_path)
+    elif file_format == "feather":
+        results_df = pd.read_feather(filename_path)
+        return results_df.set_index(results_df.columns[0])
+    with np.load(filename_path) as results_npz:
+        return pd.DataFrame(
+            {k: results_npz[k] for k in results_npz.files if k != "timestamp"},
+            index=pd.DatetimeIndex(results_npz["timestamp"]),
+        )
+
+
+def get_export_format(filename_path: Path, file_format: str = None) -> str:
+    if file_format is None:
+        file_format = Path(filename_path).suffix.lstrip(".").lower()
+    if file_format == "columnar":
+        file_format = "parquet" if _has_pyarrow() else "npz"
+    assert (
+        file_format in EXPORT_FORMATS
+    ), f"file_format must be one of {EXPORT_FORMATS}"
+    return file_format
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _check_pyarrow(file_format: str) -> None:
+    if not _has_pyarrow():
+        raise ImportError(
+            f"{file_format} export requires pyarrow; use file_format='npz' instead"
+        )
+
+
+def get_results_dataframe(
+    component_labels: List[str],
+    input_data: Dict[str, np.ndarray],
+    amm_components: List,
+    flow: np.ndarray,
+    columns: str = "default",
+) -> pd.DataFrame:
+    """
+    Inputs, per-component total capture fraction & flow, and total flow, indexed by timestamp.
+    See EXPORT_COLUMNS_OPTIONS for the column sets.
+    """
+    assert columns in EXPORT_COLUMNS_OPTIONS
     results_dict = {}
-    results_dict[f"precip_{INTERNAL_UNITS_PRECIP}"] = input_data["precip"]
-    results_dict[f"temperature_{INTERNAL_UNITS_TEMPERATURE}"] = input_data[
-        "temperature"
-    ]
+    if columns != "flow":
+        # dense also for a SparseTimeseries
+        results_dict[f"precip_{INTERNAL_UNITS_PRECIP}"] = np.asarray(
+            input_data["precip"]
+        )
+        results_dict[f"temperature_{INTERNAL_UNITS_TEMPERATURE}"] = input_data[
+            "temperature"
+        ]
     if "flow" in input_data:
         results_dict[f"observed_flow_{INTERNAL_UNITS_FLOW}"] = input_data[
             "flow"
         ]
     for component, component_label in zip(amm_components, component_labels):
-        if not isinstance(component, DWFSimulator):
+        if columns == "all":
+            for var in COMPONENT_INTERMEDIATE_VARNAMES:
+                if hasattr(component, var):
+                    results_dict[f"{component_label}_{var}"] = (
+                        component.__getattribute__(var)
+                    )
+        if columns != "flow" and not isinstance(component, DWFSimulator):
             results_dict[f"{component_label}_total_capture_fraction"] = (
                 component.total_capture_fraction
             )
@@ -37,5 +170,4 @@ def export_to_csv(
             component.flow
         )
     results_dict[f"total_flow_{INTERNAL_UNITS_FLOW}"] = flow
-    results_df = pd.DataFrame(results_dict, index=input_data["timestamp"])
-    results_df.to_csv(filename_path)
+    return pd.DataFrame(results_dict, index=input_data["timestamp"])
@@ -14,14 +14,23 @@ def plot_simulated_results(
     flow: np.ndarray,
     figure_path: Path,
     zoom_indices: List[int] = None,
+    plot_every: int = 1,
 ):
+    """
+    Three panels (precip, total capture fractions, flows) saved to figure_path. With
+    plot_every > 1 only every plot_every-th timestep is drawn (zoom_indices still index the
+    full record).
+    """
+    assert plot_every >= 1
+    timestamp = input_data["timestamp"]
+    decimated = slice(None, None, plot_every)
     fig, axs = plt.subplots(3, 1, figsize=(6, 8))
     colors = ["k", "0.5", "goldenrod", "firebrick", "cornflowerblue"]
     flow_labels = ["observed", "amm total"]
     ax = axs[0]
     ax.plot(
-        input_data["timestamp"],
-        input_data["precip"],
+        timestamp[decimated],
+        np.asarray(input_data["precip"])[decimated],
         color=colors[0],
     )
     ax.set_ylabel("Precipitation (in)")
@@ -29,8 +38,8 @@ def plot_simulated_results(
     for ic, component in enumerate(amm_components):
         if not isinstance(component, DWFSimulator):
             ax.plot(
-                input_data["timestamp"],
-                component.total_capture_fraction,
+                timestamp[decimated],
+                component.total_capture_fraction[decimated],
                 color=colors[ic + 2],
                 label=component_labels[ic],
             )
@@ -38,23 +47,23 @@ def plot_simulated_results(
     ax.legend()
     ax = axs[2]
     ax.plot(
-        input_data["timestamp"],
-        input_data["flow"],
+        timestamp[decimated],
+        input_data["flow"][decimated],
         color=colors[0],
         label=flow_labels[0],
         zorder=1,
     )
     ax.plot(
-        input_data["timestamp"],
-        flow,
+        timestamp[decimated],
+        flow[decimated],
         color=colors[1],
         label=flow_labels[1],
         zorder=1,
     )
     for ic, component in enumerate(amm_components):
         ax.plot(
-            input_data["timestamp"],
-            component.flow,
+            timestamp[decimated],
+            component.flow[decimated],
             color=colors[ic + 2],
             label=component_labels[ic],
             alpha=0.8,
@@ -65,11 +74,13 @@ def plot_simulated_results(
         for ax in axs:
             ax.set_xlim(
                 [
-                    input_data["timestamp"][zoom_indices[0]],
-                    input_data["timestamp"][zoom_indices[1]],
+                    timestamp[zoom_indices[0]],
+                    timestamp[zoom_indices[1]],
                 ]
             )
 
     ax.legend()
     ax.set_ylabel("Flow (cfs)")
     plt.savefig(figure_path, bbox_inches="tight", dpi=300)
+    # many sites may be plotted in one process (see fleet)
+    plt.close(fig)
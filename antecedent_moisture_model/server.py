@@ -0,0 +1,291 @@
+"""
+Local HTTP service for what-if runs on warm models.
+
+Each site's AntecedentMoistureModel (input data, configs and feature cache) is loaded once and
+kept in memory, so a request only builds and runs its components over the requested window:
+
+    GET  /health    {"status": "ok"}
+    GET  /sites     {"sites": {site: loaded}}
+    POST /run       JSON run request (see SimulationService.simulate), e.g.
+                    {"site": "meter_12", "params": {"rdii_catchment_area": 3500},
+                     "starting_timestep": 8000, "num_timesteps": 720, "encoding": "npy"}
+
+Runs answer with JSON ({"columns", "flow", ...}) or, with "encoding": "npy", an .npy array
+(num_columns x num_timesteps, float64) with the metadata in X-AMM-* headers. Errors answer
+with status 400 (bad request) or 404 (unknown site) and {"error": message}.
+Requests are served concurrently in threads. The server has no authentication, so bind it
+to localhost (the default).
+"""
+
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from .antecedent_moisture_model import AntecedentMoistureModel
+from .datatypes.units import INTERNAL_UNITS_FLOW
+from .fleet import get_site_paths
+from .simulator.parameter_layout import ParameterLayout
+from .simulator.config_override_functions import override_components_to_include
+
+RUN_ENCODINGS = ["json", "npy"]
+
+
+class SiteNotFoundError(KeyError):
+    pass
+
+
+class SimulationService:
+    """
+    Warm AntecedentMoistureModel instances keyed by site (the site directory name).
+
+    Models are loaded on their first request (or all at once with preload), once per site
+    even if several requests ask for it concurrently, and are shared by all later requests.
+    simulate builds new components with the requested parameter overrides over the part of the
+    model's input data that the request's window needs (see
+    AntecedentMoistureModel.get_window_model), so concurrent requests do not touch each other's
+    components, and a request costs O(window) rather than O(record).
+
+    Args:
+        sites: site directories and/or glob patterns, each laid out like data/noisy_example
+        preload (bool): load every site (and simulate it once) before serving
+        model_kwargs: passed on to AntecedentMoistureModel (e.g. sparse_precip); storage is
+            always "full", since the other storage policies drop the cached features
+    """
+
+    def __init__(
+        self,
+        sites: Sequence[Union[str, Path]],
+        preload: bool = False,
+        **model_kwargs,
+    ) -> None:
+        self.site_paths = {p.name: p for p in get_site_paths(sites)}
+        self.model_kwargs = model_kwargs
+        self._models = {}
+        self._lock = threading.Lock()
+        self._site_locks = {}
+        if preload:
+            for site in self.site_paths:
+                self.get_model(site)
+
+    def get_model(self, site: str) -> AntecedentMoistureModel:
+        if site not in self.site_paths:
+            raise SiteNotFoundError(site)
+        with self._lock:
+            if site in self._models:
+                return self._models[site]
+            site_lock = self._site_locks.setdefault(site, threading.Lock())
+        with site_lock:
+            # loaded by another thread while this one waited for site_lock
+            if site not in self._models:
+                model = AntecedentMoistureModel(
+                    self.site_paths[site], storage="full", **self.model_kwargs
+                )
+                # also imports and warms up the simulation code
+                model.run()
+                with self._lock:
+                    self._models[site] = model
+        return self._models[site]
+
+    def get_sites(self) -> Dict[str, bool]:
+        """{site: whether its model is loaded}"""
+        with self._lock:
+            return {site: site in self._models for site in self.site_paths}
+
+    def simulate(
+        self,
+        site: str,
+        params: Dict[str, float] = None,
+        starting_timestep: int = 1,
+        num_timesteps: int = None,
+        initial_conditions: Dict = None,
+        components: List[str] = None,
+        warm_up_timesteps: int = 0,
+    ) -> Dict:
+        """
+        Simulate a window of a site's record with parameter overrides.
+
+        Args:
+            site (str): site name
+            params: {<component_label>_<param>: value} overrides of the simulation config
+            starting_timestep (int): first timestep of the window (>= 1)
+            num_timesteps (int): timesteps in the window (default: to the end of the record)
+            initial_conditions: Dict, see AntecedentMoistureModel.run (values on the timestep
+                before the warm-up)
+            components (List[str]): components to include (default: components_to_use)
+            warm_up_timesteps (int): the simulation starts this many timesteps before the
+                window (at timestep 1 at the earliest), see AntecedentMoistureModel.run_window
+
+        Returns:
+            Dict:
+                columns (List[str]): "total" and the component labels
+                flow (np.ndarray): num_columns x num_timesteps, INTERNAL_UNITS_FLOW
+                starting_timestep, start_time (ISO timestamp of the first timestep),
+                timestep_seconds
+        """
+        model = self.get_model(site)
+        if num_timesteps is None:
+            num_timesteps = model.num_timesteps_input_data - starting_timestep
+        end_timestep = starting_timestep + num_timesteps
+        if not (
+            1 <= starting_timestep < end_timestep
+            and end_timestep <= model.num_timesteps_input_data
+            and warm_up_timesteps >= 0
+        ):
+            raise ValueError(
+                f"window {starting_timestep}..{end_timestep - 1} is not within timesteps "
+                f"1..{model.num_timesteps_input_data - 1}"
+            )
+        simulation_start = max(starting_timestep - warm_up_timesteps, 1)
+
+        component_labels = override_components_to_include(
+            components, model.simulation_config_dict
+        )
+        params = params or {}
+        # the components are built over the window and its warm-up only, so a request costs
+        # O(window) rather than O(record)
+        window_model = model.get_window_model(
+            simulation_start,
+            end_timestep,
+            components,
+            list(params),
+            list(params.values()),
+        )
+        window_components = [
+            window_model.build_component(
+                component_label, list(params), list(params.values())
+            )
+            for component_label in component_labels
+        ]
+        try:
+            # overrides of parameters that no component has (e.g. misspelled) are errors
+            ParameterLayout(
+                dict(zip(component_labels, window_components)), list(params)
+            )
+        except KeyError as e:
+            raise ValueError(e.args[0])
+
+        offset = window_model.window_offset
+        flow = np.zeros((len(component_labels) + 1, num_timesteps))
+        for i, (component_label, component) in enumerate(
+            zip(component_labels, window_components)
+        ):
+            component.run(
+                simulation_start - offset,
+                (initial_conditions or {}).get(component_label, None),
+                end_timestep - simulation_start,
+            )
+            flow[i + 1] = component.flow[
+                starting_timestep - offset : end_timestep - offset
+            ]
+        # summed in component order, like AntecedentMoistureModel.run
+        for component_flow in flow[1:]:
+            flow[0] += component_flow
+
+        return {
+            "columns": ["total"] + component_labels,
+            "flow": flow,
+            "starting_timestep": starting_timestep,
+            "start_time": model.input_data["timestamp"][
+                starting_timestep
+            ].isoformat(),
+            "timestep_seconds": model.timestep,
+        }
+
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    # set by make_server
+    service: SimulationService = None
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json({"status": "ok"})
+        elif self.path == "/sites":
+            self._send_json({"sites": self.service.get_sites()})
+        else:
+            self._send_json({"error": f"not found: {self.path}"}, 404)
+
+    def do_POST(self) -> None:
+        if self.path != "/run":
+            self._send_json({"error": f"not found: {self.path}"}, 404)
+            return
+        try:
+            run_request = json.loads(
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            )
+            encoding = run_request.pop("encoding", "json")
+            if encoding not in RUN_ENCODINGS:
+                raise ValueError(f"encoding must be one of {RUN_ENCODINGS}")
+            results = self.service.simulate(**run_request)
+        except SiteNotFoundError as e:
+            self._send_json({"error": f"unknown site: {e.args[0]}"}, 404)
+            return
+        except Exception as e:
+            # bad JSON, unknown arguments, invalid parameter values, ...
+            self._send_json({"error": f"{type(e).__name__}: {e}"}, 400)
+            return
+
+        if encoding == "npy":
+            buffer = io.BytesIO()
+            np.save(buffer, results["flow"])
+            self._send(
+                buffer.getvalue(),
+                "application/octet-stream",
+                {
+                    "X-AMM-Columns": ",".join(results["columns"]),
+                    "X-AMM-Starting-Timestep": str(
+                        results["starting_timestep"]
+                    ),
+                    "X-AMM-Start-Time": results["start_time"],
+                    "X-AMM-Timestep-Seconds": str(results["timestep_seconds"]),
+                    "X-AMM-Flow-Units": INTERNAL_UNITS_FLOW,
+                },
+            )
+        else:
+            results["flow"] = dict(
+                zip(results["columns"], results["flow"].tolist())
+            )
+            results["flow_units"] = INTERNAL_UNITS_FLOW
+            self._send_json(results)
+
+    def _send_json(self, content: Dict, status: int = 200) -> None:
+        self._send(
+            json.dumps(content).encode(), "application/json", status=status
+        )
+
+    def _send(
+        self,
+        body: bytes,
+        content_type: str,
+        headers: Dict[str, str] = None,
+        status: int = 200,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # no line per request on stderr
+        pass
+
+
+def make_server(
+    service: SimulationService, host: str = "127.0.0.1", port: int = 8765
+) -> ThreadingHTTPServer:
+    """threaded HTTP server for service (port=0 picks a free port, see server_address)"""
+    handler = type(
+        "BoundSimulationRequestHandler",
+        (SimulationRequestHandler,),
+        {"service": service},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
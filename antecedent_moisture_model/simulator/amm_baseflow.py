@@ -1,12 +1,18 @@
-from typing import Dict
+from typing import Dict, Mapping
 
 import numpy as np
 from pydantic import BaseModel, PositiveFloat, confloat, field_validator
 
 from .calculations import (
+    get_difference_equation_sum,
+    get_event_difference_equation_simulation,
+    get_events_scattered,
     get_moving_avg_backward,
+    get_moving_avg_steps,
+    get_seasonal_hydro_condition_factor,
     get_vectorized_difference_equation_simulation,
 )
+from .feature_cache import FeatureCache
 from ..datatypes.units import (
     convert_units,
     units_options_dict,
@@ -61,17 +67,44 @@ class AMMBaseflowConfig(BaseModel):
 
 
 class AMMBaseflowSimulator:
+    # numeric parameters -> (config field with their units, internal units), None if unitless
+    PARAMETER_UNITS = {
+        "catchment_area": ("catchment_area_units", INTERNAL_UNITS_AREA),
+        "hydrograph_half_life_time": (
+            "time_parameter_units",
+            INTERNAL_UNITS_TIME,
+        ),
+        "dry_weather_capture_fraction": None,
+        "precip_averaging_time": ("time_parameter_units", INTERNAL_UNITS_TIME),
+        "temperature_averaging_time": (
+            "time_parameter_units",
+            INTERNAL_UNITS_TIME,
+        ),
+        "cold_temperature": (
+            "temperature_parameter_units",
+            INTERNAL_UNITS_TEMPERATURE,
+        ),
+        "addl_capture_fraction_cold": None,
+        "hot_temperature": (
+            "temperature_parameter_units",
+            INTERNAL_UNITS_TEMPERATURE,
+        ),
+        "addl_capture_fraction_hot": None,
+    }
+
     def __init__(
         self,
         component_config_dict: Dict,
         precip: np.ndarray,
         temperature: np.ndarray,
         timestep: float,
+        feature_cache: FeatureCache = None,
     ) -> None:
 
         self.precip = precip
         self.temperature = temperature
         self.timestep = timestep
+        self.feature_cache = feature_cache
 
         self.num_timesteps_input_data = len(precip)
 
@@ -115,6 +148,15 @@ class AMMBaseflowSimulator:
             INTERNAL_UNITS_TEMPERATURE,
             self.component_config.hot_temperature_corrected,
         )
+        # as given, before cold and hot are sorted (see set_parameters)
+        self._temperature_parameters = {
+            k: convert_units(
+                self.component_config.temperature_parameter_units,
+                INTERNAL_UNITS_TEMPERATURE,
+                getattr(self.component_config, k),
+            )
+            for k in ["cold_temperature", "hot_temperature"]
+        }
         self.dry_weather_capture_fraction = (
             self.component_config.dry_weather_capture_fraction
         )
@@ -130,14 +172,37 @@ class AMMBaseflowSimulator:
         This precomputes all parameters, moving averages, etc,
         that are not part of core simulation
         """
+        self._get_derived_parameters_baseflow()
+
+        self.moving_avg_precip = self._get_moving_avg(
+            "precip", self.moving_avg_steps_precip
+        )
+        self.moving_avg_temperature = self._get_moving_avg(
+            "temperature", self.moving_avg_steps_temperature
+        )
+        self.seasonal_hydro_condition_factor = (
+            self._get_seasonal_hydro_condition_factor()
+        )
+
+        # in the dtype of the features (see FeatureCache)
+        self.total_capture_fraction = np.zeros_like(
+            self.seasonal_hydro_condition_factor
+        )
+        self.flow = np.zeros_like(self.seasonal_hydro_condition_factor)
+
+    def _get_derived_parameters_baseflow(self) -> None:
+        """
+        Parameters derived from the unit converted parameters and the timestep
+        (independent of the input data)
+        """
         self.shape_factor = 0.5 ** (
             self.timestep / self.hydrograph_half_life_time
         )
-        self.moving_avg_steps_precip = (
-            int(self.precip_averaging_time / self.timestep) + 1
+        self.moving_avg_steps_precip = get_moving_avg_steps(
+            self.precip_averaging_time, self.timestep
         )
-        self.moving_avg_steps_temperature = (
-            int(self.temperature_averaging_time / self.timestep) + 1
+        self.moving_avg_steps_temperature = get_moving_avg_steps(
+            self.temperature_averaging_time, self.timestep
         )
         self.time_to_peak = self.precip_averaging_time + self.timestep
         self.sigmoid_max = 1.2 * (
@@ -150,30 +215,88 @@ class AMMBaseflowSimulator:
             self.cold_temperature + self.hot_temperature
         ) / 2
 
-        self.moving_avg_precip = get_moving_avg_backward(
-            self.precip, self.moving_avg_steps_precip
+    def get_parameters(self) -> Dict[str, float]:
+        """current values of the PARAMETER_UNITS parameters, in internal units"""
+        return dict(
+            {k: getattr(self, k) for k in self.PARAMETER_UNITS},
+            **self._temperature_parameters,
         )
-        self.moving_avg_temperature = get_moving_avg_backward(
-            self.temperature, self.moving_avg_steps_temperature
-        )
-        self.seasonal_hydro_condition_factor = (
-            self.sigmoid_max
-            / (
-                1
-                + np.exp(
-                    -self.sigmoid_steepness
-                    * (self.moving_avg_temperature - self.sigmoid_midpoint)
-                )
+
+    def set_parameters(self, parameters: Mapping[str, float]) -> None:
+        """
+        Fast path for new parameter values on a built component (e.g. between calibration
+        trials, see ParameterLayout): parameters (in internal units, see PARAMETER_UNITS) are
+        set without config validation or unit conversion. The derived parameters are
+        recomputed, but the features only if their window or sigmoid parameters changed.
+        Simulated variables keep their values until the next run.
+        """
+        for k in parameters:
+            assert k in self.PARAMETER_UNITS, f"unknown parameter {k}"
+        moving_avg_steps_precip = self.moving_avg_steps_precip
+        seasonal_parameters = self._get_seasonal_parameters()
+
+        for k, v in parameters.items():
+            if k in self._temperature_parameters:
+                self._temperature_parameters[k] = v
+            else:
+                setattr(self, k, v)
+        # as cold_temperature_corrected and hot_temperature_corrected of the config
+        temperatures = self._temperature_parameters.values()
+        self.cold_temperature = min(temperatures)
+        self.hot_temperature = max(temperatures)
+        self._get_derived_parameters_baseflow()
+
+        if self.moving_avg_steps_precip != moving_avg_steps_precip:
+            self.moving_avg_precip = self._get_moving_avg(
+                "precip", self.moving_avg_steps_precip
             )
-            + self.addl_capture_fraction_cold
-            - (11 / 12) * self.sigmoid_max
+        if self.moving_avg_steps_temperature != seasonal_parameters[0]:
+            self.moving_avg_temperature = self._get_moving_avg(
+                "temperature", self.moving_avg_steps_temperature
+            )
+        if self._get_seasonal_parameters() != seasonal_parameters:
+            self.seasonal_hydro_condition_factor = (
+                self._get_seasonal_hydro_condition_factor()
+            )
+
+    def _get_seasonal_parameters(self) -> tuple:
+        """what the seasonal hydrologic condition factor depends on"""
+        return (
+            self.moving_avg_steps_temperature,
+            self.sigmoid_max,
+            self.sigmoid_steepness,
+            self.sigmoid_midpoint,
+            self.addl_capture_fraction_cold,
         )
-        self.seasonal_hydro_condition_factor = np.maximum(
-            self.seasonal_hydro_condition_factor, 0
+
+    def _get_moving_avg(
+        self, varname: str, moving_avg_steps: int
+    ) -> np.ndarray:
+        """backward moving average of input variable varname ("precip" or "temperature")"""
+        a = self.__getattribute__(varname)
+        if self.feature_cache is None:
+            return get_moving_avg_backward(a, moving_avg_steps)
+        return self.feature_cache.get_moving_avg_backward(
+            varname, a, moving_avg_steps
         )
 
-        self.total_capture_fraction = np.zeros(self.num_timesteps_input_data)
-        self.flow = np.zeros(self.num_timesteps_input_data)
+    def _get_seasonal_hydro_condition_factor(self) -> np.ndarray:
+        if self.feature_cache is None:
+            return get_seasonal_hydro_condition_factor(
+                self.moving_avg_temperature,
+                self.sigmoid_max,
+                self.sigmoid_steepness,
+                self.sigmoid_midpoint,
+                self.addl_capture_fraction_cold,
+            )
+        return self.feature_cache.get_seasonal_hydro_condition_factor(
+            self.moving_avg_steps_temperature,
+            self.moving_avg_temperature,
+            self.sigmoid_max,
+            self.sigmoid_steepness,
+            self.sigmoid_midpoint,
+            self.addl_capture_fraction_cold,
+        )
 
     def run(
         self,
@@ -230,10 +353,10 @@ class AMMBaseflowSimulator:
             # if initial conditions aren't given, total capture fraction & flow will have initialized values of zero
             pass
         else:
-            self.total_capture_fraction[starting_timestep - 1] = max(
-                initial_conditions["total_capture_fraction"], 0.0
+            self.total_capture_fraction[..., starting_timestep - 1] = (
+                np.maximum(initial_conditions["total_capture_fraction"], 0.0)
             )
-            self.flow[starting_timestep - 1] = max(
+            self.flow[..., starting_timestep - 1] = np.maximum(
                 initial_conditions["flow"], 0.0
             )
 
@@ -241,39 +364,206 @@ class AMMBaseflowSimulator:
         self,
         starting_timestep: int,
         num_timesteps_to_run: int,
+    ) -> None:
+        self._simulate_total_capture_fraction_baseflow(
+            starting_timestep, num_timesteps_to_run
+        )
+        end_timestep = starting_timestep + num_timesteps_to_run
+
+        flow_additive_component = (
+            (self.catchment_area)
+            * (1 - self.shape_factor)
+            / (self.timestep)
+            * self.total_capture_fraction[..., starting_timestep:end_timestep]
+            * self.moving_avg_precip[..., starting_timestep:end_timestep]
+        )
+        self.flow[..., starting_timestep:end_timestep] = np.maximum(
+            get_vectorized_difference_equation_simulation(
+                additive_component=flow_additive_component,
+                multiplier_for_simulated_variable_tminus1=self.shape_factor,
+                simulated_variable_t0=self.flow[..., starting_timestep - 1],
+            ),
+            0.0,
+        )
+
+    def _simulate_total_capture_fraction_baseflow(
+        self,
+        starting_timestep: int,
+        num_timesteps_to_run: int,
     ) -> None:
         # total capture fraction (RW_t): for baseflow this uses SHCF directly instead of additional_capture_fraction
         movavg2_start = starting_timestep - 1
         movavg2_end = starting_timestep + num_timesteps_to_run
         seasonal_hydro_condition_factor_movavg2 = get_moving_avg_backward(
-            self.seasonal_hydro_condition_factor[movavg2_start:movavg2_end],
+            self.seasonal_hydro_condition_factor[
+                ..., movavg2_start:movavg2_end
+            ],
             2,
             0,
         )
         end_timestep = starting_timestep + num_timesteps_to_run
-        self.total_capture_fraction[starting_timestep:end_timestep] = (
+        self.total_capture_fraction[..., starting_timestep:end_timestep] = (
             np.minimum(
                 np.maximum(
                     self.dry_weather_capture_fraction
-                    + seasonal_hydro_condition_factor_movavg2[1:],
+                    + seasonal_hydro_condition_factor_movavg2[..., 1:],
                     0.0,
                 ),
                 1.0,
             )
         )
 
-        flow_additive_component = (
+    def run_event_driven(
+        self,
+        starting_timestep: int = 1,
+        initial_conditions: Dict[str, float] = None,
+        num_timesteps_to_run: int = None,
+        fill_dry_timesteps: bool = True,
+    ) -> None:
+        """
+        Event-driven alternative to run() (same arguments), for 1D components.
+
+        Flow (and for rdii, the additional capture fraction) only has input on wet timesteps,
+        where the moving average precip is nonzero; in dry spells the recursions are geometric
+        decays. Here they are evaluated on the wet timesteps only and jump across dry spells
+        in closed form (see get_event_difference_equation_simulation), so the cost grows with
+        the number of wet timesteps rather than with the window length.
+
+        After the run, flow_total is the sum of flow over the window and flow_peak its maximum.
+        With fill_dry_timesteps=False only these are computed, in O(wet timesteps), and the
+        component arrays are not updated (e.g. for volume or peak metrics). With True the
+        additive components are computed on the wet timesteps only and scattered into the
+        window for one lfilter pass, giving the same arrays as run().
+        """
+        if num_timesteps_to_run == 0:
+            return
+
+        assert starting_timestep > 0
+        assert self.flow.ndim == 1, "event-driven runs are for 1D components"
+
+        if num_timesteps_to_run is None:
+            num_timesteps_to_run = self.num_timesteps_input_data - 1
+        assert (
+            starting_timestep + num_timesteps_to_run
+            <= self.num_timesteps_input_data
+        )
+
+        self._set_initial_conditions(starting_timestep, initial_conditions)
+        event_timesteps = self._get_event_timesteps(
+            starting_timestep, num_timesteps_to_run
+        )
+        total_capture_fraction_events = (
+            self._simulate_total_capture_fraction_events(
+                starting_timestep,
+                num_timesteps_to_run,
+                event_timesteps,
+                fill_dry_timesteps,
+            )
+        )
+        self._simulate_flow_events(
+            starting_timestep,
+            num_timesteps_to_run,
+            event_timesteps,
+            total_capture_fraction_events,
+            fill_dry_timesteps,
+        )
+
+    def _get_event_timesteps(
+        self, starting_timestep: int, num_timesteps_to_run: int
+    ) -> np.ndarray:
+        """wet timesteps (nonzero moving average precip) in the window, relative to starting_timestep"""
+        if self.feature_cache is None:
+            wet_timesteps = np.flatnonzero(self.moving_avg_precip)
+        else:
+            wet_timesteps = (
+                self.feature_cache.get_moving_avg_nonzero_timesteps(
+                    "precip", self.precip, self.moving_avg_steps_precip
+                )
+            )
+        window = np.searchsorted(
+            wet_timesteps,
+            [starting_timestep, starting_timestep + num_timesteps_to_run],
+        )
+        return wet_timesteps[window[0] : window[1]] - starting_timestep
+
+    def _simulate_total_capture_fraction_events(
+        self,
+        starting_timestep: int,
+        num_timesteps_to_run: int,
+        event_timesteps: np.ndarray,
+        fill_dry_timesteps: bool,
+    ) -> np.ndarray:
+        """total capture fraction on event_timesteps (and on the whole window if fill_dry_timesteps)"""
+        if fill_dry_timesteps:
+            self._simulate_total_capture_fraction_baseflow(
+                starting_timestep, num_timesteps_to_run
+            )
+            return self.total_capture_fraction[
+                event_timesteps + starting_timestep
+            ]
+        # same operations as the 2-step moving average in _simulate_total_capture_fraction_baseflow
+        timesteps = event_timesteps + starting_timestep
+        return np.minimum(
+            np.maximum(
+                self.dry_weather_capture_fraction
+                + (
+                    self.seasonal_hydro_condition_factor[timesteps - 1]
+                    + self.seasonal_hydro_condition_factor[timesteps]
+                )
+                / 2,
+                0.0,
+            ),
+            1.0,
+        )
+
+    def _simulate_flow_events(
+        self,
+        starting_timestep: int,
+        num_timesteps_to_run: int,
+        event_timesteps: np.ndarray,
+        total_capture_fraction_events: np.ndarray,
+        fill_dry_timesteps: bool,
+    ) -> None:
+        end_timestep = starting_timestep + num_timesteps_to_run
+        # same operations as in _simulate_amm_baseflow, on the events only
+        flow_additive_component_events = (
             (self.catchment_area)
             * (1 - self.shape_factor)
             / (self.timestep)
-            * self.total_capture_fraction[starting_timestep:end_timestep]
-            * self.moving_avg_precip[starting_timestep:end_timestep]
+            * total_capture_fraction_events
+            * self.moving_avg_precip[event_timesteps + starting_timestep]
         )
-        self.flow[starting_timestep:end_timestep] = np.maximum(
-            get_vectorized_difference_equation_simulation(
-                additive_component=flow_additive_component,
-                multiplier_for_simulated_variable_tminus1=self.shape_factor,
-                simulated_variable_t0=self.flow[starting_timestep - 1],
-            ),
-            0.0,
+        if fill_dry_timesteps:
+            # the additive component is exactly zero off the events, so this matches run()
+            self.flow[starting_timestep:end_timestep] = np.maximum(
+                get_vectorized_difference_equation_simulation(
+                    additive_component=get_events_scattered(
+                        event_timesteps,
+                        flow_additive_component_events,
+                        num_timesteps_to_run,
+                    ),
+                    multiplier_for_simulated_variable_tminus1=self.shape_factor,
+                    simulated_variable_t0=self.flow[starting_timestep - 1],
+                ),
+                0.0,
+            )
+            self.flow_total = self.flow[starting_timestep:end_timestep].sum()
+            self.flow_peak = self.flow[starting_timestep:end_timestep].max()
+            return
+
+        flow_t0 = self.flow[starting_timestep - 1]
+        flow_events = get_event_difference_equation_simulation(
+            event_timesteps,
+            flow_additive_component_events,
+            self.shape_factor,
+            flow_t0,
+        )
+        self.flow_total = get_difference_equation_sum(
+            event_timesteps,
+            flow_events,
+            self.shape_factor,
+            flow_t0,
+            num_timesteps_to_run,
         )
+        # flow decays between events, so its peak is on an event or on the first timestep
+        self.flow_peak = max(np.max(flow_events, initial=0.0), flow_t0)
@@ -0,0 +1,246 @@
+from typing import Dict, List, Mapping, Sequence, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from .amm_baseflow import AMMBaseflowConfig, AMMBaseflowSimulator
+from .amm_rdii import AMMRDIIConfig, AMMRDIISimulator
+from .calculations import (
+    get_moving_avg_backward,
+    get_seasonal_hydro_condition_factor,
+)
+from .feature_cache import FeatureCache
+
+
+class StackedComponentConfig:
+    """
+    Column-wise view of one validated component config per ensemble member.
+
+    Numeric parameters are stored as (N_params, 1) arrays so that the unit conversions and
+    derived parameters of the single-run simulators broadcast against (N_params x T) arrays.
+    Units (str fields) must be shared by all members.
+    """
+
+    def __init__(self, component_configs: List[BaseModel]) -> None:
+        assert len(component_configs) > 0
+        self.num_ensemble_members = len(component_configs)
+        for field in type(component_configs[0]).model_fields:
+            values = [c.__getattribute__(field) for c in component_configs]
+            if isinstance(values[0], str):
+                assert len(set(values)) == 1, f"{field} must be shared"
+                self.__setattr__(field, values[0])
+            else:
+                self.__setattr__(
+                    field, np.array(values, dtype=float)[:, np.newaxis]
+                )
+
+    @property
+    def cold_temperature_corrected(self) -> np.ndarray:
+        return np.minimum(self.cold_temperature, self.hot_temperature)
+
+    @property
+    def hot_temperature_corrected(self) -> np.ndarray:
+        return np.maximum(self.cold_temperature, self.hot_temperature)
+
+
+def get_stacked_component_config(
+    config_class: Type[BaseModel],
+    component_config_dict: Dict,
+    parameter_table: Mapping[str, Sequence[float]],
+) -> StackedComponentConfig:
+    """
+    Validate one config per row of parameter_table and stack them.
+
+    Args:
+        config_class: AMMBaseflowConfig or AMMRDIIConfig
+        component_config_dict: component entry from simulation config. Its parameterization
+            gives the values for any parameter not in parameter_table.
+        parameter_table: parameter name -> sequence of N_params values (dict or pandas DataFrame),
+            in the units given by the parameterization (e.g. time_parameter_units)
+    """
+    parameter_columns = {
+        k: np.ravel(np.asarray(v, dtype=float))
+        for k, v in dict(parameter_table).items()
+    }
+    assert len(parameter_columns) > 0
+    num_ensemble_members = len(next(iter(parameter_columns.values())))
+    for k, v in parameter_columns.items():
+        assert k in config_class.model_fields, f"unknown parameter {k}"
+        assert len(v) == num_ensemble_members
+
+    component_configs = []
+    for i in range(num_ensemble_members):
+        parameterization = dict(component_config_dict["parameterization"])
+        for k, v in parameter_columns.items():
+            parameterization[k] = v[i]
+        component_configs.append(config_class(**parameterization))
+    return StackedComponentConfig(component_configs)
+
+
+class AMMBaseflowEnsembleSimulator(AMMBaseflowSimulator):
+    """
+    Baseflow component simulated for N_params parameter sets in one vectorized pass.
+
+    Simulated variables (total_capture_fraction, flow) are (N_params x T) arrays, and
+    derived parameters (shape_factor, sigmoid_*, ...) are (N_params x 1) arrays.
+    precip can be 1D (shared by all members) or 2D (N_params x T).
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        parameter_table: Mapping[str, Sequence[float]],
+        precip: np.ndarray,
+        temperature: np.ndarray,
+        timestep: float,
+        feature_cache: FeatureCache = None,
+    ) -> None:
+
+        self.precip = precip
+        self.temperature = temperature
+        self.timestep = timestep
+        self.feature_cache = feature_cache
+
+        self.num_timesteps_input_data = precip.shape[-1]
+
+        self.component_config = get_stacked_component_config(
+            AMMBaseflowConfig, component_config_dict, parameter_table
+        )
+        self.num_ensemble_members = self.component_config.num_ensemble_members
+
+        self._get_unit_converted_parameters_baseflow()
+
+        self._setup_amm_baseflow()
+
+    def _get_moving_avg(
+        self, varname: str, moving_avg_steps: np.ndarray
+    ) -> np.ndarray:
+        """
+        Moving average with one window per ensemble member. Each distinct window is only
+        computed once (and shared through the feature cache for 1D inputs), and a shared
+        window on a shared (1D) input stays 1D.
+        """
+        a = self.__getattribute__(varname)
+        unique_steps, inverse = np.unique(
+            np.ravel(moving_avg_steps), return_inverse=True
+        )
+        if len(unique_steps) == 1:
+            return self._get_moving_avg_single_window(
+                varname, a, int(unique_steps[0])
+            )
+
+        a_movavg = np.zeros((self.num_ensemble_members, a.shape[-1]))
+        for i, steps in enumerate(unique_steps):
+            rows = inverse == i
+            a_movavg[rows] = self._get_moving_avg_single_window(
+                varname, a if a.ndim == 1 else a[rows], int(steps)
+            )
+        return a_movavg
+
+    def _get_moving_avg_single_window(
+        self, varname: str, a: np.ndarray, moving_avg_steps: int
+    ) -> np.ndarray:
+        if self.feature_cache is None or a.ndim > 1:
+            return get_moving_avg_backward(a, moving_avg_steps)
+        return self.feature_cache.get_moving_avg_backward(
+            varname, a, moving_avg_steps
+        )
+
+    def _get_seasonal_hydro_condition_factor(self) -> np.ndarray:
+        """
+        Seasonal hydrologic condition factor of each member. Members that share the temperature
+        window and sigmoid parameters (e.g. sites that only differ in catchment_area) share
+        the factor, which is computed once (and cached for a 1D temperature).
+        """
+        sigmoid_parameters = np.hstack(
+            [
+                np.broadcast_to(
+                    np.reshape(p, (-1, 1)), (self.num_ensemble_members, 1)
+                )
+                for p in [
+                    self.moving_avg_steps_temperature,
+                    self.sigmoid_max,
+                    self.sigmoid_steepness,
+                    self.sigmoid_midpoint,
+                    self.addl_capture_fraction_cold,
+                ]
+            ]
+        )
+        unique_sigmoid_parameters, inverse = np.unique(
+            sigmoid_parameters, axis=0, return_inverse=True
+        )
+        inverse = np.ravel(inverse)
+        seasonal_hydro_condition_factor = np.zeros(
+            (self.num_ensemble_members, self.num_timesteps_input_data)
+        )
+        for i, (moving_avg_steps_temperature, *sigmoid) in enumerate(
+            unique_sigmoid_parameters
+        ):
+            members = inverse == i
+            if self.moving_avg_temperature.ndim == 1:
+                moving_avg_temperature = self.moving_avg_temperature
+            else:
+                # the same window on the same input, so the same row for all members
+                moving_avg_temperature = self.moving_avg_temperature[
+                    np.argmax(members)
+                ]
+            if self.feature_cache is None or self.temperature.ndim > 1:
+                seasonal_hydro_condition_factor[members] = (
+                    get_seasonal_hydro_condition_factor(
+                        moving_avg_temperature, *sigmoid
+                    )
+                )
+            else:
+                seasonal_hydro_condition_factor[members] = (
+                    self.feature_cache.get_seasonal_hydro_condition_factor(
+                        moving_avg_steps_temperature,
+                        moving_avg_temperature,
+                        *sigmoid,
+                    )
+                )
+        return seasonal_hydro_condition_factor
+
+
+class AMMRDIIEnsembleSimulator(AMMBaseflowEnsembleSimulator, AMMRDIISimulator):
+    """
+    RDII component simulated for N_params parameter sets in one vectorized pass.
+    See AMMBaseflowEnsembleSimulator.
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        parameter_table: Mapping[str, Sequence[float]],
+        precip: np.ndarray,
+        temperature: np.ndarray,
+        timestep: float,
+        feature_cache: FeatureCache = None,
+    ) -> None:
+
+        self.precip = precip
+        self.temperature = temperature
+        self.timestep = timestep
+        self.feature_cache = feature_cache
+
+        self.component_config_dict = component_config_dict
+
+        self.num_timesteps_input_data = precip.shape[-1]
+
+        self.component_config = get_stacked_component_config(
+            AMMRDIIConfig, component_config_dict, parameter_table
+        )
+        self.num_ensemble_members = self.component_config.num_ensemble_members
+
+        self._get_unit_converted_parameters_baseflow()
+
+        self._get_unit_converted_parameters_additional_rdii()
+
+        self._setup_amm_baseflow()
+
+        self._setup_additional_rdii()
+
+
+ENSEMBLE_COMPONENT_CLASSES = {
+    "baseflow": AMMBaseflowEnsembleSimulator,
+    "rdii": AMMRDIIEnsembleSimulator,
+}
@@ -1,13 +1,18 @@
-from typing import Dict
+from typing import Dict, Mapping
 
 import numpy as np
 from pydantic import PositiveFloat
 
 from .amm_baseflow import AMMBaseflowConfig, AMMBaseflowSimulator
 from .calculations import (
+    get_difference_equation_previous_values,
+    get_event_difference_equation_simulation,
+    get_events_scattered,
     get_moving_avg_backward,
     get_vectorized_difference_equation_simulation,
 )
+from .feature_cache import FeatureCache
+from .kernels import simulate_rdii_fused
 from ..datatypes.units import (
     convert_units,
     INTERNAL_UNITS_TIME,
@@ -20,17 +25,27 @@ class AMMRDIIConfig(AMMBaseflowConfig):
 
 
 class AMMRDIISimulator(AMMBaseflowSimulator):
+    PARAMETER_UNITS = dict(
+        AMMBaseflowSimulator.PARAMETER_UNITS,
+        antecedent_moisture_half_life_time=(
+            "time_parameter_units",
+            INTERNAL_UNITS_TIME,
+        ),
+    )
+
     def __init__(
         self,
         component_config_dict: Dict,
         precip: np.ndarray,
         temperature: np.ndarray,
         timestep: float,
+        feature_cache: FeatureCache = None,
     ) -> None:
 
         self.precip = precip
         self.temperature = temperature
         self.timestep = timestep
+        self.feature_cache = feature_cache
 
         self.component_config_dict = component_config_dict
 
@@ -62,11 +77,19 @@ class AMMRDIISimulator(AMMBaseflowSimulator):
         Additional setup for variables needed by
         rdii components but not baseflow
         """
-        self.addl_capture_fraction = np.zeros(self.num_timesteps_input_data)
+        self._get_derived_parameters_additional_rdii()
+        self.addl_capture_fraction = np.zeros_like(self.flow)
+
+    def _get_derived_parameters_additional_rdii(self) -> None:
         self.antecedent_moisture_retention_factor = 0.5 ** (
             self.timestep / self.antecedent_moisture_half_life_time
         )
 
+    def set_parameters(self, parameters: Mapping[str, float]) -> None:
+        """see AMMBaseflowSimulator.set_parameters"""
+        super().set_parameters(parameters)
+        self._get_derived_parameters_additional_rdii()
+
     def run(
         self,
         starting_timestep: int = 1,
@@ -114,6 +137,27 @@ class AMMRDIISimulator(AMMBaseflowSimulator):
 
         end_timestep = starting_timestep + num_timesteps_to_run
 
+        if self._use_fused_kernel():
+            simulate_rdii_fused(
+                self.seasonal_hydro_condition_factor,
+                self.moving_avg_precip,
+                self.addl_capture_fraction,
+                self.total_capture_fraction,
+                self.flow,
+                starting_timestep,
+                end_timestep,
+                self.antecedent_moisture_retention_factor,
+                (self.antecedent_moisture_retention_factor - 1)
+                / np.log(self.antecedent_moisture_retention_factor),
+                convert_units(INTERNAL_UNITS_PRECIP, "INCHES", 1),
+                self.dry_weather_capture_fraction,
+                self.shape_factor,
+                (self.catchment_area)
+                * (1 - self.shape_factor)
+                / (self.timestep),
+            )
+            return
+
         # capture fraction: if not baseflow model, use full calculation that depends on antecedent moisture.
         # NOTE: I don't know why we need to do scaling conversion for SHCF, not clear from equations.
         #       It seems that equations are written for precip in inches, and SHCF must not be scale free.
@@ -122,51 +166,155 @@ class AMMRDIISimulator(AMMBaseflowSimulator):
             (self.antecedent_moisture_retention_factor - 1)
             / np.log(self.antecedent_moisture_retention_factor)
             * self.seasonal_hydro_condition_factor[
-                starting_timestep:end_timestep
+                ..., starting_timestep:end_timestep
             ]
             * convert_units(INTERNAL_UNITS_PRECIP, "INCHES", 1)
-            * self.moving_avg_precip[starting_timestep:end_timestep]
+            * self.moving_avg_precip[..., starting_timestep:end_timestep]
         )
-        self.addl_capture_fraction[starting_timestep:end_timestep] = (
+        self.addl_capture_fraction[..., starting_timestep:end_timestep] = (
             np.maximum(
                 get_vectorized_difference_equation_simulation(
                     additive_component=addl_capture_fraction_additive_component,
                     multiplier_for_simulated_variable_tminus1=self.antecedent_moisture_retention_factor,
                     simulated_variable_t0=self.addl_capture_fraction[
-                        starting_timestep - 1
+                        ..., starting_timestep - 1
                     ],
                 ),
                 0.0,
             )
         )
 
+        self._simulate_total_capture_fraction_rdii(
+            starting_timestep, num_timesteps_to_run
+        )
+
+        flow_additive_component = (
+            (self.catchment_area)
+            * (1 - self.shape_factor)
+            / (self.timestep)
+            * self.total_capture_fraction[..., starting_timestep:end_timestep]
+            * self.moving_avg_precip[..., starting_timestep:end_timestep]
+        )
+        self.flow[..., starting_timestep:end_timestep] = np.maximum(
+            get_vectorized_difference_equation_simulation(
+                additive_component=flow_additive_component,
+                multiplier_for_simulated_variable_tminus1=self.shape_factor,
+                simulated_variable_t0=self.flow[..., starting_timestep - 1],
+            ),
+            0.0,
+        )
+
+    def _use_fused_kernel(self) -> bool:
+        """
+        The numba kernel (see simulator.kernels) is used for 1D float64 arrays when numba is
+        installed and use_fused_kernel is not set to False on the component.
+        """
+        return (
+            simulate_rdii_fused is not None
+            and getattr(self, "use_fused_kernel", True)
+            and self.flow.ndim == 1
+            and all(
+                a.dtype == np.float64
+                for a in [
+                    self.seasonal_hydro_condition_factor,
+                    self.moving_avg_precip,
+                    self.addl_capture_fraction,
+                    self.total_capture_fraction,
+                    self.flow,
+                ]
+            )
+        )
+
+    def _simulate_total_capture_fraction_rdii(
+        self,
+        starting_timestep: int,
+        num_timesteps_to_run: int,
+    ) -> None:
+        end_timestep = starting_timestep + num_timesteps_to_run
         movavg2_start = starting_timestep - 1
         movavg2_end = starting_timestep + num_timesteps_to_run
         addl_capture_fraction_movavg2 = get_moving_avg_backward(
-            self.addl_capture_fraction[movavg2_start:movavg2_end],
+            self.addl_capture_fraction[..., movavg2_start:movavg2_end],
             2,
             0,
         )
-        self.total_capture_fraction[starting_timestep:end_timestep] = (
+        self.total_capture_fraction[..., starting_timestep:end_timestep] = (
             np.minimum(
                 self.dry_weather_capture_fraction
-                + addl_capture_fraction_movavg2[1:],
+                + addl_capture_fraction_movavg2[..., 1:],
                 1.0,
             )
         )
 
-        flow_additive_component = (
-            (self.catchment_area)
-            * (1 - self.shape_factor)
-            / (self.timestep)
-            * self.total_capture_fraction[starting_timestep:end_timestep]
-            * self.moving_avg_precip[starting_timestep:end_timestep]
+    def _simulate_total_capture_fraction_events(
+        self,
+        starting_timestep: int,
+        num_timesteps_to_run: int,
+        event_timesteps: np.ndarray,
+        fill_dry_timesteps: bool,
+    ) -> np.ndarray:
+        """
+        Event-driven additional capture fraction (see run_event_driven), then the total capture
+        fraction on event_timesteps (and on the whole window if fill_dry_timesteps)
+        """
+        timesteps = event_timesteps + starting_timestep
+        # same operations as in _simulate_amm_rdii, on the events only
+        addl_capture_fraction_additive_component_events = (
+            (self.antecedent_moisture_retention_factor - 1)
+            / np.log(self.antecedent_moisture_retention_factor)
+            * self.seasonal_hydro_condition_factor[timesteps]
+            * convert_units(INTERNAL_UNITS_PRECIP, "INCHES", 1)
+            * self.moving_avg_precip[timesteps]
         )
-        self.flow[starting_timestep:end_timestep] = np.maximum(
-            get_vectorized_difference_equation_simulation(
-                additive_component=flow_additive_component,
-                multiplier_for_simulated_variable_tminus1=self.shape_factor,
-                simulated_variable_t0=self.flow[starting_timestep - 1],
-            ),
-            0.0,
+        addl_capture_fraction_t0 = self.addl_capture_fraction[
+            starting_timestep - 1
+        ]
+
+        if fill_dry_timesteps:
+            # the additive component is exactly zero off the events, so this matches run()
+            end_timestep = starting_timestep + num_timesteps_to_run
+            self.addl_capture_fraction[starting_timestep:end_timestep] = (
+                np.maximum(
+                    get_vectorized_difference_equation_simulation(
+                        additive_component=get_events_scattered(
+                            event_timesteps,
+                            addl_capture_fraction_additive_component_events,
+                            num_timesteps_to_run,
+                        ),
+                        multiplier_for_simulated_variable_tminus1=self.antecedent_moisture_retention_factor,
+                        simulated_variable_t0=addl_capture_fraction_t0,
+                    ),
+                    0.0,
+                )
+            )
+            self._simulate_total_capture_fraction_rdii(
+                starting_timestep, num_timesteps_to_run
+            )
+            return self.total_capture_fraction[timesteps]
+
+        addl_capture_fraction_events = (
+            get_event_difference_equation_simulation(
+                event_timesteps,
+                addl_capture_fraction_additive_component_events,
+                self.antecedent_moisture_retention_factor,
+                addl_capture_fraction_t0,
+            )
+        )
+        # values on the timesteps before the events, for the 2-step moving average
+        addl_capture_fraction_previous = (
+            get_difference_equation_previous_values(
+                event_timesteps,
+                addl_capture_fraction_events,
+                self.antecedent_moisture_retention_factor,
+                addl_capture_fraction_t0,
+            )
+        )
+        return np.minimum(
+            self.dry_weather_capture_fraction
+            + (
+                np.maximum(addl_capture_fraction_previous, 0.0)
+                + np.maximum(addl_capture_fraction_events, 0.0)
+            )
+            / 2,
+            1.0,
         )
@@ -0,0 +1,235 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .amm_baseflow import AMMBaseflowConfig, AMMBaseflowSimulator
+from .amm_rdii import AMMRDIIConfig, AMMRDIISimulator
+from .calculations import (
+    get_moving_avg_backward,
+    get_seasonal_hydro_condition_factor,
+)
+from .feature_cache import FeatureCache
+from ..datatypes.units import (
+    convert_units,
+    INTERNAL_UNITS_FLOW,
+    INTERNAL_UNITS_TIME,
+)
+
+
+class AMMBaseflowScenarioSimulator(AMMBaseflowSimulator):
+    """
+    Baseflow component (one parameter set) simulated for a stack of N_scenarios input scenarios,
+    e.g. design storms, in one vectorized pass.
+
+    precip is (N_scenarios x T). Timestep t of the scenarios is timestep temperature_offset + t
+    of temperature, so temperature can hold history before the scenarios (e.g. scenarios placed
+    on a date of the model's record). temperature is either
+        - 1D, shared by all scenarios: its features come from the feature cache;
+        - 2D (N_scenarios x T or longer): the features are computed once per distinct row.
+    The temperature features (over the whole series, then cut to the scenario window) are not
+    repeated per scenario: the seasonal hydrologic condition factor is 1D for a shared
+    temperature and broadcast against the (N_scenarios x T) simulated variables.
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        precip: np.ndarray,
+        temperature: np.ndarray,
+        timestep: float,
+        feature_cache: FeatureCache = None,
+        temperature_offset: int = 0,
+    ) -> None:
+        assert precip.ndim == 2
+        self.precip = precip
+        self.temperature = temperature
+        self.timestep = timestep
+        self.feature_cache = feature_cache
+        self.temperature_offset = temperature_offset
+
+        self.num_timesteps_input_data = precip.shape[-1]
+        self._check_temperature()
+
+        self.component_config = AMMBaseflowConfig(
+            **component_config_dict["parameterization"]
+        )
+
+        self._get_unit_converted_parameters_baseflow()
+
+        self._setup_amm_baseflow()
+
+    def _check_temperature(self) -> None:
+        assert self.temperature.ndim == 1 or (
+            len(self.temperature) == len(self.precip)
+        )
+        assert (
+            self.temperature_offset + self.num_timesteps_input_data
+            <= self.temperature.shape[-1]
+        )
+
+    def _setup_amm_baseflow(self) -> None:
+        self._get_derived_parameters_baseflow()
+
+        # scenarios differ in precip, so there is nothing to share or cache here
+        self.moving_avg_precip = get_moving_avg_backward(
+            self.precip, self.moving_avg_steps_precip
+        )
+        window = slice(
+            self.temperature_offset,
+            self.temperature_offset + self.num_timesteps_input_data,
+        )
+        if self.temperature.ndim == 1:
+            self.moving_avg_temperature = self._get_moving_avg(
+                "temperature", self.moving_avg_steps_temperature
+            )
+            # features over the whole series (shared with the other components through the
+            # feature cache), then the scenario window
+            self.seasonal_hydro_condition_factor = (
+                self._get_seasonal_hydro_condition_factor()[window]
+            )
+            self.moving_avg_temperature = self.moving_avg_temperature[window]
+        else:
+            unique_temperature, temperature_rows = np.unique(
+                self.temperature, axis=0, return_inverse=True
+            )
+            self.moving_avg_temperature = get_moving_avg_backward(
+                unique_temperature, self.moving_avg_steps_temperature
+            )
+            self.seasonal_hydro_condition_factor = (
+                get_seasonal_hydro_condition_factor(
+                    self.moving_avg_temperature,
+                    self.sigmoid_max,
+                    self.sigmoid_steepness,
+                    self.sigmoid_midpoint,
+                    self.addl_capture_fraction_cold,
+                )[np.ravel(temperature_rows), window]
+            )
+            self.moving_avg_temperature = self.moving_avg_temperature[
+                ..., window
+            ]
+
+        self.total_capture_fraction = np.zeros(self.precip.shape)
+        self.flow = np.zeros(self.precip.shape)
+
+
+class AMMRDIIScenarioSimulator(AMMBaseflowScenarioSimulator, AMMRDIISimulator):
+    """
+    RDII component (one parameter set) simulated for a stack of input scenarios.
+    See AMMBaseflowScenarioSimulator.
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        precip: np.ndarray,
+        temperature: np.ndarray,
+        timestep: float,
+        feature_cache: FeatureCache = None,
+        temperature_offset: int = 0,
+    ) -> None:
+        assert precip.ndim == 2
+        self.precip = precip
+        self.temperature = temperature
+        self.timestep = timestep
+        self.feature_cache = feature_cache
+        self.temperature_offset = temperature_offset
+
+        self.component_config_dict = component_config_dict
+
+        self.num_timesteps_input_data = precip.shape[-1]
+        self._check_temperature()
+
+        self.component_config = AMMRDIIConfig(
+            **component_config_dict["parameterization"]
+        )
+
+        self._get_unit_converted_parameters_baseflow()
+
+        self._get_unit_converted_parameters_additional_rdii()
+
+        self._setup_amm_baseflow()
+
+        self._setup_additional_rdii()
+
+
+SCENARIO_COMPONENT_CLASSES = {
+    "baseflow": AMMBaseflowScenarioSimulator,
+    "rdii": AMMRDIIScenarioSimulator,
+}
+
+
+def get_hydrograph_metrics(
+    flow: np.ndarray,
+    timestep: float,
+    starting_timestep: int = 1,
+    storm_start_timestep: np.ndarray = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Peak flow, volume and time to peak of each row of an (N_scenarios x T) flow array, over
+    the simulated timesteps (from starting_timestep).
+
+    Returns:
+        Dict:
+            peak_flow: maximum flow (flow units)
+            peak_timestep: timestep of the first maximum
+            time_to_peak_HOURS: from storm_start_timestep (per row) to the peak
+            volume: sum of flow * timestep (flow units * INTERNAL_UNITS_TIME, e.g. CUBICFEET)
+    """
+    simulated_flow = flow[:, starting_timestep:]
+    peak_timestep = np.argmax(simulated_flow, axis=1) + starting_timestep
+    return {
+        "peak_flow": simulated_flow.max(axis=1),
+        "peak_timestep": peak_timestep,
+        "time_to_peak_HOURS": convert_units(
+            INTERNAL_UNITS_TIME,
+            "HOURS",
+            (peak_timestep - storm_start_timestep) * timestep,
+        ),
+        "volume": simulated_flow.sum(axis=1) * timestep,
+    }
+
+
+class ScenarioResults:
+    """
+    Outcome of AntecedentMoistureModel.run_scenarios
+
+    Attributes:
+        summary (pd.DataFrame): one row per scenario (indexed by scenario label) with
+            peak_flow_<flow units>, peak_timestep, time_to_peak_HOURS and volume_CUBICFEET of
+            the total flow, and the same columns prefixed with <component_label>_ for each
+            component (see get_hydrograph_metrics)
+        component_labels (List[str]): simulated components
+        flow (Dict[str, np.ndarray]): (N_scenarios x T) flows of "total" and each component,
+            only with return_flow=True (None otherwise)
+    """
+
+    def __init__(
+        self,
+        metrics: Dict[str, np.ndarray],
+        scenario_labels: Sequence,
+        component_labels: List[str],
+        flow: Dict[str, np.ndarray] = None,
+    ) -> None:
+        self.summary = pd.DataFrame(metrics, index=scenario_labels)
+        self.summary.index.name = "scenario"
+        self.component_labels = component_labels
+        self.flow = flow
+
+
+def get_summary_metrics(
+    flow: np.ndarray,
+    timestep: float,
+    storm_start_timestep: np.ndarray,
+    prefix: str = "",
+) -> Dict[str, np.ndarray]:
+    """get_hydrograph_metrics as ScenarioResults.summary columns"""
+    metrics = get_hydrograph_metrics(
+        flow, timestep, storm_start_timestep=storm_start_timestep
+    )
+    return {
+        f"{prefix}peak_flow_{INTERNAL_UNITS_FLOW}": metrics["peak_flow"],
+        f"{prefix}peak_timestep": metrics["peak_timestep"],
+        f"{prefix}time_to_peak_HOURS": metrics["time_to_peak_HOURS"],
+        f"{prefix}volume_CUBICFEET": metrics["volume"],
+    }
@@ -1,14 +1,40 @@
+from typing import Union
+
 import numpy as np
-from scipy.signal import lfilter
+
+from ..datatypes.sparse import SparseTimeseries
+
+# Windows up to this length are summed directly in get_window_sums (exact for short
+# windows such as the 2-step averages in the simulators); longer windows use prefix sums.
+DIRECT_SUM_MAX_STEPS = 8
+# Prefix sums in get_window_sums are restarted every this many outputs to bound drift.
+PREFIX_SUM_BLOCK_STEPS = 2**16
+# Largest growth (as a natural log) allowed for multiplier**(-k) inside one block of
+# get_vectorized_difference_equation_simulation for 2D inputs. exp(300) ~ 1e130 keeps
+# the rescaled cumulative sums far away from float64 overflow.
+MAX_LOG_GROWTH_PER_BLOCK = 300.0
+
+
+def get_moving_avg_steps(averaging_time, timestep: float):
+    """
+    Number of timesteps in a backward moving average window covering averaging_time.
+    averaging_time can be a float or an np.ndarray (e.g. one value per ensemble member).
+    """
+    if np.ndim(averaging_time) == 0:
+        return int(averaging_time / timestep) + 1
+    return (np.asarray(averaging_time) / timestep).astype(int) + 1
 
 
 def get_moving_avg_backward(
-    a: np.ndarray, moving_avg_steps: int, backward_offset: int = 1
+    a: Union[np.ndarray, SparseTimeseries],
+    moving_avg_steps: int,
+    backward_offset: int = 1,
 ):
     """
-    get backward looking moving average (see https://stackoverflow.com/questions/14313510/how-to-calculate-rolling-moving-average-using-python-numpy-scipy)
+    get backward looking moving average from windowed sums of a (see get_window_sums),
+    so the cost does not depend on moving_avg_steps.
     Args:
-        a: np.ndarray
+        a: np.ndarray or SparseTimeseries. If a has more than one dimension, the moving average is taken along the last (time) axis.
         moving_avg_steps: window to get moving average over
         backward_offset: number of steps behind to look
 
@@ -17,24 +43,181 @@ def get_moving_avg_backward(
         get_moving_avg_backward(a, 2,0) = array([0. , 2.5, 4.5, 6.5, 5.5])
         get_moving_avg_backward(a, 2,1) = array([0. , 0. , 2.5, 4.5, 6.5])
     """
-    assert moving_avg_steps < len(a)
-    a_movavg = np.zeros(len(a))
-    convolution = (
-        np.convolve(a, np.ones(moving_avg_steps), "valid") / moving_avg_steps
-    )
+    assert moving_avg_steps < a.shape[-1]
+    a_movavg = np.zeros(a.shape)
+    window_avg = get_window_sums(a, moving_avg_steps)
+    window_avg /= moving_avg_steps
     if backward_offset > 0:
-        a_movavg[moving_avg_steps - 1 + backward_offset :] = convolution[
-            :-(backward_offset)
+        a_movavg[..., moving_avg_steps - 1 + backward_offset :] = window_avg[
+            ..., :-(backward_offset)
         ]
     else:
-        a_movavg[moving_avg_steps - 1 :] = convolution
+        a_movavg[..., moving_avg_steps - 1 :] = window_avg
     return a_movavg
 
 
+def get_window_sums(
+    a: Union[np.ndarray, SparseTimeseries], window_steps: int
+) -> np.ndarray:
+    """
+    Sums of a over every full window of window_steps along the last axis, i.e. the
+    "valid" part of a convolution with np.ones(window_steps). O(len(a)) for any window.
+
+    Windows of up to DIRECT_SUM_MAX_STEPS are summed directly from shifted slices. Longer
+    windows are differences of prefix sums, with two guards against numerical drift:
+        1. the prefix sums are restarted every PREFIX_SUM_BLOCK_STEPS outputs, so round-off
+           is bounded by eps * (block + window) * max|a| however long the record is;
+        2. windows that contain only zeros are set to exactly 0.0 (checked with an integer
+           count of nonzero values), so dry-weather precip averages do not pick up
+           round-off residuals from earlier storms.
+
+    A SparseTimeseries is summed from its nonzero values only, see get_sparse_window_sums.
+
+    Example:
+        a = array([1, 4, 5, 8, 3])
+        get_window_sums(a, 2) = array([ 5.,  9., 13., 11.])
+    """
+    if isinstance(a, SparseTimeseries):
+        return get_sparse_window_sums(a, window_steps)
+
+    num_window_sums = a.shape[-1] - window_steps + 1
+    if window_steps <= DIRECT_SUM_MAX_STEPS:
+        window_sums = np.array(a[..., :num_window_sums], dtype=float)
+        for shift in range(1, window_steps):
+            window_sums += a[..., shift : shift + num_window_sums]
+        return window_sums
+
+    window_sums = np.empty(a.shape[:-1] + (num_window_sums,))
+    block_steps = max(PREFIX_SUM_BLOCK_STEPS, window_steps)
+    for block_start in range(0, num_window_sums, block_steps):
+        block_end = min(block_start + block_steps, num_window_sums)
+        block_len = block_end - block_start
+        prefix_sum = np.cumsum(
+            a[..., block_start : block_end + window_steps - 1],
+            axis=-1,
+            dtype=float,
+        )
+        block = window_sums[..., block_start:block_end]
+        block[...] = prefix_sum[..., window_steps - 1 :]
+        block[..., 1:] -= prefix_sum[..., : block_len - 1]
+
+        nonzero_count = np.cumsum(
+            a[..., block_start : block_end + window_steps - 1] != 0,
+            axis=-1,
+        )
+        window_nonzero_count = nonzero_count[..., window_steps - 1 :].copy()
+        window_nonzero_count[..., 1:] -= nonzero_count[..., : block_len - 1]
+        block[window_nonzero_count == 0] = 0.0
+    return window_sums
+
+
+def get_sparse_window_sums(
+    a: SparseTimeseries, window_steps: int
+) -> np.ndarray:
+    """
+    get_window_sums of a SparseTimeseries, in O(nonzero values * window_steps) for windows of
+    up to DIRECT_SUM_MAX_STEPS and O(windows with a nonzero value) for longer windows, plus
+    the dense output. Series where most windows have a nonzero value are summed dense.
+
+    Short windows add the nonzero values in the same order as get_window_sums, so the sums are
+    identical. Longer windows are differences of prefix sums over the nonzero values. Values
+    closer than window_steps apart form clusters (storms), and no window spans two clusters,
+    so the prefix sums are restarted on cluster boundaries about every PREFIX_SUM_BLOCK_STEPS
+    nonzero values, and windows without a nonzero value are exactly 0.0.
+    """
+    num_window_sums = a.num_timesteps - window_steps + 1
+    window_sums = np.zeros((a.num_series, num_window_sums))
+    for series in range(a.num_series):
+        indices, values = a.get_series(series)
+        if len(indices) == 0:
+            continue
+        indices = indices.astype(np.int64)
+        if window_steps <= DIRECT_SUM_MAX_STEPS:
+            for shift in range(window_steps):
+                window_starts = indices - shift
+                valid = (window_starts >= 0) & (
+                    window_starts < num_window_sums
+                )
+                window_sums[series, window_starts[valid]] += values[valid]
+            continue
+
+        cluster_starts = np.flatnonzero(
+            np.diff(indices, prepend=-window_steps) >= window_steps
+        )
+        cluster_ends = np.append(cluster_starts[1:], len(indices)) - 1
+        # windows with a nonzero value: those starting within window_steps - 1 before a
+        # cluster's first value, up to its last value
+        first_window = np.maximum(
+            indices[cluster_starts] - window_steps + 1, 0
+        )
+        last_window = np.minimum(indices[cluster_ends], num_window_sums - 1)
+        num_windows = last_window - first_window + 1
+        if 2 * num_windows.sum() > num_window_sums:
+            # mostly wet windows (e.g. a 30-day average): dense prefix sums are faster
+            series_dense = np.zeros(a.num_timesteps)
+            series_dense[indices] = values
+            window_sums[series] = get_window_sums(series_dense, window_steps)
+            continue
+        window_starts = np.arange(num_windows.sum()) + np.repeat(
+            first_window - np.cumsum(num_windows) + num_windows, num_windows
+        )
+
+        block_starts = cluster_starts[
+            np.unique(
+                cluster_starts // PREFIX_SUM_BLOCK_STEPS, return_index=True
+            )[1]
+        ]
+        prefix_sum = np.empty(len(values))
+        for block_start, block_end in zip(
+            block_starts, np.append(block_starts[1:], len(values))
+        ):
+            prefix_sum[block_start:block_end] = np.cumsum(
+                values[block_start:block_end], dtype=float
+            )
+        is_block_start = np.zeros(len(values), dtype=bool)
+        is_block_start[block_starts] = True
+
+        first_value = np.searchsorted(indices, window_starts)
+        last_value = np.searchsorted(indices, window_starts + window_steps) - 1
+        window_sums[series, window_starts] = prefix_sum[last_value] - np.where(
+            is_block_start[first_value], 0.0, prefix_sum[first_value - 1]
+        )
+    if a.ndim == 1:
+        return window_sums[0]
+    return window_sums
+
+
+def get_seasonal_hydro_condition_factor(
+    moving_avg_temperature: np.ndarray,
+    sigmoid_max,
+    sigmoid_steepness,
+    sigmoid_midpoint,
+    addl_capture_fraction_cold,
+) -> np.ndarray:
+    """
+    Seasonal hydrologic condition factor (SHCF): sigmoid of the moving average temperature,
+    clipped at zero. Sigmoid parameters can be floats or arrays that broadcast against
+    moving_avg_temperature (e.g. shape (N_params, 1) for an ensemble).
+    """
+    seasonal_hydro_condition_factor = (
+        sigmoid_max
+        / (
+            1
+            + np.exp(
+                -sigmoid_steepness
+                * (moving_avg_temperature - sigmoid_midpoint)
+            )
+        )
+        + addl_capture_fraction_cold
+        - (11 / 12) * sigmoid_max
+    )
+    return np.maximum(seasonal_hydro_condition_factor, 0)
+
+
 def get_vectorized_difference_equation_simulation(
     additive_component: np.ndarray,
-    multiplier_for_simulated_variable_tminus1: float,
-    simulated_variable_t0: float,
+    multiplier_for_simulated_variable_tminus1,
+    simulated_variable_t0,
 ):
     """
     Function for vectorizing simulation of a variable defined by 1st order difference equation using digital filter.
@@ -42,11 +225,319 @@ def get_vectorized_difference_equation_simulation(
 
     simulated_variable[t] = additive_component[t] + (multiplier_for_simulated_variable_tminus1 * simulated_variable[t-1])
     initial_condition: simulated_variable[t=0] = simulated_variable_t0
+
+    If additive_component is 2D (N_params x T), each row is simulated along the time axis with
+    its own multiplier and initial condition (floats or arrays of length N_params). Rows that
+    share a (float) multiplier, e.g. input scenarios of one component, go through lfilter.
     """
+    if (
+        additive_component.ndim > 1
+        and np.ndim(multiplier_for_simulated_variable_tminus1) > 0
+    ):
+        return _get_blocked_difference_equation_simulation(
+            additive_component,
+            multiplier_for_simulated_variable_tminus1,
+            simulated_variable_t0,
+        )
+    # scipy.signal takes about a second to import, so only when first simulating
+    from scipy.signal import lfilter
+
+    # one filter state per row
+    filter_state = np.broadcast_to(
+        np.reshape(
+            simulated_variable_t0, (-1,) * (additive_component.ndim - 1) + (1,)
+        ),
+        additive_component.shape[:-1] + (1,),
+    )
     simulated_variable, _ = lfilter(
         b=[1, 0],
         a=[1, -multiplier_for_simulated_variable_tminus1],
         x=additive_component,
-        zi=[simulated_variable_t0],
+        zi=filter_state,
     )
     return simulated_variable
+
+
+def _get_blocked_difference_equation_simulation(
+    additive_component: np.ndarray,
+    multiplier_for_simulated_variable_tminus1,
+    simulated_variable_t0,
+) -> np.ndarray:
+    """
+    Row-wise version of the lfilter call in get_vectorized_difference_equation_simulation,
+    for a different multiplier on every row (lfilter only takes one set of coefficients).
+
+    Within a block of B steps the recursion has the closed form
+        y[k] = m**k * (zi + cumsum(x[j] * m**(-j))[k]),  k = 0..B-1
+    which is evaluated for all rows at once. B is chosen so that m**(-k) stays below
+    exp(MAX_LOG_GROWTH_PER_BLOCK) for the smallest multiplier, and the filter state
+    zi = m * y[B-1] is carried into the next block.
+    """
+    num_rows, num_timesteps = additive_component.shape
+    multiplier = np.broadcast_to(
+        np.reshape(
+            np.asarray(multiplier_for_simulated_variable_tminus1, dtype=float),
+            (-1, 1),
+        ),
+        (num_rows, 1),
+    )
+    assert np.all(multiplier >= 0.0) and np.all(multiplier <= 1.0)
+    filter_state = np.array(
+        np.broadcast_to(
+            np.ravel(np.asarray(simulated_variable_t0, dtype=float)),
+            (num_rows,),
+        )
+    )
+
+    log_multiplier = np.log(np.maximum(multiplier, np.finfo(float).tiny))
+    max_log_decay = -log_multiplier.min()
+    if max_log_decay > 0:
+        block_steps = int(MAX_LOG_GROWTH_PER_BLOCK / max_log_decay)
+    else:
+        block_steps = num_timesteps
+    block_steps = min(max(block_steps, 1), max(num_timesteps, 1))
+
+    steps_in_block = np.arange(block_steps)
+    growth = np.exp(-log_multiplier * steps_in_block)
+    decay = np.exp(log_multiplier * steps_in_block)
+
+    simulated_variable = np.empty((num_rows, num_timesteps))
+    for block_start in range(0, num_timesteps, block_steps):
+        block_end = min(block_start + block_steps, num_timesteps)
+        block_len = block_end - block_start
+        block = np.cumsum(
+            additive_component[:, block_start:block_end]
+            * growth[:, :block_len],
+            axis=1,
+        )
+        block += filter_state[:, np.newaxis]
+        block *= decay[:, :block_len]
+        simulated_variable[:, block_start:block_end] = block
+        filter_state = multiplier[:, 0] * block[:, -1]
+    return simulated_variable
+
+
+def get_event_difference_equation_simulation(
+    event_timesteps: np.ndarray,
+    additive_component_events: np.ndarray,
+    multiplier_for_simulated_variable_tminus1: float,
+    simulated_variable_t0: float,
+) -> np.ndarray:
+    """
+    get_vectorized_difference_equation_simulation (1D) evaluated on event timesteps only, for an
+    additive_component that is zero everywhere else (e.g. flow outside of wet spells).
+
+    Between events the recursion is a geometric decay, so on the events
+        y[s] = m**s * (y0 + sum(x[s_i] * m**(-s_i) for s_i <= s))
+    with the same first step as the lfilter call (y[0] = x[0] + y0). As in
+    _get_blocked_difference_equation_simulation the closed form is evaluated in blocks, here
+    spanning at most MAX_LOG_GROWTH_PER_BLOCK / -log(m) timesteps, with the state decayed across
+    each block boundary, so the cost is O(number of events) however long the dry gaps are.
+
+    Args:
+        event_timesteps (np.ndarray): sorted timesteps (>= 0) relative to the first simulated timestep
+        additive_component_events (np.ndarray): additive component on event_timesteps
+        multiplier_for_simulated_variable_tminus1 (float): m, in [0, 1]
+        simulated_variable_t0 (float): y0, as in get_vectorized_difference_equation_simulation
+
+    Returns:
+        np.ndarray: simulated variable on event_timesteps. See
+        get_difference_equation_previous_values and get_difference_equation_sum for the
+        values in between.
+    """
+    multiplier = float(multiplier_for_simulated_variable_tminus1)
+    assert 0.0 <= multiplier <= 1.0
+    num_events = len(event_timesteps)
+    simulated_variable_events = np.empty(num_events)
+    if num_events == 0:
+        return simulated_variable_events
+
+    log_multiplier = np.log(max(multiplier, np.finfo(float).tiny))
+    if log_multiplier < 0:
+        block_timesteps = MAX_LOG_GROWTH_PER_BLOCK / -log_multiplier
+    else:
+        block_timesteps = np.inf
+
+    # state at the first event of the block, before its additive component
+    reference_timestep = event_timesteps[0]
+    state = simulated_variable_t0 * np.exp(log_multiplier * reference_timestep)
+    block_start = 0
+    while block_start < num_events:
+        reference_timestep = event_timesteps[block_start]
+        block_end = int(
+            np.searchsorted(
+                event_timesteps,
+                reference_timestep + block_timesteps,
+                side="right",
+            )
+        )
+        block_end = max(block_end, block_start + 1)
+        steps = event_timesteps[block_start:block_end] - reference_timestep
+        block = np.cumsum(
+            additive_component_events[block_start:block_end]
+            * np.exp(-log_multiplier * steps)
+        )
+        block += state
+        block *= np.exp(log_multiplier * steps)
+        simulated_variable_events[block_start:block_end] = block
+        if block_end < num_events:
+            state = block[-1] * np.exp(
+                log_multiplier
+                * (event_timesteps[block_end] - event_timesteps[block_end - 1])
+            )
+        block_start = block_end
+    return simulated_variable_events
+
+
+def get_difference_equation_previous_values(
+    event_timesteps: np.ndarray,
+    simulated_variable_events: np.ndarray,
+    multiplier_for_simulated_variable_tminus1: float,
+    simulated_variable_t0: float,
+) -> np.ndarray:
+    """
+    Simulated variable on the timestep before each event, from its values on the events
+    (get_event_difference_equation_simulation): the previous event value (or y0 before the
+    first event) decayed by m per timestep since then. On timestep -1 this is y0 itself.
+    O(number of events).
+    """
+    previous_values = np.concatenate(
+        ([simulated_variable_t0], simulated_variable_events[:-1])
+    )
+    # timesteps of decay since the previous event. Before the first event y = m**s * y0,
+    # which is y0 on timesteps -1 and 0.
+    decay_steps = np.maximum(
+        event_timesteps - 1 - np.concatenate(([0], event_timesteps[:-1])), 0
+    )
+    return previous_values * (
+        float(multiplier_for_simulated_variable_tminus1) ** decay_steps
+    )
+
+
+def get_events_scattered(
+    event_timesteps: np.ndarray, values: np.ndarray, num_timesteps: int
+) -> np.ndarray:
+    """values on event_timesteps, zeros elsewhere (length num_timesteps)"""
+    scattered = np.zeros(num_timesteps)
+    scattered[event_timesteps] = values
+    return scattered
+
+
+def get_difference_equation_sum(
+    event_timesteps: np.ndarray,
+    simulated_variable_events: np.ndarray,
+    multiplier_for_simulated_variable_tminus1: float,
+    simulated_variable_t0: float,
+    num_timesteps: int,
+) -> float:
+    """
+    Sum of the simulated variable over timesteps 0..num_timesteps-1, from its values on the
+    events (get_event_difference_equation_simulation), with the geometric decays in the dry
+    gaps summed in closed form. O(number of events).
+    """
+    multiplier = float(multiplier_for_simulated_variable_tminus1)
+
+    def geometric_sum(num_terms):
+        # sum(m**k for k in 0..num_terms-1)
+        if multiplier == 1.0:
+            return num_terms.astype(float)
+        return (1 - multiplier**num_terms) / (1 - multiplier)
+
+    event_timesteps = np.asarray(event_timesteps)
+    if len(event_timesteps) == 0:
+        return float(
+            simulated_variable_t0 * geometric_sum(np.array(num_timesteps))
+        )
+    # timesteps from each event up to (not including) the next event
+    gap_lengths = np.diff(np.append(event_timesteps, num_timesteps))
+    total = np.sum(simulated_variable_events * geometric_sum(gap_lengths))
+    total += simulated_variable_t0 * geometric_sum(
+        np.array(event_timesteps[0])
+    )
+    return float(total)
+
+
+class RunningWindowSum:
+    """
+    Window sums over a stream of values, for simulating one chunk at a time.
+
+    push() appends a chunk and returns, for each new value, the sum of the window_steps values
+    ending at (and including) it, with the same zero-padding as get_window_sums for the first
+    window_steps - 1 values of the stream (see is_full_window). A ring buffer keeps the last
+    window_steps values, so memory is independent of stream length and a push costs O(chunk).
+
+    Like get_window_sums, windows with only zeros are exactly 0.0, and round-off drift is
+    bounded: pushes are split into blocks of max(PREFIX_SUM_BLOCK_STEPS, window_steps) values,
+    and the running sum is recomputed from the ring buffer once at least window_steps values
+    have been pushed since the last recompute.
+    """
+
+    def __init__(self, window_steps: int) -> None:
+        assert window_steps > 0
+        self.window_steps = window_steps
+        self.ring_buffer = np.zeros(window_steps)
+        self.oldest_position = 0
+        self.window_sum = 0.0
+        self.window_nonzero_count = 0
+        self.num_values = 0
+        self._values_since_resum = 0
+
+    def push(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        num_new = len(values)
+        if num_new == 0:
+            return np.zeros(0)
+        block_steps = max(PREFIX_SUM_BLOCK_STEPS, self.window_steps)
+        if num_new > block_steps:
+            # the cumulative sums below restart on every block
+            return np.concatenate(
+                [
+                    self.push(values[block_start : block_start + block_steps])
+                    for block_start in range(0, num_new, block_steps)
+                ]
+            )
+
+        # value leaving the window when each new value enters it
+        num_from_buffer = min(num_new, self.window_steps)
+        outgoing = np.empty(num_new)
+        outgoing[:num_from_buffer] = self.ring_buffer[
+            (self.oldest_position + np.arange(num_from_buffer))
+            % self.window_steps
+        ]
+        outgoing[num_from_buffer:] = values[: num_new - num_from_buffer]
+
+        window_sums = self.window_sum + np.cumsum(values - outgoing)
+        window_nonzero_counts = self.window_nonzero_count + np.cumsum(
+            (values != 0).astype(int) - (outgoing != 0)
+        )
+        window_sums[window_nonzero_counts == 0] = 0.0
+
+        if num_new >= self.window_steps:
+            self.ring_buffer[:] = values[-self.window_steps :]
+            self.oldest_position = 0
+        else:
+            self.ring_buffer[
+                (self.oldest_position + np.arange(num_new)) % self.window_steps
+            ] = values
+            self.oldest_position = (
+                self.oldest_position + num_new
+            ) % self.window_steps
+        self.num_values += num_new
+        self.window_nonzero_count = int(window_nonzero_counts[-1])
+
+        self._values_since_resum += num_new
+        if self._values_since_resum >= self.window_steps:
+            self.window_sum = float(self.ring_buffer.sum())
+            self._values_since_resum = 0
+        else:
+            self.window_sum = float(window_sums[-1])
+        if self.window_nonzero_count == 0:
+            self.window_sum = 0.0
+        return window_sums
+
+    def is_full_window(self, num_new: int) -> np.ndarray:
+        """
+        For the last num_new pushed values, whether a full window of real (not padded) values ends there.
+        """
+        first_index = self.num_values - num_new
+        return first_index + np.arange(num_new) >= self.window_steps - 1
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Mapping
 
 import numpy as np
 from pydantic import BaseModel, NonNegativeFloat, confloat, field_validator
@@ -9,6 +9,7 @@ from ..datatypes.units import (
     INTERNAL_UNITS_TIME,
     INTERNAL_UNITS_FLOW,
 )
+from .feature_cache import FeatureCache
 
 
 class DWFConfig(BaseModel):
@@ -30,15 +31,29 @@ class DWFConfig(BaseModel):
 
 
 class DWFSimulator:
+    # numeric parameters -> (config field with their units, internal units), None if unitless
+    PARAMETER_UNITS = {
+        "base_wastewater_flow": ("flow_units", INTERNAL_UNITS_FLOW),
+        "sin_t_shift_hours": ("time_parameters_units", INTERNAL_UNITS_TIME),
+        "sin_amplitude_fraction": None,
+    }
+
     def __init__(
         self,
         component_config_dict: Dict,
         precip: np.ndarray,
         temperature: np.ndarray,
         timestep: float,
+        feature_cache: FeatureCache = None,
+        timestep_offset: int = 0,
     ) -> None:
+        # feature_cache is accepted so all components share one constructor signature;
+        # DWF has no precip/temperature features to cache.
+        # timestep 0 of precip is timestep timestep_offset of the record, which sets the phase
+        # of the sine (see AntecedentMoistureModel.get_window_model)
 
         self.timestep = timestep
+        self.timestep_offset = timestep_offset
         self.num_timesteps_input_data = len(precip)
 
         self.component_config = DWFConfig(
@@ -72,7 +87,13 @@ class DWFSimulator:
 
     def _setup_dwf(self) -> None:
         """for base wastewater flow, set flow as simple sin wave with 24-hour period"""
-        t = np.arange(self.num_timesteps_input_data) * self.timestep
+        t = (
+            np.arange(
+                self.timestep_offset,
+                self.timestep_offset + self.num_timesteps_input_data,
+            )
+            * self.timestep
+        )
         sine_amplitude = (
             self.base_wastewater_flow * self.sin_amplitude_fraction
         )
@@ -81,6 +102,20 @@ class DWFSimulator:
         #      to new dataset if initial time of day or timestep changes
         self.flow = self.base_wastewater_flow + sine_shape * sine_amplitude
 
+    def get_parameters(self) -> Dict[str, float]:
+        """current values of the PARAMETER_UNITS parameters, in internal units"""
+        return {k: getattr(self, k) for k in self.PARAMETER_UNITS}
+
+    def set_parameters(self, parameters: Mapping[str, float]) -> None:
+        """
+        Set parameters (in internal units, see PARAMETER_UNITS) without config validation or
+        unit conversion, and recompute the flow (see AMMBaseflowSimulator.set_parameters)
+        """
+        for k, v in parameters.items():
+            assert k in self.PARAMETER_UNITS, f"unknown parameter {k}"
+            setattr(self, k, v)
+        self._setup_dwf()
+
     def run(
         self,
         starting_timestep: int = 1,
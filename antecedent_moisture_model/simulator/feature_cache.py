@@ -0,0 +1,180 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+import numpy as np
+
+from .calculations import (
+    get_moving_avg_backward,
+    get_seasonal_hydro_condition_factor,
+)
+from ..stats import DISABLED_STATS, RunStats
+
+
+class FeatureCache:
+    """
+    Cache of precomputed features shared by all components of an AntecedentMoistureModel.
+
+    Moving averages are keyed by (input series name, window steps, backward offset) and
+    seasonal hydrologic condition factors by (temperature window steps, sigmoid parameters).
+    Components that use the same windows (e.g. a 720 h temperature average for both baseflow
+    and rdii) get the same array, and rebuilding components with new parameters only
+    recomputes the features whose keys changed.
+
+    Cached arrays are shared between components, so they must be treated as read-only.
+    The least recently used entries are evicted beyond max_entries.
+
+    Features are computed in float64 and stored in dtype (e.g. np.float32 for the float32
+    storage policy, see AntecedentMoistureModel), so the float64 arrays only exist while
+    a feature is computed.
+
+    The cache can be shared by components built in concurrent threads: a feature is computed
+    once, by the first thread that asks for it, while other threads asking for the same key wait
+    for it (features with other keys are computed concurrently).
+
+    With stats, each computed feature is timed as stage "feature_<feature type>" (e.g.
+    feature_moving_avg), see RunStats.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        stats: RunStats = DISABLED_STATS,
+        dtype=np.float64,
+    ) -> None:
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self.stats = stats
+        self._features = OrderedDict()
+        self._series = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get_moving_avg_backward(
+        self,
+        varname: str,
+        a: np.ndarray,
+        moving_avg_steps: int,
+        backward_offset: int = 1,
+    ) -> np.ndarray:
+        self._register_series(varname, a)
+        key = ("moving_avg", varname, int(moving_avg_steps), backward_offset)
+        return self._get_or_compute(
+            key,
+            lambda: get_moving_avg_backward(
+                a, moving_avg_steps, backward_offset
+            ),
+        )
+
+    def get_moving_avg_nonzero_timesteps(
+        self,
+        varname: str,
+        a: np.ndarray,
+        moving_avg_steps: int,
+        backward_offset: int = 1,
+    ) -> np.ndarray:
+        """timesteps where the moving average of a is nonzero (e.g. wet timesteps for precip)"""
+        moving_avg = self.get_moving_avg_backward(
+            varname, a, moving_avg_steps, backward_offset
+        )
+        key = (
+            "moving_avg_nonzero_timesteps",
+            varname,
+            int(moving_avg_steps),
+            backward_offset,
+        )
+        return self._get_or_compute(key, lambda: np.flatnonzero(moving_avg))
+
+    def get_seasonal_hydro_condition_factor(
+        self,
+        moving_avg_steps_temperature: int,
+        moving_avg_temperature: np.ndarray,
+        sigmoid_max: float,
+        sigmoid_steepness: float,
+        sigmoid_midpoint: float,
+        addl_capture_fraction_cold: float,
+    ) -> np.ndarray:
+        key = (
+            "seasonal_hydro_condition_factor",
+            int(moving_avg_steps_temperature),
+            float(sigmoid_max),
+            float(sigmoid_steepness),
+            float(sigmoid_midpoint),
+            float(addl_capture_fraction_cold),
+        )
+        return self._get_or_compute(
+            key,
+            lambda: get_seasonal_hydro_condition_factor(
+                moving_avg_temperature,
+                sigmoid_max,
+                sigmoid_steepness,
+                sigmoid_midpoint,
+                addl_capture_fraction_cold,
+            ),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._features.clear()
+            self._series.clear()
+
+    def _register_series(self, varname: str, a: np.ndarray) -> None:
+        """
+        Features are keyed by series name, so a new array under a known name
+        (e.g. new input data) invalidates everything computed from the old one.
+        Seasonal factors depend on temperature, so they are dropped with it.
+        """
+        with self._lock:
+            if self._series.get(varname) is a:
+                return
+            if varname in self._series:
+                stale_keys = [
+                    k
+                    for k in self._features
+                    if (
+                        k[0] in ["moving_avg", "moving_avg_nonzero_timesteps"]
+                        and k[1] == varname
+                    )
+                    or (
+                        varname == "temperature"
+                        and k[0] == "seasonal_hydro_condition_factor"
+                    )
+                ]
+                for k in stale_keys:
+                    del self._features[k]
+            self._series[varname] = a
+
+    def _get_or_compute(self, key: Tuple[Hashable, ...], compute):
+        with self._lock:
+            feature = self._get_cached(key)
+            if feature is not None:
+                return feature
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # computed by another thread while this one waited for key_lock
+                feature = self._get_cached(key)
+            if feature is not None:
+                return feature
+            with self.stats.stage(f"feature_{key[0]}"):
+                feature = compute()
+                if feature.dtype.kind == "f":
+                    feature = feature.astype(self.dtype, copy=False)
+            feature.flags.writeable = False
+            with self._lock:
+                self.misses += 1
+                self._features[key] = feature
+                while len(self._features) > self.max_entries:
+                    self._features.popitem(last=False)
+                self._key_locks.pop(key, None)
+        return feature
+
+    def _get_cached(self, key: Tuple[Hashable, ...]):
+        if key not in self._features:
+            return None
+        self.hits += 1
+        self._features.move_to_end(key)
+        return self._features[key]
@@ -0,0 +1,132 @@
+from typing import List, Mapping, Sequence
+
+import numpy as np
+
+from ..datatypes.units import convert_units
+
+
+class ParameterLayout:
+    """
+    Parameter labels compiled once against built components, for hot loops over parameter
+    vectors (e.g. calibration trials).
+
+    Each label (<component_label>_<param>, like params_to_override_labels) is resolved to its
+    component, its config units and its config bounds. Then
+        to_internal: checks a vector of config-unit values against the bounds and converts it
+            to internal units, with numpy instead of config validation
+        set_parameters: sets an internal-unit vector on the components, which only recompute
+            the derived parameters and features that depend on what changed (see
+            AMMBaseflowSimulator.set_parameters)
+
+    Args:
+        components: {component_label: component} (AMMBaseflowSimulator, AMMRDIISimulator or
+            DWFSimulator)
+        parameter_labels (List[str]): parameters in the vector, in order
+    """
+
+    def __init__(
+        self, components: Mapping[str, object], parameter_labels: List[str]
+    ) -> None:
+        self.components = dict(components)
+        self.parameter_labels = list(parameter_labels)
+        num_params = len(self.parameter_labels)
+
+        self.units = []
+        lower = np.full(num_params, -np.inf)
+        lower_inclusive = np.ones(num_params, dtype=bool)
+        upper = np.full(num_params, np.inf)
+        upper_inclusive = np.ones(num_params, dtype=bool)
+        # component_label -> (params, positions in the vector)
+        self._component_params = {}
+        for i, parameter_label in enumerate(self.parameter_labels):
+            component_label, param = self._get_component_param(parameter_label)
+            component = self.components[component_label]
+            params, positions = self._component_params.setdefault(
+                component_label, ([], [])
+            )
+            params.append(param)
+            positions.append(i)
+
+            units = component.PARAMETER_UNITS[param]
+            self.units.append(
+                None
+                if units is None
+                else (getattr(component.component_config, units[0]), units[1])
+            )
+            for constraint in (
+                type(component.component_config).model_fields[param].metadata
+            ):
+                for bound in ["gt", "ge"]:
+                    if getattr(constraint, bound, None) is not None:
+                        lower[i] = getattr(constraint, bound)
+                        lower_inclusive[i] = bound == "ge"
+                for bound in ["lt", "le"]:
+                    if getattr(constraint, bound, None) is not None:
+                        upper[i] = getattr(constraint, bound)
+                        upper_inclusive[i] = bound == "le"
+        self.bounds = np.column_stack([lower, upper])
+        self._lower_inclusive = lower_inclusive
+        self._upper_inclusive = upper_inclusive
+
+    def _get_component_param(self, parameter_label: str):
+        # longest label first, so that rdii_fast_catchment_area goes to rdii_fast, not rdii
+        for component_label in sorted(self.components, key=len, reverse=True):
+            component = self.components[component_label]
+            param = parameter_label[len(component_label) + 1 :]
+            if (
+                parameter_label.startswith(f"{component_label}_")
+                and param in component.PARAMETER_UNITS
+            ):
+                return component_label, param
+        raise KeyError(f"no component for parameter {parameter_label}")
+
+    def get_vector(self) -> np.ndarray:
+        """current parameter values of the components, in internal units"""
+        vector = np.zeros(len(self.parameter_labels))
+        for component_label, (
+            params,
+            positions,
+        ) in self._component_params.items():
+            parameters = self.components[component_label].get_parameters()
+            vector[positions] = [parameters[p] for p in params]
+        return vector
+
+    def to_internal(self, parameter_vector: Sequence[float]) -> np.ndarray:
+        """
+        Config-unit values (e.g. from an optimizer) in internal units. Raises ValueError for
+        values outside the config bounds (e.g. a negative catchment_area).
+        """
+        parameter_vector = np.asarray(parameter_vector, dtype=float)
+        valid = np.where(
+            self._lower_inclusive,
+            parameter_vector >= self.bounds[:, 0],
+            parameter_vector > self.bounds[:, 0],
+        ) & np.where(
+            self._upper_inclusive,
+            parameter_vector <= self.bounds[:, 1],
+            parameter_vector < self.bounds[:, 1],
+        )
+        if not np.all(valid):
+            raise ValueError(
+                "parameters out of bounds: "
+                + ", ".join(
+                    f"{self.parameter_labels[i]}={parameter_vector[i]}"
+                    for i in np.flatnonzero(~valid)
+                )
+            )
+        return np.array(
+            [
+                v if units is None else convert_units(*units, v)
+                for v, units in zip(parameter_vector, self.units)
+            ]
+        )
+
+    def set_parameters(self, vector: Sequence[float]) -> None:
+        """set internal-unit values (see to_internal and get_vector) on the components"""
+        for component_label, (
+            params,
+            positions,
+        ) in self._component_params.items():
+            self.components[component_label].set_parameters(
+                {p: float(vector[i]) for p, i in zip(params, positions)}
+            )
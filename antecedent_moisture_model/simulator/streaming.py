@@ -0,0 +1,367 @@
+from typing import Dict, List
+
+import numpy as np
+
+from .amm_baseflow import AMMBaseflowConfig, AMMBaseflowSimulator
+from .amm_rdii import AMMRDIIConfig, AMMRDIISimulator
+from .calculations import (
+    RunningWindowSum,
+    get_seasonal_hydro_condition_factor,
+    get_vectorized_difference_equation_simulation,
+)
+from .config_override_functions import override_components_to_include
+from .dwf import DWFConfig, DWFSimulator
+from ..datatypes.units import (
+    convert_units,
+    INTERNAL_UNITS_PRECIP,
+    INTERNAL_UNITS_TIME,
+)
+
+
+class DWFStepper(DWFSimulator):
+    """
+    DWF component advanced one chunk at a time. See AMMBaseflowStepper.
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        timestep: float,
+        initial_conditions: Dict[str, float] = None,
+    ) -> None:
+        self.timestep = timestep
+        self.component_config = DWFConfig(
+            **component_config_dict["parameterization"]
+        )
+        self._get_unit_converted_parameters_and_data_dwf()
+        self.num_timesteps_simulated = 0
+
+    def update(
+        self, precip: np.ndarray, temperature: np.ndarray
+    ) -> np.ndarray:
+        num_new = len(precip)
+        t = (
+            np.arange(
+                self.num_timesteps_simulated,
+                self.num_timesteps_simulated + num_new,
+            )
+            * self.timestep
+        )
+        sine_amplitude = (
+            self.base_wastewater_flow * self.sin_amplitude_fraction
+        )
+        sine_shape = np.sin((t - self.sin_t_shift_hours) * (2 * np.pi / 24))
+        self.flow = self.base_wastewater_flow + sine_shape * sine_amplitude
+        self.num_timesteps_simulated += num_new
+        return self.flow
+
+
+class AMMBaseflowStepper(AMMBaseflowSimulator):
+    """
+    Baseflow component advanced one step or one chunk at a time, e.g. as live precip/temperature
+    telemetry arrives, instead of simulating preallocated full-length arrays.
+
+    Feeding a record through update() in chunks of any size gives the same results as
+    AMMBaseflowSimulator.run() (starting_timestep=1) on the whole record, to round-off in the
+    moving averages. The first value pushed is timestep 0, where total_capture_fraction and
+    flow take their initial conditions.
+
+    State kept between updates: ring buffers for the precip and temperature moving averages,
+    the previous seasonal hydrologic condition factor (for its 2-step average), and the flow
+    filter state. Each update costs O(chunk) and memory is independent of record length.
+
+    After update(), moving_avg_precip, moving_avg_temperature, seasonal_hydro_condition_factor,
+    total_capture_fraction and flow hold the values for the new chunk only.
+    Inputs are in internal units (see timeseries.TimeseriesSetup._convert_to_internal_units).
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        timestep: float,
+        initial_conditions: Dict[str, float] = None,
+    ) -> None:
+        self.timestep = timestep
+        self.component_config = AMMBaseflowConfig(
+            **component_config_dict["parameterization"]
+        )
+        self._get_unit_converted_parameters_baseflow()
+        self._get_derived_parameters_baseflow()
+        self._setup_streaming_state(initial_conditions)
+
+    def _setup_streaming_state(
+        self, initial_conditions: Dict[str, float]
+    ) -> None:
+        if initial_conditions is None:
+            initial_conditions = {"total_capture_fraction": 0.0, "flow": 0.0}
+        self.initial_conditions = {
+            k: max(v, 0.0) for k, v in initial_conditions.items()
+        }
+        self.num_timesteps_simulated = 0
+
+        self.moving_avg_windows = {
+            "precip": RunningWindowSum(self.moving_avg_steps_precip),
+            "temperature": RunningWindowSum(self.moving_avg_steps_temperature),
+        }
+        # sum of the window ending on the previous timestep (moving averages look 1 step back)
+        self.previous_window_sums = {"precip": 0.0, "temperature": 0.0}
+        self.previous_seasonal_hydro_condition_factor = None
+        self.flow_filter_state = self.initial_conditions["flow"]
+
+    def update(
+        self, precip: np.ndarray, temperature: np.ndarray
+    ) -> np.ndarray:
+        """
+        Advance the component over a chunk of new timesteps.
+
+        Args:
+            precip (np.ndarray): precip on the new timesteps (FEET per timestep)
+            temperature (np.ndarray): temperature on the new timesteps (FAHRENHEIT)
+
+        Returns:
+            np.ndarray: flow on the new timesteps
+        """
+        assert len(precip) == len(temperature)
+        if len(precip) == 0:
+            return np.zeros(0)
+        self._update_features(precip, temperature)
+        self._simulate_chunk()
+        self.num_timesteps_simulated += len(precip)
+        return self.flow
+
+    def _update_features(
+        self, precip: np.ndarray, temperature: np.ndarray
+    ) -> None:
+        self.moving_avg_precip = self._get_streaming_moving_avg(
+            "precip", precip
+        )
+        self.moving_avg_temperature = self._get_streaming_moving_avg(
+            "temperature", temperature
+        )
+        self.seasonal_hydro_condition_factor = (
+            get_seasonal_hydro_condition_factor(
+                self.moving_avg_temperature,
+                self.sigmoid_max,
+                self.sigmoid_steepness,
+                self.sigmoid_midpoint,
+                self.addl_capture_fraction_cold,
+            )
+        )
+
+    def _get_streaming_moving_avg(
+        self, varname: str, values: np.ndarray
+    ) -> np.ndarray:
+        moving_avg_window = self.moving_avg_windows[varname]
+        window_sums = moving_avg_window.push(values)
+        window_sums[~moving_avg_window.is_full_window(len(values))] = 0.0
+        previous_window_sums = np.concatenate(
+            [[self.previous_window_sums[varname]], window_sums[:-1]]
+        )
+        self.previous_window_sums[varname] = window_sums[-1]
+        return previous_window_sums / moving_avg_window.window_steps
+
+    def _get_movavg2_with_previous(
+        self, values: np.ndarray, previous_value: float
+    ) -> np.ndarray:
+        """
+        2-step moving average including the last value of the previous chunk. The value for
+        timestep 0 (no previous value) is NaN and must be replaced by an initial condition.
+        """
+        if previous_value is None:
+            previous_value = np.nan
+        previous_values = np.concatenate([[previous_value], values[:-1]])
+        return (previous_values + values) / 2
+
+    def _first_simulated_index(self) -> int:
+        """chunk index of the first timestep >= 1 (timestep 0 only holds initial conditions)"""
+        return 1 if self.num_timesteps_simulated == 0 else 0
+
+    def _simulate_chunk(self) -> None:
+        seasonal_hydro_condition_factor_movavg2 = (
+            self._get_movavg2_with_previous(
+                self.seasonal_hydro_condition_factor,
+                self.previous_seasonal_hydro_condition_factor,
+            )
+        )
+        self.previous_seasonal_hydro_condition_factor = (
+            self.seasonal_hydro_condition_factor[-1]
+        )
+        self.total_capture_fraction = np.minimum(
+            np.maximum(
+                self.dry_weather_capture_fraction
+                + seasonal_hydro_condition_factor_movavg2,
+                0.0,
+            ),
+            1.0,
+        )
+        self._simulate_flow_chunk()
+
+    def _simulate_flow_chunk(self) -> None:
+        first = self._first_simulated_index()
+        if first == 1:
+            self.total_capture_fraction[0] = self.initial_conditions[
+                "total_capture_fraction"
+            ]
+        flow_additive_component = (
+            (self.catchment_area)
+            * (1 - self.shape_factor)
+            / (self.timestep)
+            * self.total_capture_fraction[first:]
+            * self.moving_avg_precip[first:]
+        )
+        flow, self.flow_filter_state = self._simulate_difference_equation(
+            flow_additive_component,
+            self.shape_factor,
+            self.flow_filter_state,
+        )
+        self.flow = np.zeros(len(self.moving_avg_precip))
+        if first == 1:
+            self.flow[0] = self.initial_conditions["flow"]
+        self.flow[first:] = np.maximum(flow, 0.0)
+
+    @staticmethod
+    def _simulate_difference_equation(
+        additive_component: np.ndarray, multiplier: float, filter_state: float
+    ):
+        """
+        Same recursion as get_vectorized_difference_equation_simulation, also returning the
+        filter state (multiplier * last unclipped value) to carry into the next chunk.
+        """
+        if len(additive_component) == 0:
+            return additive_component, filter_state
+        simulated_variable = get_vectorized_difference_equation_simulation(
+            additive_component=additive_component,
+            multiplier_for_simulated_variable_tminus1=multiplier,
+            simulated_variable_t0=filter_state,
+        )
+        return simulated_variable, multiplier * simulated_variable[-1]
+
+
+class AMMRDIIStepper(AMMBaseflowStepper, AMMRDIISimulator):
+    """
+    RDII component advanced one step or one chunk at a time. See AMMBaseflowStepper.
+    Additional state: the addl_capture_fraction filter state and its last (clipped) value.
+    """
+
+    def __init__(
+        self,
+        component_config_dict: Dict,
+        timestep: float,
+        initial_conditions: Dict[str, float] = None,
+    ) -> None:
+        self.timestep = timestep
+        self.component_config = AMMRDIIConfig(
+            **component_config_dict["parameterization"]
+        )
+        self._get_unit_converted_parameters_baseflow()
+        self._get_unit_converted_parameters_additional_rdii()
+        self._get_derived_parameters_baseflow()
+        self._get_derived_parameters_additional_rdii()
+        self._setup_streaming_state(initial_conditions)
+        self.addl_capture_fraction_filter_state = 0.0
+        self.previous_addl_capture_fraction = None
+
+    def _simulate_chunk(self) -> None:
+        first = self._first_simulated_index()
+        addl_capture_fraction_additive_component = (
+            (self.antecedent_moisture_retention_factor - 1)
+            / np.log(self.antecedent_moisture_retention_factor)
+            * self.seasonal_hydro_condition_factor[first:]
+            * convert_units(INTERNAL_UNITS_PRECIP, "INCHES", 1)
+            * self.moving_avg_precip[first:]
+        )
+        addl_capture_fraction, self.addl_capture_fraction_filter_state = (
+            self._simulate_difference_equation(
+                addl_capture_fraction_additive_component,
+                self.antecedent_moisture_retention_factor,
+                self.addl_capture_fraction_filter_state,
+            )
+        )
+        self.addl_capture_fraction = np.zeros(len(self.moving_avg_precip))
+        self.addl_capture_fraction[first:] = np.maximum(
+            addl_capture_fraction, 0.0
+        )
+
+        addl_capture_fraction_movavg2 = self._get_movavg2_with_previous(
+            self.addl_capture_fraction, self.previous_addl_capture_fraction
+        )
+        self.previous_addl_capture_fraction = self.addl_capture_fraction[-1]
+        self.total_capture_fraction = np.minimum(
+            self.dry_weather_capture_fraction + addl_capture_fraction_movavg2,
+            1.0,
+        )
+        self._simulate_flow_chunk()
+
+
+STEPPER_CLASSES = {
+    "dwf": DWFStepper,
+    "baseflow": AMMBaseflowStepper,
+    "rdii": AMMRDIIStepper,
+}
+
+
+class StreamingSimulation:
+    """
+    Multi-component model advanced one chunk at a time, the streaming counterpart of
+    AntecedentMoistureModel.run(). Components come from a simulation config dict (as in
+    simulation_config.yaml) and total flow is summed in component order.
+
+    Args:
+        simulation_config_dict: Dict, simulation config
+        initial_conditions: Dict, see AntecedentMoistureModel.run (values on timestep 0)
+        components_to_include_override (List[str]): list of components to include
+    """
+
+    def __init__(
+        self,
+        simulation_config_dict: Dict,
+        initial_conditions: Dict = None,
+        components_to_include_override: List[str] = None,
+    ) -> None:
+        self.timestep = convert_units(
+            simulation_config_dict["timestep_units"],
+            INTERNAL_UNITS_TIME,
+            float(simulation_config_dict["timestep"]),
+        )
+        assert self.timestep > 0.0
+
+        self.component_labels = override_components_to_include(
+            components_to_include_override, simulation_config_dict
+        )
+        self.amm_components = []
+        for component_label in self.component_labels:
+            component_config_dict = simulation_config_dict["components"][
+                component_label
+            ]
+            if initial_conditions is not None:
+                component_initial_conditions = initial_conditions.get(
+                    component_label, None
+                )
+            else:
+                component_initial_conditions = None
+            StepperClass = STEPPER_CLASSES[
+                component_config_dict["component_type"]
+            ]
+            self.amm_components.append(
+                StepperClass(
+                    component_config_dict,
+                    self.timestep,
+                    component_initial_conditions,
+                )
+            )
+        self.num_timesteps_simulated = 0
+
+    def update(
+        self, precip: np.ndarray, temperature: np.ndarray
+    ) -> np.ndarray:
+        """
+        Advance all components over a chunk of new timesteps and return total flow on them.
+        Inputs are in internal units (FEET per timestep, FAHRENHEIT).
+        """
+        precip = np.atleast_1d(np.asarray(precip, dtype=float))
+        temperature = np.atleast_1d(np.asarray(temperature, dtype=float))
+        self.flow = np.zeros(len(precip))
+        for component in self.amm_components:
+            self.flow += component.update(precip, temperature)
+        self.num_timesteps_simulated += len(precip)
+        return self.flow
@@ -0,0 +1,245 @@
+"""
+Simulate many sites that share their inputs as one stacked (M_sites x T) simulation.
+
+Meters on the same rain gauge and temperature record (and timestep) only differ in their
+component parameters, so their components are grouped by type and units, and each group is
+simulated as one ensemble (see simulator.amm_ensemble): a single moving average per distinct
+window and a single difference-equation filter along the time axis per simulated variable,
+instead of one small run per site.
+"""
+
+from pathlib import Path
+from typing import Dict, Sequence, Union
+
+import numpy as np
+import yaml
+
+from .antecedent_moisture_model import (
+    AntecedentMoistureModel,
+    COMPONENT_CLASSES,
+)
+from .datatypes.units import convert_units, INTERNAL_UNITS_TIME
+from .fleet import get_site_paths
+from .simulator.amm_baseflow import AMMBaseflowConfig
+from .simulator.amm_ensemble import ENSEMBLE_COMPONENT_CLASSES
+from .simulator.amm_rdii import AMMRDIIConfig
+from .simulator.config_override_functions import override_components_to_include
+
+CONFIG_CLASSES = {"baseflow": AMMBaseflowConfig, "rdii": AMMRDIIConfig}
+
+
+class SiteStack:
+    """
+    Sites (directories laid out like data/noisy_example) that share precip, temperature and
+    timestep, simulated together.
+
+    The input data is read once, from input_path (default: the first site), and each site's
+    simulation config gives its components. Baseflow and rdii components with the same
+    component_type and units are stacked into one ensemble, one member per site, and DWF
+    components are simulated per site. After run:
+        flow (np.ndarray): (M_sites x T) total flow, one row per site (in the order of sites)
+        get_site_flow(site), get_component_flow(site, component_label): views of the stacked
+            flows (not copies)
+
+    Args:
+        sites: site directories and/or glob patterns; sites are named by their directory
+            names, which must be unique
+        input_path: directory with the shared input data (and input_data_config_file)
+        input_data_config_file (str), simulation_config_file (str): file names within the
+            site directories (and input_path)
+    """
+
+    def __init__(
+        self,
+        sites: Sequence[Union[str, Path]],
+        input_path: Path = None,
+        input_data_config_file: str = "input_data_config.yaml",
+        simulation_config_file: str = "simulation_config.yaml",
+    ) -> None:
+        site_paths = get_site_paths(sites)
+        assert len(site_paths) > 0, "no sites"
+        for site_path in site_paths:
+            if not site_path.is_dir():
+                raise FileNotFoundError(f"site {site_path} is not a directory")
+        self.sites = [p.name for p in site_paths]
+        assert len(set(self.sites)) == len(
+            self.sites
+        ), "site directory names must be unique"
+        self.num_sites = len(self.sites)
+
+        # loads the shared input data, timestep and feature cache; the components are built
+        # here rather than by the model
+        self.model = AntecedentMoistureModel(
+            input_path or site_paths[0],
+            input_data_config_file=input_data_config_file,
+            simulation_config_file=simulation_config_file,
+            lazy_setup=True,
+        )
+        self.input_data = self.model.input_data
+        self.timestep = self.model.timestep
+        self.num_timesteps_input_data = self.model.num_timesteps_input_data
+
+        self.simulation_config_dicts = {}
+        for site, site_path in zip(self.sites, site_paths):
+            with open(Path(site_path, simulation_config_file), "r") as f:
+                simulation_config_dict = yaml.safe_load(f)
+            timestep = convert_units(
+                simulation_config_dict["timestep_units"],
+                INTERNAL_UNITS_TIME,
+                float(simulation_config_dict["timestep"]),
+            )
+            if timestep != self.timestep:
+                raise ValueError(
+                    f"site {site} has a timestep of {timestep} {INTERNAL_UNITS_TIME} "
+                    f"instead of {self.timestep}"
+                )
+            self.simulation_config_dicts[site] = simulation_config_dict
+
+        self._setup_components()
+
+    def _setup_components(self) -> None:
+        self.component_labels = {}
+        # (component_type, units) -> validated parameterization of each member
+        ensemble_members = {}
+        # per site, [(group key, row) or (None, DWF component)], in component order
+        self._site_components = {}
+        for site in self.sites:
+            simulation_config_dict = self.simulation_config_dicts[site]
+            self.component_labels[site] = override_components_to_include(
+                None, simulation_config_dict
+            )
+            self._site_components[site] = []
+            for component_label in self.component_labels[site]:
+                component_config_dict = simulation_config_dict["components"][
+                    component_label
+                ]
+                component_type = component_config_dict["component_type"]
+                if component_type in ENSEMBLE_COMPONENT_CLASSES:
+                    parameterization = CONFIG_CLASSES[component_type](
+                        **component_config_dict["parameterization"]
+                    ).model_dump()
+                    key = (component_type,) + tuple(
+                        (k, v)
+                        for k, v in parameterization.items()
+                        if isinstance(v, str)
+                    )
+                    members = ensemble_members.setdefault(key, [])
+                    self._site_components[site].append((key, len(members)))
+                    members.append(parameterization)
+                else:
+                    self._site_components[site].append(
+                        (
+                            None,
+                            COMPONENT_CLASSES[component_type](
+                                component_config_dict,
+                                self.input_data["precip"],
+                                self.input_data["temperature"],
+                                self.timestep,
+                            ),
+                        )
+                    )
+
+        self.ensembles = {}
+        for key, parameterizations in ensemble_members.items():
+            # units are shared within the group, numeric parameters vary by member
+            base_parameterization = dict(key[1:])
+            parameter_table = {
+                k: [p[k] for p in parameterizations]
+                for k in parameterizations[0]
+                if k not in base_parameterization
+            }
+            self.ensembles[key] = ENSEMBLE_COMPONENT_CLASSES[key[0]](
+                {
+                    "component_type": key[0],
+                    "parameterization": base_parameterization,
+                },
+                parameter_table,
+                self.input_data["precip"],
+                self.input_data["temperature"],
+                self.timestep,
+                feature_cache=self.model.feature_cache,
+            )
+
+        # rows of flow and of each ensemble's flow, to sum the components of all sites at once
+        self._flow_rows = {key: ([], []) for key in self.ensembles}
+        # (site, component_label) -> (ensemble key, row), for the initial conditions
+        self._ensemble_rows = {}
+        for i, site in enumerate(self.sites):
+            for component_label, (key, row) in zip(
+                self.component_labels[site], self._site_components[site]
+            ):
+                if key is not None:
+                    self._flow_rows[key][0].append(i)
+                    self._flow_rows[key][1].append(row)
+                    self._ensemble_rows[(site, component_label)] = (key, row)
+
+    def run(
+        self,
+        starting_timestep: int = 1,
+        initial_conditions: Dict[str, Dict[str, Dict[str, float]]] = None,
+        num_timesteps_to_run: int = None,
+    ) -> None:
+        """
+        Simulate all sites over the same interval.
+
+        Args:
+            starting_timestep (int): index/timestep to start simulation
+            initial_conditions: Dict
+                <site>: Dict, see AntecedentMoistureModel.run. Components without initial
+                    conditions start from their values on timestep = (starting_timestep - 1)
+                    (zero unless already simulated).
+            num_timesteps_to_run (int): number of timesteps (integer index) to simulate forward from starting_timestep
+        """
+        ensemble_initial_conditions = {
+            key: {
+                var: getattr(ensemble, var)[:, starting_timestep - 1].copy()
+                for var in ["total_capture_fraction", "flow"]
+            }
+            for key, ensemble in self.ensembles.items()
+        }
+        for site, site_initial_conditions in (
+            initial_conditions or {}
+        ).items():
+            for (
+                component_label,
+                component_initial_conditions,
+            ) in site_initial_conditions.items():
+                # DWF components have no initial conditions
+                if (
+                    not component_initial_conditions
+                    or (site, component_label) not in self._ensemble_rows
+                ):
+                    continue
+                key, row = self._ensemble_rows[(site, component_label)]
+                for var, values in ensemble_initial_conditions[key].items():
+                    values[row] = component_initial_conditions[var]
+        for key, ensemble in self.ensembles.items():
+            ensemble.run(
+                starting_timestep,
+                ensemble_initial_conditions[key],
+                num_timesteps_to_run,
+            )
+
+        self.flow = np.zeros((self.num_sites, self.num_timesteps_input_data))
+        for key, (site_rows, rows) in self._flow_rows.items():
+            # a site can have several components in the same ensemble
+            np.add.at(self.flow, site_rows, self.ensembles[key].flow[rows])
+        for i, site in enumerate(self.sites):
+            for key, component in self._site_components[site]:
+                if key is None:
+                    self.flow[i] += component.flow
+
+    def get_site_flow(self, site: str) -> np.ndarray:
+        """total flow of site (a row of flow)"""
+        return self.flow[self.sites.index(site)]
+
+    def get_component_flow(
+        self, site: str, component_label: str
+    ) -> np.ndarray:
+        """flow of one component of site (a row of its ensemble's flow)"""
+        key, component = self._site_components[site][
+            self.component_labels[site].index(component_label)
+        ]
+        if key is None:
+            return component.flow
+        return self.ensembles[key].flow[component]
@@ -0,0 +1,136 @@
+"""Per-stage timing and memory statistics of a model run."""
+
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Union
+
+_DISABLED_STAGE = contextlib.nullcontext()
+
+
+class RunStats:
+    """
+    Wall-clock seconds (and optionally tracemalloc peaks) of the stages of a model run, e.g.
+    loading the config files, reading and preparing the input data, computing features,
+    constructing and running each component, and exporting or plotting the results.
+
+    Stages are timed with
+        with stats.stage("read_input_data"):
+            ...
+        with stats.stage("run", component="rdii"):
+            ...
+    and a stage entered several times accumulates its seconds and calls. Stages can be nested
+    (e.g. features computed while constructing a component); an outer stage's time includes
+    its inner stages.
+
+    When disabled, stage() returns a shared no-op context manager, so instrumented code costs
+    a method call per stage.
+
+    Args:
+        enabled (bool): collect statistics
+        trace_memory (bool): also record, for each stage, the tracemalloc peak above the
+            memory traced when the stage started (peak_memory_bytes, the largest over its
+            calls). Tracing slows allocations down, and tracemalloc is started if it is not
+            already tracing. Peaks need Python >= 3.9 (tracemalloc.reset_peak), and are
+            approximate for stages that run concurrently in threads.
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = False):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name: str, component: str = None):
+        """context manager timing one call of a stage (of a component, if given)"""
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return self._stage(name, component)
+
+    @contextlib.contextmanager
+    def _stage(self, name: str, component: str):
+        stack = self._get_stack()
+        if self.trace_memory:
+            self._fold_peak(stack)
+            start_memory = tracemalloc.get_traced_memory()[0]
+        # [running peak of the stage]
+        stack.append([0])
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            peak_memory = None
+            if self.trace_memory:
+                self._fold_peak(stack)
+                peak_memory = max(stack[-1][0] - start_memory, 0)
+            stack.pop()
+            if stack and peak_memory is not None:
+                # the parent's peak includes this stage's
+                stack[-1][0] = max(stack[-1][0], peak_memory + start_memory)
+            self._record(name, component, seconds, peak_memory)
+
+    def _get_stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _fold_peak(self, stack) -> None:
+        """fold the tracemalloc peak since the last reset into the innermost stage"""
+        peak = tracemalloc.get_traced_memory()[1]
+        if stack:
+            stack[-1][0] = max(stack[-1][0], peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    def _record(
+        self, name: str, component: str, seconds: float, peak_memory: int
+    ) -> None:
+        with self._lock:
+            stage_stats = self._stages.setdefault(
+                (component, name), {"seconds": 0.0, "calls": 0}
+            )
+            stage_stats["seconds"] += seconds
+            stage_stats["calls"] += 1
+            if peak_memory is not None:
+                stage_stats["peak_memory_bytes"] = max(
+                    stage_stats.get("peak_memory_bytes", 0), peak_memory
+                )
+
+    def to_dict(self) -> Dict:
+        """
+        Returns:
+            Dict:
+                "stages": {stage name: {"seconds", "calls"[, "peak_memory_bytes"]}}
+                "components": {component label: {stage name: {...}}}
+        """
+        stats_dict = {"stages": {}, "components": {}}
+        with self._lock:
+            for (component, name), stage_stats in self._stages.items():
+                if component is None:
+                    stats_dict["stages"][name] = dict(stage_stats)
+                else:
+                    stats_dict["components"].setdefault(component, {})[
+                        name
+                    ] = dict(stage_stats)
+        return stats_dict
+
+    def to_json(self, path: Union[str, Path] = None, **json_kwargs) -> str:
+        """to_dict() as JSON, also written to path if given"""
+        stats_json = json.dumps(self.to_dict(), **json_kwargs)
+        if path is not None:
+            Path(path).write_text(stats_json)
+        return stats_json
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+
+DISABLED_STATS = RunStats(enabled=False)
@@ -7,6 +7,8 @@ class InputDataConfig(BaseModel):
     input_data_file: str = "input_data.csv"
     skip_rows: NonNegativeInt = 0
     timestamp_colname: str = "timestamp"
+    # strftime format of the timestamps (e.g. "%m/%d/%Y %H:%M"); inferred from the first row if None
+    timestamp_format: str = None
     precip_colname: str = "precip"
     precip_units: str = "INCHES"
     temperature_colname: str = "temperature"
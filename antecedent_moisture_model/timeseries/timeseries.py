@@ -1,9 +1,19 @@
-from typing import Dict
+import importlib.util
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
 
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
 from .datamodel import InputDataConfig
+from ..datatypes.sparse import SparseTimeseries
+from ..stats import DISABLED_STATS, RunStats
 from ..datatypes.units import (
     convert_units,
     INTERNAL_UNITS_PRECIP,
@@ -24,6 +34,12 @@ VARNAMES_INTERMEDIATE = [
     "addl_capture_fraction",
     "total_capture_fraction",
 ]
+# depths within a timestep are summed when aggregating to a coarser model timestep; all other
+# variables (temperature, flow rates, fractions) are averaged
+VARNAMES_SUMMED = ["precip"]
+
+AGGREGATED_INPUT_DATA_CACHE_MAX_ENTRIES = 8
+_aggregated_input_data_cache = OrderedDict()
 
 
 class TimeseriesSetup:
@@ -32,10 +48,17 @@ class TimeseriesSetup:
         input_data: pd.DataFrame,
         input_data_config: InputDataConfig,
         timestep: float = None,
+        dtype: type = np.float64,
+        aggregate: bool = True,
+        sparse_precip: bool = False,
     ) -> None:
         self.input_data = input_data
         self.config = input_data_config
         self.timestep = timestep
+        self.dtype = dtype
+        self.aggregate = aggregate
+        self.sparse_precip = sparse_precip
+        self.aggregation_steps = 1
         self.num_timesteps_input_data = self.input_data.shape[0]
 
     def run(self) -> Dict[str, np.ndarray]:
@@ -44,35 +67,58 @@ class TimeseriesSetup:
         self._verify_timestamp()
         timeseries_dict["timestamp"] = self._get_timestamp()
 
-        varnames = VARNAMES_WEATHER
-        if self.config.has_flow_data:
-            varnames += VARNAMES_FLOW
-        if self.config.has_intermediate_data:
-            varnames += VARNAMES_INTERMEDIATE
-
-        for var in varnames:
+        for var in get_input_data_varnames(self.config):
             timeseries_dict[var] = self._get_single_timeseries(var)
 
+        if self.aggregation_steps > 1:
+            timeseries_dict = aggregate_timeseries(
+                timeseries_dict, self.aggregation_steps
+            )
+
+        if self.sparse_precip:
+            timeseries_dict["precip"] = SparseTimeseries.from_dense(
+                timeseries_dict["precip"]
+            )
+
         return timeseries_dict
 
     def _verify_timestamp(self) -> pd.DatetimeIndex:
-        if not isinstance(
-            self.input_data[self.config.timestamp_colname].iloc[0], str
-        ):
+        timestamp = self.input_data[self.config.timestamp_colname]
+        if pd.api.types.is_datetime64_any_dtype(timestamp):
+            # already parsed, e.g. ISO timestamps read with the pyarrow engine
+            self.input_data.index = pd.DatetimeIndex(timestamp)
+        elif isinstance(timestamp.iloc[0], str):
+            try:
+                self.input_data.index = parse_timestamp(
+                    timestamp, self.config.timestamp_format
+                )
+            except ValueError as e:
+                raise InvalidOrMissingTimestampException(str(e)) from e
+        else:
             raise InvalidOrMissingTimestampException
-        self.input_data.index = pd.DatetimeIndex(
-            self.input_data[self.config.timestamp_colname]
-        )
 
-        min_timestep = np.diff(self.input_data.index.values).min().astype(int)
-        max_timestep = np.diff(self.input_data.index.values).max().astype(int)
+        timesteps = np.diff(self.input_data.index.values)
+        min_timestep = timesteps.min()
+        max_timestep = timesteps.max()
         if not np.abs(min_timestep / max_timestep - 1) < 0.01:
             raise InvalidOrMissingTimestampException
 
         if self.timestep is not None:
-            timestep_hours = max_timestep / (60 * 60 * 1e9)
-            if not timestep_hours - self.timestep < 1e-3:
-                raise InvalidOrMissingTimestampException
+            # the model timestep must be a whole multiple of the data timestep
+            timestep_hours = max_timestep / np.timedelta64(1, "h")
+            aggregation_steps = self.timestep / timestep_hours
+            if not (
+                round(aggregation_steps) >= 1
+                and np.abs(aggregation_steps - round(aggregation_steps)) < 1e-3
+            ):
+                raise InvalidOrMissingTimestampException(
+                    f"model timestep ({self.timestep} h) is not a multiple of the data timestep ({timestep_hours} h)"
+                )
+            self.aggregation_steps = int(round(aggregation_steps))
+            if self.aggregation_steps > 1 and not self.aggregate:
+                raise InvalidOrMissingTimestampException(
+                    f"model timestep ({self.timestep} h) must equal the data timestep ({timestep_hours} h)"
+                )
 
     def _get_timestamp(self) -> pd.DatetimeIndex:
         return self.input_data.index
@@ -92,13 +138,12 @@ class TimeseriesSetup:
         return timeseries
 
     def _clean_timeseries(self, timeseries: pd.Series) -> np.ndarray:
-        timeseries = timeseries.astype(float)
-
-        timeseries = timeseries.to_numpy()
+        # the only copy of the column: one contiguous buffer, which is cleaned and converted in place
+        timeseries = timeseries.to_numpy(dtype=self.dtype, copy=True)
 
         # set NANs to 0, following AMM spreadsheet Tab 20, since that is how Excel treats NANs for formulas
         # TODO after verification: might be better to take an incomplete averaging or something instead of using zero?
-        timeseries = np.nan_to_num(timeseries, nan=0.0, copy=True)
+        np.nan_to_num(timeseries, nan=0.0, copy=False)
 
         return timeseries
 
@@ -113,17 +158,24 @@ class TimeseriesSetup:
         """
         if "precip" in var:
             timeseries = convert_units(
-                self.config.precip_units, INTERNAL_UNITS_PRECIP, timeseries
+                self.config.precip_units,
+                INTERNAL_UNITS_PRECIP,
+                timeseries,
+                out=timeseries,
             )
         elif "temperature" in var:
             timeseries = convert_units(
                 self.config.temperature_units,
                 INTERNAL_UNITS_TEMPERATURE,
                 timeseries,
+                out=timeseries,
             )
         elif "flow" in var:
             timeseries = convert_units(
-                self.config.flow_units, INTERNAL_UNITS_FLOW, timeseries
+                self.config.flow_units,
+                INTERNAL_UNITS_FLOW,
+                timeseries,
+                out=timeseries,
             )
         return timeseries
 
@@ -131,7 +183,10 @@ class TimeseriesSetup:
 def setup_timeseries(
     input_data: pd.DataFrame,
     input_data_config: InputDataConfig,
-    timestep_hours: int = None,
+    timestep_hours: float = None,
+    dtype: type = np.float64,
+    aggregate: bool = True,
+    sparse_precip: bool = False,
 ):
     """
     Function for preparing input data for use with AMM model
@@ -145,14 +200,253 @@ def setup_timeseries(
                 Must include intermediate variables if has_intermediate_data==True in config.
                 See InputDataConfig definition for more details.
         input_data_config: InputDataConfig object
-        timestep_hours (int): model timestep. Curretnly must be equal to data timestep, but this isn't necessary constraint.
+        timestep_hours (float): model timestep. Must be a whole multiple of the data timestep. If it is
+            coarser, the data are aggregated (see aggregate_timeseries). If None, the data timestep is used.
+        dtype: float dtype of the returned arrays (np.float64 or np.float32). Each array is a
+            single buffer, cleaned and converted to internal units in place.
+        aggregate (bool): if False, a model timestep coarser than the data timestep raises an
+            InvalidOrMissingTimestampException instead of aggregating.
+        sparse_precip (bool): return precip as a SparseTimeseries (nonzero values only), e.g. for
+            long, mostly dry high-resolution records.
 
     Return:
         Dict:
             "timestamp": pd.DateTimeIndex
-            "precip": np.ndarray
+            "precip": np.ndarray (or SparseTimeseries)
             "temperature": np.ndarray
             if has_flow_data or has_intermediate_data, these will be included as well.
 
     """
-    return TimeseriesSetup(input_data, input_data_config, timestep_hours).run()
+    return TimeseriesSetup(
+        input_data,
+        input_data_config,
+        timestep_hours,
+        dtype,
+        aggregate,
+        sparse_precip,
+    ).run()
+
+
+def aggregate_timeseries(
+    timeseries_dict: Dict, aggregation_steps: int
+) -> Dict:
+    """
+    Aggregate prepared input data to a timestep aggregation_steps times coarser.
+
+    Precip (a depth within the timestep) is summed and all other variables are averaged.
+    Like pd.DataFrame.resample, model timesteps are aligned to multiples of the model timestep
+    (e.g. midnight for a 1-day timestep) and labelled by their first data timestamp; incomplete
+    model timesteps at the start and end of the record are dropped.
+
+    Args:
+        timeseries_dict: output of TimeseriesSetup.run() at the data timestep
+        aggregation_steps (int): data timesteps per model timestep
+
+    Returns:
+        Dict: same keys as timeseries_dict
+    """
+    timestamp = timeseries_dict["timestamp"]
+    model_timestep = (timestamp[1] - timestamp[0]) * aggregation_steps
+    start = int(
+        round(
+            (timestamp[0].ceil(model_timestep) - timestamp[0])
+            / (timestamp[1] - timestamp[0])
+        )
+    )
+    num_timesteps = (len(timestamp) - start) // aggregation_steps
+    end = start + num_timesteps * aggregation_steps
+
+    aggregated_dict = {}
+    for var, timeseries in timeseries_dict.items():
+        if var == "timestamp":
+            aggregated_dict[var] = timestamp[start:end:aggregation_steps]
+            continue
+        # one reduction over a (num_timesteps, aggregation_steps) view
+        blocks = timeseries[start:end].reshape(
+            num_timesteps, aggregation_steps
+        )
+        if var in VARNAMES_SUMMED:
+            aggregated_dict[var] = blocks.sum(axis=1)
+        else:
+            aggregated_dict[var] = blocks.mean(axis=1)
+    return aggregated_dict
+
+
+def load_input_data(
+    input_data_path: Path,
+    input_data_config: InputDataConfig,
+    timestep_hours: float = None,
+    dtype: type = np.float64,
+    sparse_precip: bool = False,
+    stats: RunStats = DISABLED_STATS,
+) -> Dict:
+    """
+    Read (read_input_data) and prepare (setup_timeseries) an input data file.
+
+    Input data aggregated to a coarser model timestep are kept in a small in-process cache,
+    keyed by the file (path, size and modification time), the config, timestep_hours and dtype,
+    so building a model again on the same site (e.g. with other parameters) skips reading and
+    aggregating. Cached arrays are shared, so they are set read-only.
+    Reading and preparing are timed as stages "read_input_data" and "setup_timeseries" of stats.
+    """
+    input_data_path = Path(input_data_path).resolve()
+    input_data_stat = input_data_path.stat()
+    key = (
+        str(input_data_path),
+        input_data_stat.st_size,
+        input_data_stat.st_mtime_ns,
+        input_data_config.model_dump_json(),
+        timestep_hours,
+        np.dtype(dtype).str,
+        sparse_precip,
+    )
+    if key in _aggregated_input_data_cache:
+        _aggregated_input_data_cache.move_to_end(key)
+        return dict(_aggregated_input_data_cache[key])
+
+    with stats.stage("read_input_data"):
+        raw_input_data = read_input_data(
+            input_data_path, input_data_config, dtype=dtype
+        )
+    timeseries_setup = TimeseriesSetup(
+        raw_input_data,
+        input_data_config,
+        timestep_hours,
+        dtype,
+        sparse_precip=sparse_precip,
+    )
+    with stats.stage("setup_timeseries"):
+        input_data = timeseries_setup.run()
+    if timeseries_setup.aggregation_steps > 1:
+        for timeseries in input_data.values():
+            if isinstance(timeseries, np.ndarray):
+                timeseries.flags.writeable = False
+            elif isinstance(timeseries, SparseTimeseries):
+                timeseries.indices.flags.writeable = False
+                timeseries.values.flags.writeable = False
+        _aggregated_input_data_cache[key] = input_data
+        while (
+            len(_aggregated_input_data_cache)
+            > AGGREGATED_INPUT_DATA_CACHE_MAX_ENTRIES
+        ):
+            _aggregated_input_data_cache.popitem(last=False)
+        input_data = dict(input_data)
+    return input_data
+
+
+def parse_timestamp(
+    timestamp: pd.Series, timestamp_format: str = None
+) -> pd.DatetimeIndex:
+    """
+    Parse timestamp strings that share one fixed format.
+
+    Args:
+        timestamp: pd.Series of strings
+        timestamp_format (str): strftime format. Inferred from the first timestamp if None.
+
+    The strings are parsed with pyarrow.compute.strptime if pyarrow is installed (an order of
+    magnitude faster than pd.to_datetime for non-ISO formats such as "%m/%d/%Y %H:%M"),
+    and with pd.to_datetime otherwise, or if pyarrow cannot parse them.
+    Raises ValueError if the timestamps don't match the format.
+    """
+    if timestamp_format is None:
+        timestamp_format = guess_datetime_format(timestamp.iloc[0])
+    if (
+        timestamp_format is not None
+        and not any(f in timestamp_format for f in ["%f", "%z", "%Z"])
+        and importlib.util.find_spec("pyarrow") is not None
+    ):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        try:
+            return pd.DatetimeIndex(
+                pc.strptime(
+                    pa.array(timestamp), format=timestamp_format, unit="s"
+                ).to_numpy(zero_copy_only=False),
+                name=timestamp.name,
+            )
+        except (ValueError, pa.ArrowException):
+            pass
+    return pd.DatetimeIndex(pd.to_datetime(timestamp, format=timestamp_format))
+
+
+def get_input_data_varnames(input_data_config: InputDataConfig) -> List[str]:
+    varnames = list(VARNAMES_WEATHER)
+    if input_data_config.has_flow_data:
+        varnames += VARNAMES_FLOW
+    if input_data_config.has_intermediate_data:
+        varnames += VARNAMES_INTERMEDIATE
+    return varnames
+
+
+def get_input_data_colnames(input_data_config: InputDataConfig) -> List[str]:
+    """
+    Names of the input data columns used by setup_timeseries, given the config.
+    """
+    colnames = [input_data_config.timestamp_colname]
+    for var in get_input_data_varnames(input_data_config):
+        colname = input_data_config.__getattribute__(f"{var}_colname")
+        if colname is not None and colname not in colnames:
+            colnames.append(colname)
+    return colnames
+
+
+def get_read_csv_kwargs(
+    input_data_path: Path,
+    input_data_config: InputDataConfig,
+    engine: str = None,
+    dtype: type = np.float64,
+) -> Dict:
+    """
+    Keyword arguments for pd.read_csv that read only the configured columns, with float dtypes.
+
+    Configured columns that are not in the file are left out here, so that setup_timeseries
+    reports them with a MissingDataColumnException.
+
+    Args:
+        input_data_path: input data csv file
+        input_data_config: InputDataConfig object
+        engine (str): pd.read_csv engine. Defaults to "pyarrow" if pyarrow is installed, "c" otherwise.
+        dtype: float dtype of the data columns
+    """
+    if engine is None:
+        engine = (
+            "pyarrow"
+            if importlib.util.find_spec("pyarrow") is not None
+            else "c"
+        )
+    header = pd.read_csv(
+        input_data_path, skiprows=input_data_config.skip_rows, nrows=0
+    ).columns
+    usecols = [
+        c for c in get_input_data_colnames(input_data_config) if c in header
+    ]
+    dtype = {
+        c: dtype for c in usecols if c != input_data_config.timestamp_colname
+    }
+    read_csv_kwargs = {"usecols": usecols, "dtype": dtype, "engine": engine}
+    if engine == "pyarrow":
+        # the pyarrow engine applies skiprows after the header row, so count it into header instead
+        read_csv_kwargs["header"] = input_data_config.skip_rows
+    else:
+        read_csv_kwargs["skiprows"] = input_data_config.skip_rows
+    return read_csv_kwargs
+
+
+def read_input_data(
+    input_data_path: Path,
+    input_data_config: InputDataConfig,
+    engine: str = None,
+    dtype: type = np.float64,
+) -> pd.DataFrame:
+    """
+    Read the configured columns of an input data csv file, for setup_timeseries.
+    See get_read_csv_kwargs.
+    """
+    return pd.read_csv(
+        input_data_path,
+        **get_read_csv_kwargs(
+            input_data_path, input_data_config, engine, dtype
+        ),
+    )
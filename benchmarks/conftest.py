@@ -0,0 +1,44 @@
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from .synthetic import write_synthetic_site
+
+# record label -> (years, timestep minutes)
+RECORDS = {
+    f"{years}y-{timestep_minutes}min": (years, timestep_minutes)
+    for timestep_minutes in [5, 1]
+    for years in [1, 10, 30]
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--records",
+        default="1y-5min",
+        help=f"comma separated records to benchmark, or 'all' ({', '.join(RECORDS)})",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "record" in metafunc.fixturenames:
+        records = metafunc.config.getoption("records")
+        records = list(RECORDS) if records == "all" else records.split(",")
+        metafunc.parametrize("record", records, scope="session")
+
+
+@pytest.fixture(scope="session")
+def site_path(record, tmp_path_factory):
+    years, timestep_minutes = RECORDS[record]
+    return write_synthetic_site(
+        tmp_path_factory.mktemp(record), years, timestep_minutes
+    )
+
+
+@pytest.fixture(scope="session")
+def model(site_path):
+    """model over the synthetic site, after one run"""
+    mcamm = AntecedentMoistureModel(site_path)
+    mcamm.run()
+    return mcamm
@@ -0,0 +1,153 @@
+"""Synthetic sites (input data and config files) for the benchmarks."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# fraction of timesteps in a storm, and mean storm duration and intensity: mostly dry records
+# like the 5-minute gauges the model is run on
+STORM_FRACTION = 0.04
+STORM_MEAN_HOURS = 6.0
+STORM_MEAN_INCHES_PER_HOUR = 0.1
+
+SIMULATION_CONFIG_DICT = {
+    "components_to_use": ["dwf", "baseflow", "rdii"],
+    "timestep_units": "HOURS",
+    "components": {
+        "dwf": {
+            "component_type": "dwf",
+            "parameterization": {
+                "base_wastewater_flow": 3.0,
+                "flow_units": "CUBICFEETPERSECOND",
+                "sin_t_shift_hours": 9.0,
+                "time_parameters_units": "HOURS",
+                "sin_amplitude_fraction": 0.2,
+            },
+        },
+        "baseflow": {
+            "component_type": "baseflow",
+            "parameterization": {
+                "catchment_area": 3000.0,
+                "hydrograph_half_life_time": 200.0,
+                "dry_weather_capture_fraction": 0.03,
+                "precip_averaging_time": 130.0,
+                "temperature_averaging_time": 720.0,
+                "cold_temperature": 30.0,
+                "addl_capture_fraction_cold": 0.1,
+                "hot_temperature": 70.0,
+                "addl_capture_fraction_hot": 0.001,
+                "time_parameters_units": "HOURS",
+                "catchment_area_units": "ACRES",
+                "temperature_parameters_units": "FAHRENHEIT",
+            },
+        },
+        "rdii": {
+            "component_type": "rdii",
+            "parameterization": {
+                "catchment_area": 3000.0,
+                "hydrograph_half_life_time": 14.0,
+                "dry_weather_capture_fraction": 0.03,
+                "antecedent_moisture_half_life_time": 7.0,
+                "precip_averaging_time": 0.4,
+                "temperature_averaging_time": 720.0,
+                "cold_temperature": 30.0,
+                "addl_capture_fraction_cold": 0.1,
+                "hot_temperature": 70.0,
+                "addl_capture_fraction_hot": 0.001,
+                "time_parameters_units": "HOURS",
+                "catchment_area_units": "ACRES",
+                "temperature_parameters_units": "FAHRENHEIT",
+            },
+        },
+    },
+}
+
+INPUT_DATA_CONFIG_DICT = {
+    "input_data_file": "timeseries.csv",
+    "skip_rows": 0,
+    "timestamp_colname": "timestamp",
+    "precip_colname": "precip_in",
+    "precip_units": "INCHES",
+    "temperature_colname": "temperature_F",
+    "temperature_units": "FAHRENHEIT",
+    "has_flow_data": True,
+    "flow_colname": "flow_cfs",
+    "flow_units": "CUBICFEETPERSECOND",
+}
+
+
+def get_synthetic_input_data(
+    years: float, timestep_minutes: int, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Input data like a raw input data file: string timestamps, precip (inches within the
+    timestep) with storms of random duration and intensity, a seasonal and diurnal
+    temperature cycle (F) with noise, and an observed flow (cfs) with a noisy diurnal cycle.
+    """
+    rng = np.random.default_rng(seed)
+    num_timesteps = int(years * 365 * 24 * 60 / timestep_minutes)
+    timestep_hours = timestep_minutes / 60
+
+    precip = np.zeros(num_timesteps)
+    mean_storm_timesteps = STORM_MEAN_HOURS / timestep_hours
+    num_storms = int(num_timesteps * STORM_FRACTION / mean_storm_timesteps)
+    storm_starts = rng.integers(0, num_timesteps, num_storms)
+    storm_timesteps = rng.exponential(mean_storm_timesteps, num_storms)
+    storm_intensities = rng.exponential(
+        STORM_MEAN_INCHES_PER_HOUR * timestep_hours, num_storms
+    )
+    for start, duration, intensity in zip(
+        storm_starts, storm_timesteps.astype(int) + 1, storm_intensities
+    ):
+        precip[start : start + duration] = intensity
+
+    hours = np.arange(num_timesteps) * timestep_hours
+    temperature = (
+        50.0
+        - 25.0 * np.cos(2 * np.pi * hours / (365 * 24))
+        - 8.0 * np.cos(2 * np.pi * (hours - 3) / 24)
+        + rng.normal(0.0, 2.0, num_timesteps)
+    )
+    flow = (
+        3.0
+        + 0.6 * np.sin(2 * np.pi * (hours - 9) / 24)
+        + rng.normal(0.0, 0.1, num_timesteps)
+    )
+
+    timestamp = pd.date_range(
+        "2000-01-01", periods=num_timesteps, freq=f"{timestep_minutes}min"
+    )
+    return pd.DataFrame(
+        {
+            "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            "precip_in": precip.round(4),
+            "temperature_F": temperature.round(2),
+            "flow_cfs": flow.round(3),
+        }
+    )
+
+
+def write_synthetic_site(
+    site_path: Path, years: float, timestep_minutes: int, seed: int = 0
+) -> Path:
+    """
+    Write a site directory (timeseries.csv, input_data_config.yaml, simulation_config.yaml)
+    with a dwf, baseflow and rdii component, simulated at the data timestep.
+    """
+    site_path = Path(site_path)
+    site_path.mkdir(parents=True, exist_ok=True)
+    get_synthetic_input_data(years, timestep_minutes, seed).to_csv(
+        Path(site_path, INPUT_DATA_CONFIG_DICT["input_data_file"]),
+        index=False,
+    )
+    with open(Path(site_path, "input_data_config.yaml"), "w") as f:
+        yaml.safe_dump(INPUT_DATA_CONFIG_DICT, f)
+    with open(Path(site_path, "simulation_config.yaml"), "w") as f:
+        yaml.safe_dump(
+            dict(SIMULATION_CONFIG_DICT, timestep=timestep_minutes / 60),
+            f,
+            sort_keys=False,
+        )
+    return site_path
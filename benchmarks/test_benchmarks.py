@@ -0,0 +1,152 @@
+"""
+Benchmarks of the hot paths, on synthetic records (see benchmarks/synthetic.py).
+
+Not part of the default test run (setup.cfg sets testpaths = tests). Run with
+    pytest benchmarks [--records 1y-5min,10y-1min | --records all]
+which needs pytest-benchmark. Each benchmark also records the peak memory (bytes, traced
+with tracemalloc over one extra call) in extra_info["peak_memory_bytes"], so it is saved
+with --benchmark-autosave / --benchmark-json and can be compared between releases.
+"""
+
+import tracemalloc
+from pathlib import Path
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from antecedent_moisture_model.antecedent_moisture_model import (  # noqa: E402
+    COMPONENT_CLASSES,
+)
+from antecedent_moisture_model.postprocess.dataexport import (  # noqa: E402
+    export_to_csv,
+)
+from antecedent_moisture_model.postprocess.plotter import (  # noqa: E402
+    plot_simulated_results,
+)
+from antecedent_moisture_model.simulator.calculations import (  # noqa: E402
+    get_moving_avg_backward,
+    get_moving_avg_steps,
+)
+from antecedent_moisture_model.datatypes.units import (  # noqa: E402
+    convert_units,
+    INTERNAL_UNITS_TIME,
+)
+from antecedent_moisture_model.timeseries.timeseries import (  # noqa: E402
+    read_input_data,
+    setup_timeseries,
+)
+
+matplotlib.use("Agg")
+
+ROUNDS = 3
+
+
+def run_benchmark(benchmark, function, *args, **kwargs):
+    """time function with a fixed number of rounds, and record its peak memory"""
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_memory_bytes"] = peak_memory
+    return benchmark.pedantic(
+        function,
+        args=args,
+        kwargs=kwargs,
+        rounds=ROUNDS,
+        iterations=1,
+    )
+
+
+def test_read_input_data(benchmark, model):
+    input_data_path = Path(
+        model.input_path, model.input_data_config.input_data_file
+    )
+    run_benchmark(
+        benchmark, read_input_data, input_data_path, model.input_data_config
+    )
+
+
+def test_setup_timeseries(benchmark, model):
+    raw_input_data = read_input_data(
+        Path(model.input_path, model.input_data_config.input_data_file),
+        model.input_data_config,
+    )
+    run_benchmark(
+        benchmark,
+        lambda: setup_timeseries(
+            raw_input_data.copy(deep=False), model.input_data_config
+        ),
+    )
+
+
+@pytest.mark.parametrize("averaging_hours", [0.4, 130.0, 720.0])
+def test_get_moving_avg_backward(benchmark, model, averaging_hours):
+    moving_avg_steps = get_moving_avg_steps(
+        convert_units("HOURS", INTERNAL_UNITS_TIME, averaging_hours),
+        model.timestep,
+    )
+    run_benchmark(
+        benchmark,
+        get_moving_avg_backward,
+        model.input_data["precip"],
+        moving_avg_steps,
+    )
+
+
+@pytest.mark.parametrize("component_label", ["dwf", "baseflow", "rdii"])
+def test_component_construction(benchmark, model, component_label):
+    component_config_dict = model.simulation_config_dict["components"][
+        component_label
+    ]
+    # without a feature cache, so every round computes the features
+    run_benchmark(
+        benchmark,
+        COMPONENT_CLASSES[component_config_dict["component_type"]],
+        component_config_dict,
+        model.input_data["precip"],
+        model.input_data["temperature"],
+        model.timestep,
+    )
+
+
+@pytest.mark.parametrize("component_label", ["dwf", "baseflow", "rdii"])
+def test_component_run(benchmark, model, component_label):
+    component = model.amm_components[
+        model.component_labels.index(component_label)
+    ]
+    run_benchmark(benchmark, component.run)
+
+
+def test_model_run(benchmark, model):
+    run_benchmark(benchmark, model.run)
+
+
+def test_export_to_csv(benchmark, model, tmp_path):
+    run_benchmark(
+        benchmark,
+        export_to_csv,
+        model.component_labels,
+        model.input_data,
+        model.amm_components,
+        model.flow,
+        Path(tmp_path, "results.csv"),
+    )
+
+
+def test_plot_simulated_results(benchmark, model, tmp_path):
+    def plot():
+        plot_simulated_results(
+            model.component_labels,
+            model.input_data,
+            model.amm_components,
+            model.flow,
+            Path(tmp_path, "results.png"),
+        )
+        plt.close("all")
+
+    run_benchmark(benchmark, plot)
@@ -31,7 +31,9 @@ setup(
     ],
     description="Python implementation of an Antecedent Moisture Model (AMM)",
     entry_points={
-        "console_scripts": [],
+        "console_scripts": [
+            "amm=antecedent_moisture_model.cli:main",
+        ],
     },
     install_requires=requirements,
     long_description=readme + "\n\n" + history,
@@ -0,0 +1,84 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.calibration.calibrator import AMMCalibrator
+
+base_input_path = Path("tests/data")
+
+
+@pytest.fixture(scope="module")
+def calibrator():
+    # observed flow in tab20 was generated with hydrograph_half_life_time=22.76, dry_weather_capture_fraction=0.01
+    mcamm = AntecedentMoistureModel(Path(base_input_path, "spreadsheet_tab20"))
+    return AMMCalibrator(
+        mcamm,
+        [
+            "rdii_hydrograph_half_life_time",
+            "rdii_dry_weather_capture_fraction",
+        ],
+        [(5.0, 50.0), (0.0, 0.05)],
+    )
+
+
+def test_calibrator_loss_at_reference_parameters(calibrator):
+    assert calibrator.evaluate([22.76, 0.01]) == pytest.approx(0.0, abs=1e-6)
+
+
+def test_calibrator_optimize_recovers_reference_parameters(calibrator):
+    result = calibrator.optimize()
+    assert result.best_parameters[
+        "rdii_hydrograph_half_life_time"
+    ] == pytest.approx(22.76, rel=0.01)
+    assert result.best_parameters[
+        "rdii_dry_weather_capture_fraction"
+    ] == pytest.approx(0.01, rel=0.01)
+
+
+def test_calibrator_lhs_sample(calibrator):
+    result = calibrator.sample(50, seed=0)
+    assert result.parameter_vectors.shape == (50, 2)
+    assert result.best_loss == result.losses.min()
+    assert 1 - result.best_loss > 0.9
+
+
+def test_calibrator_sample_rejects_unknown_method(calibrator):
+    with pytest.raises(ValueError, match="sobol"):
+        calibrator.sample(10, method="sobol")
+
+
+def test_calibrator_parameters_go_to_the_longest_matching_component(
+    tmp_path,
+):
+    site_path = Path(tmp_path, "site")
+    shutil.copytree(Path(base_input_path, "spreadsheet_tab20"), site_path)
+    simulation_config_path = Path(site_path, "simulation_config.yaml")
+    simulation_config_dict = yaml.safe_load(simulation_config_path.read_text())
+    simulation_config_dict["components"]["rdii_fast"] = dict(
+        simulation_config_dict["components"]["rdii"]
+    )
+    # rdii is listed first, and rdii_fast_catchment_area starts with rdii_
+    simulation_config_dict["components_to_use"] = ["rdii", "rdii_fast"]
+    simulation_config_path.write_text(yaml.safe_dump(simulation_config_dict))
+
+    mcamm = AntecedentMoistureModel(site_path)
+    calibrator = AMMCalibrator(
+        mcamm, ["rdii_fast_catchment_area"], [(1000.0, 8000.0)]
+    )
+    assert calibrator._calibrated_component_labels == ["rdii_fast"]
+
+    expected = AntecedentMoistureModel(
+        site_path,
+        params_to_override_labels=["rdii_fast_catchment_area"],
+        params_to_override_values=[2000.0],
+    )
+    expected.run()
+    np.testing.assert_array_equal(
+        calibrator.simulate([2000.0]), expected.flow[1:]
+    )
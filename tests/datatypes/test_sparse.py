@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.datatypes.sparse import SparseTimeseries
+
+
+def get_gauges():
+    rng = np.random.default_rng(0)
+    a = np.where(rng.random((3, 1000)) < 0.05, rng.random((3, 1000)), 0.0)
+    a[1] = 0.0
+    return a
+
+
+def test_sparse_timeseries_round_trip():
+    a = get_gauges()
+    sparse = SparseTimeseries.from_dense(a)
+    assert sparse.shape == a.shape
+    assert sparse.indices.dtype == np.int32
+    assert sparse.nbytes < a.nbytes / 4
+    np.testing.assert_array_equal(sparse.indptr[1:2], sparse.indptr[2:3])
+    np.testing.assert_array_equal(np.asarray(sparse), a)
+
+    sparse_1d = SparseTimeseries.from_dense(a[0])
+    assert sparse_1d.shape == (1000,)
+    assert len(sparse_1d) == 1000
+    np.testing.assert_array_equal(sparse_1d.to_dense(), a[0])
+
+
+def test_sparse_timeseries_slices():
+    a = get_gauges()
+    np.testing.assert_array_equal(
+        SparseTimeseries.from_dense(a).slice_timesteps(100, 900).to_dense(),
+        a[:, 100:900],
+    )
+    sparse_1d = SparseTimeseries.from_dense(a[0])
+    np.testing.assert_array_equal(np.asarray(sparse_1d[250:]), a[0, 250:])
+    with pytest.raises(IndexError):
+        sparse_1d[5]
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.datatypes.units import convert_units
+
+
+@pytest.mark.parametrize(
+    "starting_units, ending_units",
+    [
+        ("INCHES", "FEET"),
+        ("FEET", "CENTIMETERS"),
+        ("CELSIUS", "FAHRENHEIT"),
+        ("FAHRENHEIT", "CELSIUS"),
+        ("LITERSPERSECOND", "CUBICFEETPERSECOND"),
+        ("FAHRENHEIT", "FAHRENHEIT"),
+    ],
+)
+def test_convert_units_in_place(starting_units, ending_units):
+    values = np.linspace(-10.0, 50.0, 13)
+    expected = convert_units(starting_units, ending_units, values)
+
+    out = values.copy()
+    result = convert_units(starting_units, ending_units, out, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, expected)
+
+    out = np.empty_like(values)
+    result = convert_units(starting_units, ending_units, values, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, expected)
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.postprocess.dataexport import read_results
+
+base_input_path = Path("tests/data")
+
+
+@pytest.fixture(scope="module")
+def mcamm():
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20-21")
+    )
+    mcamm.run()
+    return mcamm
+
+
+@pytest.mark.parametrize("file_format", ["csv", "npz", "parquet", "feather"])
+def test_export_results_round_trip(mcamm, tmp_path, file_format):
+    if file_format in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+    filename_path = Path(tmp_path, f"results.{file_format}")
+    mcamm.export_results(filename_path, columns="all")
+    results_df = read_results(filename_path)
+
+    assert len(results_df) == mcamm.num_timesteps_input_data
+    assert results_df.index[1] - results_df.index[0] == np.timedelta64(1, "h")
+    np.testing.assert_allclose(
+        results_df["total_flow_CUBICFEETPERSECOND"], mcamm.flow, rtol=1e-12
+    )
+    np.testing.assert_allclose(
+        results_df["rdii_addl_capture_fraction"],
+        mcamm.amm_components[1].addl_capture_fraction,
+        rtol=1e-12,
+    )
+
+
+def test_export_results_flow_columns_float32(mcamm, tmp_path):
+    filename_path = Path(tmp_path, "results.npz")
+    mcamm.export_results(filename_path, columns="flow", float32=True)
+    results_df = read_results(filename_path)
+    assert list(results_df.columns) == [
+        "observed_flow_CUBICFEETPERSECOND",
+        "baseflow_flow_CUBICFEETPERSECOND",
+        "rdii_flow_CUBICFEETPERSECOND",
+        "total_flow_CUBICFEETPERSECOND",
+    ]
+    assert results_df.dtypes.eq(np.float32).all()
+    np.testing.assert_allclose(
+        results_df["total_flow_CUBICFEETPERSECOND"], mcamm.flow, rtol=1e-6
+    )
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.simulator.calculations import (
+    get_vectorized_difference_equation_simulation,
+)
+
+base_input_path = Path("tests/data")
+
+
+def test_blocked_difference_equation_matches_lfilter():
+    rng = np.random.default_rng(0)
+    additive_component = rng.random((3, 5000))
+    multipliers = np.array([0.2, 0.97, 0.9999])
+    initial_conditions = np.array([1.0, 0.0, 5.0])
+    simulated = get_vectorized_difference_equation_simulation(
+        additive_component, multipliers, initial_conditions
+    )
+    for i in range(3):
+        expected = get_vectorized_difference_equation_simulation(
+            additive_component[i], multipliers[i], initial_conditions[i]
+        )
+        np.testing.assert_allclose(simulated[i], expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize("component_label", ["baseflow", "rdii"])
+def test_ensemble_rows_match_single_runs(component_label):
+    input_path = Path(base_input_path, "spreadsheet_tab20-21")
+    parameter_table = {
+        "hydrograph_half_life_time": [22.76, 10.0, 380.0],
+        "dry_weather_capture_fraction": [0.01, 0.02, 0.0],
+        "precip_averaging_time": [1.0, 1.0, 24.0],
+        "addl_capture_fraction_cold": [0.05, 0.03, 0.1],
+    }
+    mcamm = AntecedentMoistureModel(input_path)
+    ensemble = mcamm.run_ensemble(component_label, parameter_table)
+    assert ensemble.flow.shape == (3, mcamm.num_timesteps_input_data)
+
+    for i in range(3):
+        row = {k: v[i] for k, v in parameter_table.items()}
+        single = AntecedentMoistureModel(
+            input_path,
+            components_to_include_override=[component_label],
+            params_to_override_labels=[f"{component_label}_{k}" for k in row],
+            params_to_override_values=list(row.values()),
+        )
+        single.run()
+        component = single.amm_components[0]
+        np.testing.assert_allclose(
+            ensemble.flow[i], component.flow, rtol=1e-8, atol=1e-10
+        )
+        np.testing.assert_allclose(
+            ensemble.total_capture_fraction[i],
+            component.total_capture_fraction,
+            rtol=1e-8,
+            atol=1e-12,
+        )
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.datatypes.units import (
+    convert_units,
+    INTERNAL_UNITS_FLOW,
+    INTERNAL_UNITS_PRECIP,
+)
+
+base_input_path = Path("tests/data")
+
+
+def test_scenarios_match_model_runs():
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20-21")
+    )
+    num_timesteps = 2000
+    precip = convert_units(
+        INTERNAL_UNITS_PRECIP, "INCHES", mcamm.input_data["precip"]
+    )[:num_timesteps]
+    precip_scenarios = np.vstack([precip, 2 * precip, np.zeros(num_timesteps)])
+
+    results = mcamm.run_scenarios(
+        precip_scenarios, scenario_labels=["x1", "x2", "dry"], return_flow=True
+    )
+
+    for scale, scenario in [(1, 0), (2, 1)]:
+        scaled = AntecedentMoistureModel(
+            Path(base_input_path, "spreadsheet_tab20-21")
+        )
+        scaled.input_data["precip"] = scale * scaled.input_data["precip"]
+        scaled.setup_components()
+        scaled.run(1, None, num_timesteps - 1)
+        expected_flow = scaled.flow[:num_timesteps]
+        np.testing.assert_allclose(
+            results.flow["total"][scenario], expected_flow, rtol=1e-12
+        )
+        summary = results.summary.iloc[scenario]
+        assert summary[f"peak_flow_{INTERNAL_UNITS_FLOW}"] == np.max(
+            results.flow["total"][scenario]
+        )
+        np.testing.assert_allclose(
+            summary["volume_CUBICFEET"],
+            expected_flow[1:].sum() * mcamm.timestep,
+        )
+    assert list(results.summary.index) == ["x1", "x2", "dry"]
+    assert results.summary.loc["dry", f"peak_flow_{INTERNAL_UNITS_FLOW}"] == 0
+
+
+def test_scenario_batches_and_shared_temperature():
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20-21")
+    )
+    rng = np.random.default_rng(0)
+    num_scenarios, num_timesteps, history = 7, 300, 400
+    precip_scenarios = np.zeros((num_scenarios, num_timesteps))
+    for i in range(num_scenarios):
+        precip_scenarios[i, 24 : 24 + rng.integers(1, 48)] = rng.random()
+    temperature = 30 + 40 * rng.random(history + num_timesteps)
+
+    results = mcamm.run_scenarios(
+        precip_scenarios, temperature, temperature_offset=history
+    )
+    batched = mcamm.run_scenarios(
+        precip_scenarios,
+        np.tile(temperature, (num_scenarios, 1)),
+        temperature_offset=history,
+        batch_size=3,
+    )
+    pd.testing.assert_frame_equal(results.summary, batched.summary)
+    assert results.flow is None
+    # time to peak counts from the storm start (timestep 24)
+    assert np.all(
+        results.summary["peak_timestep"]
+        == 24 + results.summary["time_to_peak_HOURS"]
+    )
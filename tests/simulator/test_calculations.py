@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.datatypes.sparse import SparseTimeseries
+from antecedent_moisture_model.simulator.calculations import (
+    PREFIX_SUM_BLOCK_STEPS,
+    RunningWindowSum,
+    get_difference_equation_previous_values,
+    get_difference_equation_sum,
+    get_event_difference_equation_simulation,
+    get_events_scattered,
+    get_moving_avg_backward,
+    get_vectorized_difference_equation_simulation,
+    get_window_sums,
+)
+
+
+def test_moving_avg_backward_docstring_example():
+    a = np.array([1.0, 4.0, 5.0, 8.0, 3.0])
+    np.testing.assert_array_equal(
+        get_moving_avg_backward(a, 2, 0), [0.0, 2.5, 4.5, 6.5, 5.5]
+    )
+    np.testing.assert_array_equal(
+        get_moving_avg_backward(a, 2, 1), [0.0, 0.0, 2.5, 4.5, 6.5]
+    )
+
+
+@pytest.mark.parametrize("window_steps", [1, 2, 9, 241, 8641])
+def test_window_sums_match_convolution(window_steps):
+    rng = np.random.default_rng(0)
+    a = rng.random(200000) * 50.0 + 20.0
+    a[1000:50000] = 0.0
+    expected = np.convolve(a, np.ones(window_steps), "valid")
+    window_sums = get_window_sums(a, window_steps)
+    np.testing.assert_allclose(window_sums, expected, rtol=1e-10, atol=1e-9)
+    # windows fully inside the dry span are exactly zero
+    assert np.all(window_sums[1000 : 50000 - window_steps + 1] == 0.0)
+
+
+@pytest.mark.parametrize("window_steps", [1, 2, 8, 12, 241, 8641])
+def test_sparse_moving_avg_matches_dense(window_steps):
+    rng = np.random.default_rng(0)
+    a = np.zeros((2, 105120))
+    for storm_start in rng.choice(105000, 60):
+        a[0, storm_start : storm_start + rng.integers(10, 120)] = rng.random()
+    a[1, 50000:50100] = 1.0
+    expected = get_moving_avg_backward(a, window_steps)
+    moving_avg = get_moving_avg_backward(
+        SparseTimeseries.from_dense(a), window_steps
+    )
+    np.testing.assert_allclose(moving_avg, expected, rtol=1e-10, atol=1e-15)
+    np.testing.assert_array_equal(moving_avg == 0.0, expected == 0.0)
+    if window_steps <= 8:
+        # same summation order
+        np.testing.assert_array_equal(moving_avg, expected)
+
+
+@pytest.mark.parametrize("multiplier", [0.0, 0.5, 0.999, 0.99999, 1.0])
+@pytest.mark.parametrize("first_event_timestep", [0, 7])
+def test_event_difference_equation_matches_lfilter(
+    multiplier, first_event_timestep
+):
+    rng = np.random.default_rng(1)
+    num_timesteps = 100000
+    event_timesteps = np.sort(
+        rng.choice(
+            np.arange(first_event_timestep + 1, num_timesteps), 500, False
+        )
+    )
+    event_timesteps[0] = first_event_timestep
+    events = rng.random(500)
+    t0 = 3.0
+    expected = get_vectorized_difference_equation_simulation(
+        get_events_scattered(event_timesteps, events, num_timesteps),
+        multiplier,
+        t0,
+    )
+
+    simulated_events = get_event_difference_equation_simulation(
+        event_timesteps, events, multiplier, t0
+    )
+    np.testing.assert_allclose(
+        simulated_events, expected[event_timesteps], rtol=1e-10, atol=1e-12
+    )
+    previous_values = get_difference_equation_previous_values(
+        event_timesteps, simulated_events, multiplier, t0
+    )
+    expected_previous = np.append(t0, expected)[event_timesteps]
+    np.testing.assert_allclose(
+        previous_values, expected_previous, rtol=1e-10, atol=1e-12
+    )
+    assert get_difference_equation_sum(
+        event_timesteps, simulated_events, multiplier, t0, num_timesteps
+    ) == pytest.approx(expected.sum(), rel=1e-10)
+
+
+def test_running_window_sum_splits_long_pushes():
+    rng = np.random.default_rng(0)
+    values = rng.random(3 * PREFIX_SUM_BLOCK_STEPS + 5) * 1e3
+    values[1000:5000] = 0.0
+    window_steps = 24
+
+    running_window_sum = RunningWindowSum(window_steps)
+    window_sums = running_window_sum.push(values)
+    blocks = RunningWindowSum(window_steps)
+    expected = np.concatenate(
+        [
+            blocks.push(values[i : i + PREFIX_SUM_BLOCK_STEPS])
+            for i in range(0, len(values), PREFIX_SUM_BLOCK_STEPS)
+        ]
+    )
+    np.testing.assert_array_equal(window_sums, expected)
+    np.testing.assert_allclose(
+        window_sums[window_steps - 1 :],
+        get_window_sums(values, window_steps),
+        rtol=1e-10,
+    )
+    assert np.all(window_sums[1000 + window_steps - 1 : 5000] == 0.0)
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import numpy as np
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+
+base_input_path = Path("tests/data")
+
+
+def test_components_share_cached_features():
+    input_path = Path(base_input_path, "spreadsheet_tab20-21")
+    mcamm = AntecedentMoistureModel(input_path)
+    baseflow, rdii = mcamm.amm_components
+    # both components use a 240 h temperature window and the same sigmoid
+    assert baseflow.moving_avg_temperature is rdii.moving_avg_temperature
+    assert baseflow.moving_avg_precip is not rdii.moving_avg_precip
+
+    misses = mcamm.feature_cache.misses
+    mcamm.setup_components(
+        params_to_override_labels=["rdii_hydrograph_half_life_time"],
+        params_to_override_values=[10.0],
+    )
+    assert mcamm.feature_cache.misses == misses
+    assert mcamm.amm_components[1].moving_avg_precip is rdii.moving_avg_precip
+
+    mcamm.setup_components(
+        params_to_override_labels=["rdii_addl_capture_fraction_cold"],
+        params_to_override_values=[0.08],
+    )
+    assert mcamm.feature_cache.misses == misses + 1
+    assert not np.array_equal(
+        mcamm.amm_components[1].seasonal_hydro_condition_factor,
+        rdii.seasonal_hydro_condition_factor,
+    )
+
+
+def test_components_built_in_threads_share_cached_features():
+    input_path = Path(base_input_path, "spreadsheet_tab20-21")
+    mcamm = AntecedentMoistureModel(input_path)
+    threaded_mcamm = AntecedentMoistureModel(input_path, max_workers=4)
+    baseflow, rdii = threaded_mcamm.amm_components
+    assert baseflow.moving_avg_temperature is rdii.moving_avg_temperature
+    # the shared temperature window is computed once
+    assert threaded_mcamm.feature_cache.misses == mcamm.feature_cache.misses
+
+    mcamm.run()
+    threaded_mcamm.run()
+    np.testing.assert_array_equal(threaded_mcamm.flow, mcamm.flow)
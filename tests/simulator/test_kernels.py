@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.simulator import kernels
+
+base_input_path = Path("tests/data")
+
+
+def run_rdii(starting_timestep, initial_conditions, use_fused_kernel):
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20")
+    )
+    component = mcamm.amm_components[0]
+    component.use_fused_kernel = use_fused_kernel
+    component.run(
+        starting_timestep,
+        initial_conditions,
+        component.num_timesteps_input_data - starting_timestep,
+    )
+    return component
+
+
+@pytest.mark.parametrize(
+    "starting_timestep, initial_conditions",
+    [(1, None), (3000, {"flow": 2.0, "total_capture_fraction": 0.05})],
+)
+@pytest.mark.parametrize("compiled", [False, True])
+def test_fused_rdii_kernel_matches_vectorized_bit_for_bit(
+    monkeypatch, starting_timestep, initial_conditions, compiled
+):
+    if compiled:
+        pytest.importorskip("numba")
+    else:
+        # the python loop has the same operations as the numba kernel
+        monkeypatch.setattr(
+            "antecedent_moisture_model.simulator.amm_rdii.simulate_rdii_fused",
+            kernels.simulate_rdii_loop,
+        )
+    expected = run_rdii(starting_timestep, initial_conditions, False)
+    fused = run_rdii(starting_timestep, initial_conditions, True)
+    for var in ["addl_capture_fraction", "total_capture_fraction", "flow"]:
+        np.testing.assert_array_equal(
+            getattr(fused, var), getattr(expected, var)
+        )
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+
+base_input_path = Path("tests/data")
+
+
+@pytest.mark.parametrize(
+    "site, parameters",
+    [
+        (
+            # config units: SQUAREKILOMETERS, DAYS and CELSIUS
+            "spreadsheet_tab20_different_units",
+            {
+                "rdii_catchment_area": 10.0,
+                "rdii_hydrograph_half_life_time": 0.5,
+                "rdii_antecedent_moisture_half_life_time": 3.0,
+                "rdii_precip_averaging_time": 0.25,
+                # below cold_temperature, so the two swap as in the config
+                "rdii_hot_temperature": -5.0,
+            },
+        ),
+        (
+            "spreadsheet_tab20-21",
+            {
+                "baseflow_temperature_averaging_time": 100.0,
+                "baseflow_addl_capture_fraction_cold": 0.1,
+                "rdii_dry_weather_capture_fraction": 0.02,
+            },
+        ),
+    ],
+)
+def test_set_parameters_matches_rebuilt_components(site, parameters):
+    mcamm = AntecedentMoistureModel(Path(base_input_path, site))
+    layout = mcamm.compile_parameters(list(parameters))
+    initial_vector = layout.get_vector()
+    mcamm.set_parameters(layout.to_internal(list(parameters.values())))
+    mcamm.run(1100, None, 1000)
+
+    expected = AntecedentMoistureModel(
+        Path(base_input_path, site),
+        params_to_override_labels=list(parameters),
+        params_to_override_values=list(parameters.values()),
+    )
+    expected.run(1100, None, 1000)
+    np.testing.assert_array_equal(mcamm.flow, expected.flow)
+    np.testing.assert_array_equal(
+        layout.get_vector(),
+        expected.compile_parameters(list(parameters)).get_vector(),
+    )
+
+    # and back to the config's parameters
+    mcamm.set_parameters(initial_vector)
+    mcamm.run()
+    expected = AntecedentMoistureModel(Path(base_input_path, site))
+    expected.run()
+    np.testing.assert_array_equal(mcamm.flow, expected.flow)
+
+
+def test_parameter_layout_checks_bounds_and_labels():
+    mcamm = AntecedentMoistureModel(Path(base_input_path, "spreadsheet_tab20"))
+    layout = mcamm.compile_parameters(
+        ["rdii_catchment_area", "rdii_dry_weather_capture_fraction"]
+    )
+    layout.to_internal([1.0, 0.0])
+    with pytest.raises(ValueError, match="rdii_catchment_area"):
+        layout.to_internal([0.0, 0.5])
+    with pytest.raises(ValueError, match="rdii_dry_weather_capture_fraction"):
+        layout.to_internal([1.0, 1.5])
+    with pytest.raises(KeyError):
+        mcamm.compile_parameters(["rdii_no_such_parameter"])
+
+    # rebuilding the components drops the layout compiled against them
+    mcamm.setup_components()
+    with pytest.raises(AssertionError):
+        mcamm.set_parameters([1.0, 0.0])
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.simulator.streaming import StreamingSimulation
+
+base_input_path = Path("tests/data")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_streaming_matches_batch_run(chunk_size):
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20-21")
+    )
+    initial_conditions = {
+        "baseflow": {"total_capture_fraction": 0.1, "flow": 2.0},
+        "rdii": {"total_capture_fraction": 0.1, "flow": 1.0},
+    }
+    mcamm.run(initial_conditions=initial_conditions)
+
+    streaming = StreamingSimulation(
+        mcamm.simulation_config_dict, initial_conditions
+    )
+    precip = mcamm.input_data["precip"]
+    temperature = mcamm.input_data["temperature"]
+    flow = []
+    component_outputs = {
+        label: {"flow": [], "total_capture_fraction": []}
+        for label in streaming.component_labels
+    }
+    for chunk_start in range(0, len(precip), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        flow.append(streaming.update(precip[chunk], temperature[chunk]))
+        for label, component in zip(
+            streaming.component_labels, streaming.amm_components
+        ):
+            for var in component_outputs[label]:
+                component_outputs[label][var].append(
+                    component.__getattribute__(var)
+                )
+
+    np.testing.assert_allclose(np.concatenate(flow), mcamm.flow, rtol=1e-9)
+    for label, component in zip(mcamm.component_labels, mcamm.amm_components):
+        for var, values in component_outputs[label].items():
+            np.testing.assert_allclose(
+                np.concatenate(values),
+                component.__getattribute__(var),
+                rtol=1e-9,
+                atol=1e-15,
+            )
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 """Tests for `antecedent_moisture_model` package."""
+
 from pathlib import Path
 
 import pytest
@@ -8,6 +9,7 @@ import numpy as np
 import pandas as pd
 
 from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
     run_multicomponent_antecedent_moisture_model,
 )
 from antecedent_moisture_model.datatypes.units import (
@@ -233,3 +235,134 @@ def test_noisy_example_multicomponent_partial_run_flow_realistic():
     amm_flow[nonzero_flow_timesteps[0]] == pytest.approx(
         sum([initial_conditions[c]["flow"] for c in initial_conditions])
     )
+
+
+def test_spreadsheet_tab20_storage_policies():
+    input_path = Path(base_input_path, "spreadsheet_tab20")
+    flow = {}
+    memory_usage = {}
+    for storage in ["full", "flow_only", "float32", "flow_only+float32"]:
+        mcamm = AntecedentMoistureModel(input_path, storage=storage)
+        mcamm.run()
+        flow[storage] = mcamm.flow
+        memory_usage[storage] = mcamm.get_memory_usage()
+
+        # accuracy bounds documented with STORAGE_POLICIES
+        assert np.abs(mcamm.flow - mcamm.input_data["flow"]).max() < 2e-3
+
+    np.testing.assert_array_equal(flow["flow_only"], flow["full"])
+    assert flow["float32"].dtype == np.float32
+    assert np.abs(flow["float32"] - flow["full"]).max() < 1e-5
+    np.testing.assert_array_equal(flow["flow_only+float32"], flow["float32"])
+    assert memory_usage["float32"] == memory_usage["full"] // 2
+    assert memory_usage["flow_only"] < memory_usage["full"]
+    assert memory_usage["flow_only+float32"] == memory_usage["flow_only"] // 2
+
+
+def test_storage_policies_memory_usage():
+    # ratios documented with STORAGE_POLICIES
+    input_path = Path(base_input_path, "spreadsheet_tab20-21")
+    memory_usage = {}
+    for storage in ["full", "flow_only", "float32", "flow_only+float32"]:
+        mcamm = AntecedentMoistureModel(input_path, storage=storage)
+        mcamm.run()
+        memory_usage[storage] = mcamm.get_memory_usage()
+        if "float32" in storage:
+            # built in float32 rather than converted from float64
+            component = mcamm.amm_components[0]
+            assert component.flow.dtype == np.float32
+            if storage == "float32":
+                baseflow, rdii = mcamm.amm_components
+                assert baseflow.moving_avg_precip.dtype == np.float32
+                assert (
+                    baseflow.moving_avg_temperature
+                    is rdii.moving_avg_temperature
+                )
+
+    assert memory_usage["full"] / memory_usage["flow_only"] > 2.3
+    assert memory_usage["full"] / memory_usage["float32"] == 2
+    assert memory_usage["full"] / memory_usage["flow_only+float32"] > 4.6
+
+    with pytest.raises(AssertionError):
+        AntecedentMoistureModel(input_path, storage="full+float32")
+
+
+def test_flow_only_storage_frees_intermediates_and_reruns():
+    input_path = Path(base_input_path, "spreadsheet_tab20")
+    mcamm = AntecedentMoistureModel(input_path, storage="flow_only")
+    mcamm.run()
+    component = mcamm.amm_components[0]
+    assert component.moving_avg_precip is None
+    assert component.total_capture_fraction is None
+    with pytest.raises(AssertionError):
+        mcamm.export_to_csv("unused.csv")
+
+    flow = mcamm.flow.copy()
+    mcamm.run()
+    np.testing.assert_array_equal(mcamm.flow, flow)
+
+
+@pytest.mark.parametrize("site", ["spreadsheet_tab20", "spreadsheet_tab20-21"])
+def test_run_window_with_auto_warm_up_matches_full_run(site):
+    input_path = Path(base_input_path, site)
+    mcamm = AntecedentMoistureModel(input_path)
+    mcamm.run()
+
+    lazy_mcamm = AntecedentMoistureModel(input_path, lazy_setup=True)
+    assert lazy_mcamm.amm_components is None
+    starting_timestep, num_timesteps_to_run = 5000, 336
+    window_mcamm = lazy_mcamm.run_window(
+        starting_timestep, num_timesteps_to_run
+    )
+
+    # features are only computed over the window and its warm-up
+    assert (
+        window_mcamm.amm_components[0].moving_avg_precip.shape[-1]
+        == window_mcamm.num_timesteps_input_data
+        < mcamm.num_timesteps_input_data
+    )
+    window_flow = window_mcamm.flow[
+        starting_timestep - window_mcamm.window_offset :
+    ][:num_timesteps_to_run]
+    expected_flow = mcamm.flow[
+        starting_timestep : starting_timestep + num_timesteps_to_run
+    ]
+    assert np.abs(window_flow - expected_flow).max() < 1e-3 * (
+        expected_flow.max()
+    )
+
+
+@pytest.mark.parametrize("site", ["spreadsheet_tab20", "spreadsheet_tab20-21"])
+def test_event_driven_run_matches_run(site):
+    mcamm = AntecedentMoistureModel(Path(base_input_path, site))
+    mcamm.run()
+    for component in mcamm.amm_components:
+        if not hasattr(component, "run_event_driven"):
+            continue
+        flow = component.flow.copy()
+        total_capture_fraction = component.total_capture_fraction.copy()
+
+        component.run_event_driven()
+        np.testing.assert_array_equal(component.flow, flow)
+        np.testing.assert_array_equal(
+            component.total_capture_fraction, total_capture_fraction
+        )
+        assert component.flow_total == pytest.approx(flow[1:].sum())
+        assert component.flow_peak == flow[1:].max()
+
+        component.flow[:] = 0.0
+        component.run_event_driven(fill_dry_timesteps=False)
+        # only the window summary is computed
+        assert not component.flow.any()
+        assert component.flow_total == pytest.approx(flow[1:].sum(), rel=1e-12)
+        assert component.flow_peak == pytest.approx(flow[1:].max(), rel=1e-12)
+
+
+def test_sparse_precip_gives_same_flow():
+    input_path = Path(base_input_path, "spreadsheet_tab20-21")
+    mcamm = AntecedentMoistureModel(input_path)
+    mcamm.run()
+    sparse_mcamm = AntecedentMoistureModel(input_path, sparse_precip=True)
+    sparse_mcamm.run()
+    np.testing.assert_array_equal(sparse_mcamm.flow, mcamm.flow)
+    assert sparse_mcamm.get_memory_usage() < mcamm.get_memory_usage()
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.chunked import (
+    run_chunked_antecedent_moisture_model,
+)
+
+base_input_path = Path("tests/data")
+
+
+def test_chunked_run_matches_in_memory_export(tmp_path):
+    input_path = Path(base_input_path, "spreadsheet_tab20-21")
+    mcamm = AntecedentMoistureModel(input_path)
+    mcamm.run()
+    mcamm.export_to_csv(Path(tmp_path, "in_memory.csv"))
+
+    run_chunked_antecedent_moisture_model(
+        input_path,
+        export_filename=Path(tmp_path, "chunked.csv"),
+        chunk_timesteps=1000,
+    )
+
+    in_memory = pd.read_csv(Path(tmp_path, "in_memory.csv"), index_col=0)
+    chunked = pd.read_csv(Path(tmp_path, "chunked.csv"), index_col=0)
+    assert list(chunked.columns) == list(in_memory.columns)
+    assert list(chunked.index) == list(in_memory.index)
+    np.testing.assert_allclose(
+        chunked.to_numpy(), in_memory.to_numpy(), rtol=1e-9, atol=1e-15
+    )
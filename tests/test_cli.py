@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+
+from antecedent_moisture_model.datatypes.units import INTERNAL_UNITS_FLOW
+from antecedent_moisture_model.cli import load_initial_conditions, main
+from antecedent_moisture_model.postprocess.dataexport import read_results
+
+base_input_path = Path("tests/data")
+
+
+def test_cli_run_exports_format_and_columns(capsys, tmp_path):
+    site_path = Path(base_input_path, "spreadsheet_tab20")
+    returncode = main(
+        [
+            "run",
+            str(site_path),
+            "--export-filename",
+            # an absolute path, so nothing is written into the site directory
+            str(Path(tmp_path, "results_cli.out")),
+            "--format",
+            "npz",
+            "--columns",
+            "flow",
+            "--num-timesteps",
+            "2000",
+            "--stats",
+        ]
+    )
+    assert returncode == 0
+    results_df = read_results(
+        Path(tmp_path, "results_cli.out.npz"), file_format="npz"
+    )
+    assert list(results_df.columns) == [
+        f"observed_flow_{INTERNAL_UNITS_FLOW}",
+        f"rdii_flow_{INTERNAL_UNITS_FLOW}",
+        f"total_flow_{INTERNAL_UNITS_FLOW}",
+    ]
+    # timesteps after the simulated window stay zero
+    total_flow = results_df[f"total_flow_{INTERNAL_UNITS_FLOW}"].to_numpy()
+    assert np.all(total_flow[2001:] == 0) and np.any(total_flow[1:2001] > 0)
+    output = capsys.readouterr().out
+    assert "spreadsheet_tab20" in output
+    assert "read_input_data" in output
+
+
+def test_cli_batch_streams_progress_and_fails_on_errors(capsys):
+    returncode = main(
+        [
+            "batch",
+            str(Path(base_input_path, "spreadsheet_tab20")),
+            str(Path(base_input_path, "missing_precip")),
+            "--jobs",
+            "1",
+        ]
+    )
+    assert returncode == 1
+    progress = capsys.readouterr().err.splitlines()
+    assert progress[0].startswith("[1/2]") and progress[0].endswith(" s)")
+    assert progress[1].startswith("[2/2]")
+    assert "FileNotFoundError" in progress[1]
+
+
+def test_load_initial_conditions(tmp_path):
+    initial_conditions = {"rdii": {"total_capture_fraction": 0.1, "flow": 2}}
+    assert (
+        load_initial_conditions(
+            '{"rdii": {"total_capture_fraction": 0.1, "flow": 2}}'
+        )
+        == initial_conditions
+    )
+    path = Path(tmp_path, "initial_conditions.yaml")
+    path.write_text("rdii:\n  total_capture_fraction: 0.1\n  flow: 2\n")
+    assert load_initial_conditions(str(path)) == initial_conditions
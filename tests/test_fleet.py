@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from antecedent_moisture_model.fleet import run_fleet
+
+base_input_path = Path("tests/data")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_fleet_reports_per_site_failures(max_workers):
+    summary = run_fleet(
+        [
+            Path(base_input_path, "spreadsheet_tab20"),
+            Path(base_input_path, "spreadsheet_tab20-21"),
+            Path(base_input_path, "missing_precip"),
+            Path(base_input_path, "no_such_site"),
+        ],
+        max_workers=max_workers,
+    )
+    assert list(summary["status"]) == ["ok", "ok", "error", "error"]
+    assert summary["total_volume"].iloc[:2].gt(0).all()
+    # missing_precip has no simulation config
+    assert "FileNotFoundError" in summary["error"].iloc[2]
+    # sites given explicitly are reported even if they don't exist
+    assert "FileNotFoundError" in summary["error"].iloc[3]
+
+
+def test_fleet_collects_stats():
+    summary = run_fleet(
+        [Path(base_input_path, "spreadsheet_tab20")],
+        max_workers=1,
+        collect_stats=True,
+    )
+    assert summary["stats"].iloc[0]["components"]["rdii"]["run"]["calls"] == 1
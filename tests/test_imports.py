@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# about 0.6 s on a developer machine, 2.4 s before plotting and scipy were imported lazily
+IMPORT_TIME_BUDGET_SECONDS = 2.0
+LAZY_MODULES = ["matplotlib", "scipy.signal", "scipy.optimize", "scipy.stats"]
+
+
+def get_import_profile(module: str):
+    """(seconds, lazy modules loaded) of importing module in a fresh interpreter"""
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "seconds = time.perf_counter() - start\n"
+        f"loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps([seconds, loaded]))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "antecedent_moisture_model.antecedent_moisture_model",
+        "antecedent_moisture_model.fleet",
+        "antecedent_moisture_model.calibration.calibrator",
+    ],
+)
+def test_import_defers_heavy_modules(module):
+    _, loaded = get_import_profile(module)
+    assert loaded == []
+
+
+def test_cli_parses_arguments_before_importing_the_model():
+    script = (
+        "import sys\n"
+        "import antecedent_moisture_model.cli\n"
+        "print('pandas' in sys.modules or 'numpy' in sys.modules)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "False"
+
+
+def test_import_time_budget():
+    # best of a few runs, so a busy machine does not fail the test
+    seconds = min(
+        get_import_profile(
+            "antecedent_moisture_model.antecedent_moisture_model"
+        )[0]
+        for _ in range(3)
+    )
+    assert seconds < IMPORT_TIME_BUDGET_SECONDS
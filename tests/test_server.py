@@ -0,0 +1,105 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.server import SimulationService, make_server
+
+base_input_path = Path("tests/data")
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    service = SimulationService([Path(base_input_path, "spreadsheet_tab20*")])
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post_run(server_url: str, run_request: dict):
+    request = urllib.request.Request(
+        f"{server_url}/run",
+        json.dumps(run_request).encode(),
+        {"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return response.headers, response.read()
+
+
+@pytest.mark.parametrize("encoding", ["json", "npy"])
+def test_run_request_matches_model_run(server_url, encoding):
+    starting_timestep = 1100
+    num_timesteps = 500
+    headers, body = post_run(
+        server_url,
+        {
+            "site": "spreadsheet_tab20-21",
+            "params": {"rdii_catchment_area": 3000.0},
+            "starting_timestep": starting_timestep,
+            "num_timesteps": num_timesteps,
+            "encoding": encoding,
+        },
+    )
+    if encoding == "npy":
+        columns = headers["X-AMM-Columns"].split(",")
+        flow = np.load(io.BytesIO(body))
+    else:
+        results = json.loads(body)
+        columns = results["columns"]
+        flow = np.array([results["flow"][c] for c in columns])
+    assert columns == ["total", "baseflow", "rdii"]
+
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20-21"),
+        params_to_override_labels=["rdii_catchment_area"],
+        params_to_override_values=[3000.0],
+    )
+    mcamm.run(starting_timestep, None, num_timesteps)
+    window = slice(starting_timestep, starting_timestep + num_timesteps)
+    np.testing.assert_array_equal(flow[0], mcamm.flow[window])
+    np.testing.assert_array_equal(
+        flow[2], mcamm.amm_components[1].flow[window]
+    )
+
+
+def test_bad_requests_get_error_responses(server_url):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post_run(server_url, {"site": "no_such_site"})
+    assert e.value.code == 404
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post_run(
+            server_url,
+            {
+                "site": "spreadsheet_tab20",
+                "params": {"rdii_catchment_area": -1},
+            },
+        )
+    assert e.value.code == 400
+    assert "catchment_area" in json.loads(e.value.read())["error"]
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post_run(
+            server_url,
+            {
+                "site": "spreadsheet_tab20",
+                "params": {"rdii_catchment_areaa": 1.0},
+            },
+        )
+    assert e.value.code == 400
+    assert "rdii_catchment_areaa" in json.loads(e.value.read())["error"]
+
+    with urllib.request.urlopen(f"{server_url}/sites") as response:
+        sites = json.loads(response.read())["sites"]
+    assert (
+        sites["spreadsheet_tab20-21"]
+        and not sites["spreadsheet_tab20_different_units"]
+    )
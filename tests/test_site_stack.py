@@ -0,0 +1,79 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.site_stack import SiteStack
+
+base_input_path = Path("tests/data")
+
+
+def make_site(tmp_path: Path, site: str, params: dict) -> Path:
+    """copy of spreadsheet_tab20-21 with {(component_label, param): value} changes"""
+    site_path = Path(tmp_path, site)
+    shutil.copytree(Path(base_input_path, "spreadsheet_tab20-21"), site_path)
+    simulation_config_path = Path(site_path, "simulation_config.yaml")
+    simulation_config_dict = yaml.safe_load(simulation_config_path.read_text())
+    for (component_label, param), value in params.items():
+        simulation_config_dict["components"][component_label][
+            "parameterization"
+        ][param] = value
+    simulation_config_path.write_text(yaml.safe_dump(simulation_config_dict))
+    return site_path
+
+
+def test_site_stack_matches_single_site_runs(tmp_path):
+    make_site(tmp_path, "a", {})
+    make_site(tmp_path, "b", {("rdii", "catchment_area"): 1500.0})
+    make_site(
+        tmp_path,
+        "c",
+        {
+            ("baseflow", "catchment_area"): 900.0,
+            ("rdii", "hydrograph_half_life_time"): 0.5,
+            ("rdii", "antecedent_moisture_half_life_time"): 2.0,
+            ("rdii", "precip_averaging_time"): 1 / 24,
+            ("rdii", "temperature_averaging_time"): 10.0,
+            ("rdii", "time_parameter_units"): "DAYS",
+        },
+    )
+    stack = SiteStack([Path(tmp_path, "*")])
+    assert stack.sites == ["a", "b", "c"]
+    initial_conditions = {
+        "b": {"rdii": {"total_capture_fraction": 0.1, "flow": 5.0}}
+    }
+    stack.run(1200, initial_conditions, 800)
+    assert stack.flow.shape == (3, stack.num_timesteps_input_data)
+
+    for i, site in enumerate(stack.sites):
+        mcamm = AntecedentMoistureModel(Path(tmp_path, site))
+        mcamm.run(1200, initial_conditions.get(site), 800)
+        np.testing.assert_allclose(stack.flow[i], mcamm.flow, rtol=1e-10)
+        np.testing.assert_allclose(
+            stack.get_component_flow(site, "rdii"),
+            mcamm.amm_components[1].flow,
+            rtol=1e-10,
+        )
+        assert np.shares_memory(stack.get_site_flow(site), stack.flow)
+    # c's rdii parameters are in other units, so it gets an ensemble of its own
+    assert len(stack.ensembles) == 3
+
+
+def test_site_stack_checks_sites(tmp_path):
+    make_site(tmp_path, "a", {})
+    site_path = make_site(tmp_path, "b", {})
+    simulation_config_path = Path(site_path, "simulation_config.yaml")
+    simulation_config_path.write_text(
+        simulation_config_path.read_text().replace(
+            "timestep: 1.0", "timestep: 2.0"
+        )
+    )
+    with pytest.raises(ValueError, match="timestep"):
+        SiteStack([Path(tmp_path, "*")])
+    with pytest.raises(FileNotFoundError):
+        SiteStack([Path(tmp_path, "a"), Path(tmp_path, "no_such_site")])
@@ -0,0 +1,64 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from antecedent_moisture_model.antecedent_moisture_model import (
+    AntecedentMoistureModel,
+)
+from antecedent_moisture_model.stats import RunStats
+
+base_input_path = Path("tests/data")
+
+
+def test_disabled_stats_record_nothing():
+    stats = RunStats(enabled=False)
+    with stats.stage("run"):
+        pass
+    assert stats.to_dict() == {"stages": {}, "components": {}}
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 9), reason="per-stage peaks need reset_peak"
+)
+def test_nested_stage_memory_peaks():
+    stats = RunStats(trace_memory=True)
+    with stats.stage("outer"):
+        with stats.stage("inner", component="rdii"):
+            a = np.ones(1_000_000)
+            del a
+        b = np.ones(100_000)
+    del b
+    stats_dict = stats.to_dict()
+    inner = stats_dict["components"]["rdii"]["inner"]
+    outer = stats_dict["stages"]["outer"]
+    assert inner["calls"] == outer["calls"] == 1
+    assert 8_000_000 <= inner["peak_memory_bytes"] < 8_100_000
+    # the outer stage's peak includes the inner stage's
+    assert outer["peak_memory_bytes"] >= inner["peak_memory_bytes"]
+    assert outer["seconds"] >= inner["seconds"]
+
+
+def test_model_stats_json(tmp_path):
+    mcamm = AntecedentMoistureModel(
+        Path(base_input_path, "spreadsheet_tab20-21"), collect_stats=True
+    )
+    mcamm.run()
+    mcamm.run()
+    stats_dict = json.loads(mcamm.stats.to_json(Path(tmp_path, "stats.json")))
+    assert stats_dict == json.loads(Path(tmp_path, "stats.json").read_text())
+
+    assert {
+        "load_config",
+        "setup_components",
+        "feature_moving_avg",
+        "feature_seasonal_hydro_condition_factor",
+        "run",
+    } <= set(stats_dict["stages"])
+    assert stats_dict["stages"]["run"]["calls"] == 2
+    for component_label in mcamm.component_labels:
+        component_stats = stats_dict["components"][component_label]
+        assert component_stats["construct"]["calls"] == 1
+        assert component_stats["run"]["calls"] == 2
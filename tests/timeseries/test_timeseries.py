@@ -1,12 +1,18 @@
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 import yaml
 
+from antecedent_moisture_model.postprocess.dataexport import export_to_csv
 from antecedent_moisture_model.timeseries.datamodel import InputDataConfig
 from antecedent_moisture_model.timeseries.timeseries import (
     TimeseriesSetup,
+    aggregate_timeseries,
+    get_input_data_colnames,
+    load_input_data,
+    read_input_data,
 )
 from antecedent_moisture_model.timeseries.exceptions import (
     InvalidOrMissingTimestampException,
@@ -14,9 +20,18 @@ from antecedent_moisture_model.timeseries.exceptions import (
 )
 
 base_input_path = Path("tests/data")
+VARNAMES_TO_COMPARE = [
+    "precip",
+    "temperature",
+    "flow",
+    "moving_avg_precip",
+    "seasonal_hydro_condition_factor",
+]
 
 
-def prepare_input_data(input_data_config_path: Path, timestep_hours: int = 0):
+def prepare_input_data(
+    input_data_config_path: Path, timestep_hours: float = None
+):
     input_data_config_dict = yaml.safe_load(open(input_data_config_path, "r"))
     input_data_config = InputDataConfig(**input_data_config_dict)
 
@@ -63,3 +78,181 @@ def test_input_data_spreadsheet_tab20():
         base_input_path, "spreadsheet_tab20", "input_data_config.yaml"
     )
     input_dict = prepare_input_data(input_data_config_path)
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_read_input_data_matches_full_read(engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    input_data_config_path = Path(
+        base_input_path, "spreadsheet_tab20", "input_data_config.yaml"
+    )
+    input_data_config = InputDataConfig(
+        **yaml.safe_load(open(input_data_config_path, "r"))
+    )
+    input_data_path = Path(
+        input_data_config_path.parent, input_data_config.input_data_file
+    )
+
+    input_data = read_input_data(input_data_path, input_data_config, engine)
+    assert set(input_data.columns) == set(
+        get_input_data_colnames(input_data_config)
+    )
+
+    prepared_data = TimeseriesSetup(input_data, input_data_config).run()
+    expected_data = TimeseriesSetup(
+        pd.read_csv(input_data_path, skiprows=input_data_config.skip_rows),
+        input_data_config,
+    ).run()
+    assert prepared_data.keys() == expected_data.keys()
+    assert (prepared_data["timestamp"] == expected_data["timestamp"]).all()
+    for k in VARNAMES_TO_COMPARE:
+        np.testing.assert_array_equal(prepared_data[k], expected_data[k])
+
+
+def test_read_input_data_missing_precip():
+    input_data_config_path = Path(
+        base_input_path, "missing_precip", "input_data_config.yaml"
+    )
+    input_data_config = InputDataConfig(
+        **yaml.safe_load(open(input_data_config_path, "r"))
+    )
+    input_data = read_input_data(
+        Path(input_data_config_path.parent, input_data_config.input_data_file),
+        input_data_config,
+    )
+    with pytest.raises(MissingDataColumnException):
+        TimeseriesSetup(input_data, input_data_config).run()
+
+
+def test_input_data_timestamp_format():
+    input_data = pd.DataFrame(
+        {
+            "timestamp": ["1/1/2005 0:00", "1/1/2005 1:00", "1/1/2005 2:00"],
+            "precip": [0.0, 0.1, 0.0],
+            "temperature": [28.0, 29.0, 30.0],
+        }
+    )
+    prepared_data = TimeseriesSetup(
+        input_data, InputDataConfig(timestamp_format="%m/%d/%Y %H:%M"), 1
+    ).run()
+    assert prepared_data["timestamp"][-1] == pd.Timestamp("2005-01-01 02:00")
+
+    with pytest.raises(InvalidOrMissingTimestampException):
+        TimeseriesSetup(
+            input_data, InputDataConfig(timestamp_format="%Y-%m-%d %H:%M"), 1
+        ).run()
+
+
+def test_parsed_timestamp_keeps_column_name(tmp_path):
+    input_data = pd.DataFrame(
+        {
+            "time": ["1/1/2005 0:00", "1/1/2005 1:00", "1/1/2005 2:00"],
+            "precip": [0.0, 0.1, 0.0],
+            "temperature": [28.0, 29.0, 30.0],
+        }
+    )
+    prepared_data = TimeseriesSetup(
+        input_data,
+        InputDataConfig(
+            timestamp_colname="time", timestamp_format="%m/%d/%Y %H:%M"
+        ),
+        1,
+    ).run()
+    assert prepared_data["timestamp"].name == "time"
+
+    export_to_csv(
+        [], prepared_data, [], np.zeros(3), Path(tmp_path, "results.csv")
+    )
+    header = Path(tmp_path, "results.csv").read_text().splitlines()[0]
+    assert header.startswith("time,")
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_input_data_dtype(dtype):
+    input_data_config_path = Path(
+        base_input_path,
+        "spreadsheet_tab20_different_units",
+        "input_data_config.yaml",
+    )
+    input_data_config = InputDataConfig(
+        **yaml.safe_load(open(input_data_config_path, "r"))
+    )
+    input_data_path = Path(
+        input_data_config_path.parent, input_data_config.input_data_file
+    )
+
+    prepared_data = TimeseriesSetup(
+        read_input_data(input_data_path, input_data_config, dtype=dtype),
+        input_data_config,
+        dtype=dtype,
+    ).run()
+    expected_data = TimeseriesSetup(
+        read_input_data(input_data_path, input_data_config),
+        input_data_config,
+    ).run()
+    for k in ["precip", "temperature", "flow"]:
+        assert prepared_data[k].dtype == dtype
+        assert prepared_data[k].flags.c_contiguous
+        np.testing.assert_allclose(
+            prepared_data[k], expected_data[k], rtol=1e-6, atol=1e-12
+        )
+
+
+def test_input_data_timestep_not_multiple_of_data_timestep():
+    input_data_config_path = Path(
+        base_input_path, "spreadsheet_tab20", "input_data_config.yaml"
+    )
+    prepare_input_data(input_data_config_path, 1)
+    with pytest.raises(InvalidOrMissingTimestampException):
+        prepare_input_data(input_data_config_path, 1.5)
+    with pytest.raises(InvalidOrMissingTimestampException):
+        prepare_input_data(input_data_config_path, 0.5)
+
+
+def test_aggregate_timeseries():
+    timestamp = pd.date_range("2005-01-01 22:00", periods=60, freq="h")
+    precip = np.arange(60, dtype=float)
+    timeseries_dict = {
+        "timestamp": timestamp,
+        "precip": precip,
+        "temperature": precip + 32,
+    }
+    aggregated_dict = aggregate_timeseries(timeseries_dict, 24)
+
+    # 2 h before the first midnight and 10 h after the last one are dropped
+    assert list(aggregated_dict["timestamp"]) == [
+        pd.Timestamp("2005-01-02"),
+        pd.Timestamp("2005-01-03"),
+    ]
+    np.testing.assert_allclose(
+        aggregated_dict["precip"], [precip[2:26].sum(), precip[26:50].sum()]
+    )
+    np.testing.assert_allclose(
+        aggregated_dict["temperature"],
+        [precip[2:26].mean() + 32, precip[26:50].mean() + 32],
+    )
+
+
+def test_load_input_data_aggregated_is_cached():
+    input_data_config_path = Path(
+        base_input_path, "spreadsheet_tab20", "input_data_config.yaml"
+    )
+    input_data_config = InputDataConfig(
+        **yaml.safe_load(open(input_data_config_path, "r"))
+    )
+    input_data_path = Path(
+        input_data_config_path.parent, input_data_config.input_data_file
+    )
+    hourly_data = load_input_data(input_data_path, input_data_config, 1)
+    daily_data = load_input_data(input_data_path, input_data_config, 24)
+
+    assert len(daily_data["timestamp"]) == len(hourly_data["timestamp"]) // 24
+    np.testing.assert_allclose(
+        daily_data["precip"].sum(), hourly_data["precip"].sum()
+    )
+    assert not daily_data["precip"].flags.writeable
+    assert (
+        load_input_data(input_data_path, input_data_config, 24)["precip"]
+        is daily_data["precip"]
+    )